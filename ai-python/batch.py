@@ -0,0 +1,227 @@
+"""
+Bulk resume screening jobs.
+
+A BatchJob collects per-file results in completion order so callers can
+stream them as NDJSON while the job runs, and poll or resume from any
+offset later by job ID. Jobs live in memory and expire BATCH_JOB_TTL
+seconds after they finish. With SHARED_STATE_DB set, results are also
+written there, so a poll that lands on another worker still finds the
+job and follows it by re-reading the table.
+
+LLM calls made by a batch share a concurrency limit and a token-per-minute
+budget so a recruiter's 500-resume upload cannot starve interactive
+traffic on the same key.
+"""
+
+import asyncio
+import io
+import os
+import threading
+import time
+import uuid
+import zipfile
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from fastjson import dumps, loads
+from ratelimit import SharedTokenBucket, TokenBucket
+from shared_state import SharedDB, off_loop, shared_db
+
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "500"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_TOKENS_PER_MINUTE = int(os.getenv("BATCH_TOKENS_PER_MINUTE", "60000"))
+BATCH_JOB_TTL = float(os.getenv("BATCH_JOB_TTL", "3600"))
+# Total bytes a batch may hold once its archives are unpacked (zip bomb guard)
+BATCH_MAX_EXTRACTED_BYTES = int(os.getenv("BATCH_MAX_EXTRACTED_BYTES", str(512 * 1024 * 1024)))
+# Seconds between re-reads when following a batch run by another worker
+BATCH_POLL_INTERVAL = float(os.getenv("BATCH_POLL_INTERVAL", "0.5"))
+
+
+class ArchiveError(ValueError):
+    """An uploaded zip that cannot be unpacked (corrupt, truncated or encrypted)"""
+
+
+def expand_uploads(uploads: List[Tuple[str, bytes]], max_file_bytes: int,
+                   max_total_bytes: int = BATCH_MAX_EXTRACTED_BYTES) -> List[Tuple[str, Optional[bytes]]]:
+    """Flatten (filename, bytes) uploads, unpacking .zip archives into their PDFs.
+
+    Archive members over max_file_bytes are not decompressed; their content is None.
+    Raises ArchiveError for an archive that cannot be read and ValueError once the
+    batch would hold more than max_total_bytes, counting every upload and member.
+    """
+    files = []
+    total = 0
+
+    def count(size: int):
+        nonlocal total
+        total += size
+        if total > max_total_bytes:
+            raise ValueError(f"Batch unpacks to more than {max_total_bytes} bytes")
+
+    for filename, content in uploads:
+        if zipfile.is_zipfile(io.BytesIO(content)):
+            try:
+                with zipfile.ZipFile(io.BytesIO(content)) as archive:
+                    for info in archive.infolist():
+                        if info.is_dir() or not info.filename.lower().endswith(".pdf"):
+                            continue
+                        if info.file_size > max_file_bytes:
+                            files.append((info.filename, None))
+                            continue
+                        # zipfile stops reading at the declared file_size, so counting it up front is safe
+                        count(info.file_size)
+                        files.append((info.filename, archive.read(info)))
+            except (zipfile.BadZipFile, zlib.error, RuntimeError, NotImplementedError, EOFError) as e:
+                # RuntimeError: encrypted member; NotImplementedError: unsupported compression
+                raise ArchiveError(f"{filename}: cannot unpack zip archive ({e})") from e
+        else:
+            count(len(content))
+            files.append((filename, content))
+        if len(files) > BATCH_MAX_FILES:
+            raise ValueError(f"Batch has more than {BATCH_MAX_FILES} files")
+    return files
+
+
+class BatchJob:
+    def __init__(self, total: int, jd: Optional[str] = None, db: Optional[SharedDB] = None):
+        self.id = uuid.uuid4().hex
+        self.total = total
+        self.jd = jd
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.results: List[dict] = []
+        self.changed = asyncio.Condition()
+        self.db = db
+        # Set on jobs loaded from SHARED_STATE_DB that another worker is running
+        self.remote = False
+        # refresh() runs in the threadpool, possibly for two requests at once
+        self.refresh_lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    async def add_result(self, result: dict):
+        async with self.changed:
+            self.results.append(result)
+            index = len(self.results) - 1
+            if len(self.results) >= self.total:
+                self.finished_at = time.time()
+            self.changed.notify_all()
+        await off_loop(self.db, self._record, index, result)
+
+    def _record(self, index: int, result: dict):
+        if self.db is None:
+            return
+        self.db.execute("INSERT INTO batch_results (job_id, idx, entry) VALUES (?, ?, ?)",
+                        (self.id, index, dumps(result)))
+        if self.finished:
+            self.db.execute("UPDATE batch_jobs SET finished_at = ? WHERE id = ?", (self.finished_at, self.id))
+
+    def refresh(self):
+        """Pull results another worker has recorded since the last read"""
+        with self.refresh_lock:
+            rows = self.db.query("SELECT entry FROM batch_results WHERE job_id = ? AND idx >= ? ORDER BY idx",
+                                 (self.id, len(self.results)))
+            self.results.extend(loads(entry) for (entry,) in rows)
+            if len(self.results) >= self.total and self.finished_at is None:
+                row = self.db.query("SELECT finished_at FROM batch_jobs WHERE id = ?", (self.id,))
+                self.finished_at = (row[0][0] if row else None) or time.time()
+
+    def summary(self) -> dict:
+        errors = sum(1 for r in self.results if r.get("status") != "success")
+        return {
+            "job_id": self.id,
+            "status": "finished" if self.finished else "running",
+            "total": self.total,
+            "completed": len(self.results),
+            "errors": errors,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+    async def follow(self, after: int = 0):
+        """Yield results from index `after` onwards, waiting for new ones until the job ends"""
+        index = after
+        while self.remote:
+            await off_loop(self.db, self.refresh)
+            for result in self.results[index:]:
+                yield result
+            index = max(index, len(self.results))
+            if self.finished:
+                return
+            await asyncio.sleep(BATCH_POLL_INTERVAL)
+        while True:
+            async with self.changed:
+                await self.changed.wait_for(lambda: len(self.results) > index or self.finished)
+                pending = self.results[index:]
+            for result in pending:
+                yield result
+            index += len(pending)
+            if self.finished and index >= len(self.results):
+                return
+
+
+class BatchRegistry:
+    def __init__(self, db: Optional[SharedDB] = None):
+        self.jobs: Dict[str, BatchJob] = {}
+        self._llm_slots: Optional[asyncio.Semaphore] = None
+        self.db = db if db is not None else shared_db()
+        if self.db is not None:
+            self.db.execute("CREATE TABLE IF NOT EXISTS batch_jobs "
+                            "(id TEXT PRIMARY KEY, total INTEGER, jd TEXT, created_at REAL, finished_at REAL)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS batch_results "
+                            "(job_id TEXT, idx INTEGER, entry TEXT, PRIMARY KEY (job_id, idx))")
+            # One budget for the host; BATCH_CONCURRENCY stays per worker
+            self.token_budget = SharedTokenBucket("batch:tokens", self.db, BATCH_TOKENS_PER_MINUTE)
+        else:
+            self.token_budget = TokenBucket(BATCH_TOKENS_PER_MINUTE)
+
+    @property
+    def llm_slots(self) -> asyncio.Semaphore:
+        # Created lazily so the semaphore binds to the server's running loop
+        if self._llm_slots is None:
+            self._llm_slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+        return self._llm_slots
+
+    def create(self, total: int, jd: Optional[str] = None) -> BatchJob:
+        self._expire()
+        job = BatchJob(total, jd, self.db)
+        self.jobs[job.id] = job
+        if self.db is not None:
+            self.db.execute("INSERT INTO batch_jobs (id, total, jd, created_at) VALUES (?, ?, ?, ?)",
+                            (job.id, total, jd, job.created_at))
+        return job
+
+    def get(self, job_id: str) -> Optional[BatchJob]:
+        self._expire()
+        job = self.jobs.get(job_id)
+        if job is None and self.db is not None:
+            job = self._load(job_id)
+        elif job is not None and job.remote:
+            job.refresh()
+        return job
+
+    def _load(self, job_id: str) -> Optional[BatchJob]:
+        rows = self.db.query("SELECT total, jd, created_at, finished_at FROM batch_jobs WHERE id = ?", (job_id,))
+        if not rows:
+            return None
+        job = BatchJob(rows[0][0], rows[0][1], self.db)
+        job.id, job.created_at, job.finished_at = job_id, rows[0][2], rows[0][3]
+        job.remote = True
+        job.refresh()
+        self.jobs[job_id] = job
+        return job
+
+    def _expire(self):
+        cutoff = time.time() - BATCH_JOB_TTL
+        for job_id in [j.id for j in self.jobs.values() if j.finished and j.finished_at < cutoff]:
+            del self.jobs[job_id]
+        if self.db is not None:
+            self.db.execute("DELETE FROM batch_results WHERE job_id IN "
+                            "(SELECT id FROM batch_jobs WHERE finished_at < ?)", (cutoff,))
+            self.db.execute("DELETE FROM batch_jobs WHERE finished_at < ?", (cutoff,))
+
+
+def ndjson_line(data: dict) -> str:
+    return dumps(data) + "\n"
@@ -0,0 +1,148 @@
+"""
+Concurrency benchmark for /analyze against a stub LLM.
+
+Starts bench/stub_llm.py and main.py as subprocesses, fires batches of
+concurrent /analyze uploads and measures wall time plus the latency of the
+`/` health check while the batch is in flight. Every upload is a distinct
+PDF sent with X-Cache-Bypass so caching and coalescing do not hide the
+LLM calls.
+
+With --workers, the app is started through main.py with WEB_CONCURRENCY
+set to each count in turn (the multi-worker mode), and every request opens
+its own connection so the kernel spreads them over the workers.
+
+Usage (from ai-python/):
+    python -m bench.concurrency --latency 1.0 --levels 1 8 32
+    python -m bench.concurrency --latency 0.2 --levels 64 --workers 1 2 4
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from bench.samples import make_pdf
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_server(module: str, port: int, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", module, "--port", str(port), "--log-level", "warning"],
+        cwd=HERE,
+        env={**os.environ, **env},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def start_workers(port: int, workers: int, env: dict, state_dir: str) -> subprocess.Popen:
+    """main.py in its production mode, with its SQLite files in state_dir"""
+    env = {**os.environ, **env, "WEB_CONCURRENCY": str(workers), "PORT": str(port)}
+    if workers > 1:
+        env["PROMETHEUS_MULTIPROC_DIR"] = os.path.join(state_dir, "metrics")
+    return subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "main.py")],
+        cwd=state_dir,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_ready(url: str, timeout: float = 20.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+async def run_level(base_url: str, concurrency: int, fresh_connections: bool = False) -> dict:
+    pdfs = [make_pdf(pages=2, variant=i) for i in range(concurrency)]
+    headers = {"Connection": "close"} if fresh_connections else {}
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, headers=headers) as client:
+
+        async def one(pdf: bytes):
+            r = await client.post(
+                "/analyze",
+                files={"file": ("resume.pdf", pdf, "application/pdf")},
+                headers={"X-Cache-Bypass": "1"},
+            )
+            return r.status_code
+
+        async def probe():
+            await asyncio.sleep(0.05)
+            t0 = time.perf_counter()
+            await client.get("/")
+            return time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        results = await asyncio.gather(probe(), *[one(pdf) for pdf in pdfs])
+        wall = time.perf_counter() - t0
+    statuses = results[1:]
+    return {
+        "concurrency": concurrency,
+        "ok": sum(1 for s in statuses if s == 200),
+        "wall_s": round(wall, 3),
+        "rps": round(concurrency / wall, 2),
+        "health_ms": round(results[0] * 1000, 1),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=1.0)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--stub-port", type=int, default=5901)
+    parser.add_argument("--app-port", type=int, default=5902)
+    parser.add_argument("--workers", type=int, nargs="+", help="compare these WEB_CONCURRENCY values")
+    args = parser.parse_args()
+
+    stub = start_server("bench.stub_llm:app", args.stub_port, {"STUB_LATENCY": str(args.latency)})
+    env = {"GROQ_API_KEY": "stub", "GROQ_BASE_URL": f"http://127.0.0.1:{args.stub_port}"}
+    if args.workers:
+        try:
+            await wait_ready(f"http://127.0.0.1:{args.stub_port}/docs")
+            print(f"stub latency {args.latency}s, {os.cpu_count()} cores")
+            for workers in args.workers:
+                with tempfile.TemporaryDirectory() as state_dir:
+                    app = start_workers(args.app_port, workers, env, state_dir)
+                    try:
+                        await wait_ready(f"http://127.0.0.1:{args.app_port}/ready", timeout=60)
+                        for level in args.levels:
+                            result = await run_level(f"http://127.0.0.1:{args.app_port}", level, True)
+                            print({"workers": workers, **result})
+                    finally:
+                        app.terminate()
+                        app.wait()
+        finally:
+            stub.terminate()
+        return
+
+    app = start_server("main:app", args.app_port, env)
+    try:
+        await wait_ready(f"http://127.0.0.1:{args.stub_port}/docs")
+        await wait_ready(f"http://127.0.0.1:{args.app_port}/")
+        print(f"stub latency {args.latency}s")
+        for level in args.levels:
+            print(await run_level(f"http://127.0.0.1:{args.app_port}", level))
+        async with httpx.AsyncClient() as client:
+            stats = (await client.get(f"http://127.0.0.1:{args.app_port}/stats/clients")).json()
+        print("analysis client:", stats["clients"]["analysis"])
+    finally:
+        app.terminate()
+        stub.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
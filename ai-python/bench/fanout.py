@@ -0,0 +1,100 @@
+"""
+Single-call vs fan-out /analyze latency against the stub LLM.
+
+The stub charges STUB_LATENCY per call plus decode time at --tokens-per-sec,
+so the single 7000-token-budget reply pays for the profile and all three
+projects in sequence while fan-out pays roughly for its largest part.
+Each request uses a distinct PDF with X-Cache-Bypass.
+
+Usage (from ai-python/):
+    python -m bench.fanout --tokens-per-sec 250 --latency 0.3 --requests 5 --concurrency 1
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from bench.concurrency import start_server, wait_ready
+from bench.samples import make_pdf
+
+
+async def run_mode(base_url: str, fanout: bool, requests: int, concurrency: int, stream: bool) -> dict:
+    pdfs = [make_pdf(pages=2, variant=1000 * fanout + i) for i in range(requests)]
+    slots = asyncio.Semaphore(concurrency)
+    latencies, first_event = [], []
+    async with httpx.AsyncClient(base_url=base_url, timeout=600) as client:
+
+        async def one(pdf: bytes):
+            data = {"fanout": str(fanout).lower(), "stream": str(stream).lower()}
+            files = {"file": ("resume.pdf", pdf, "application/pdf")}
+            async with slots:
+                t0 = time.perf_counter()
+                if not stream:
+                    r = await client.post("/analyze", files=files, data=data, headers={"X-Cache-Bypass": "1"})
+                    r.raise_for_status()
+                    assert len(r.json()["recommended_projects"]) == 3
+                else:
+                    first = None
+                    async with client.stream("POST", "/analyze", files=files, data=data,
+                                             headers={"X-Cache-Bypass": "1"}) as r:
+                        async for line in r.aiter_lines():
+                            # First profile payload the UI can render
+                            if first is None and line == "event: candidate_profile":
+                                first = time.perf_counter() - t0
+                    first_event.append(first)
+                latencies.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*[one(pdf) for pdf in pdfs])
+        wall = time.perf_counter() - t0
+
+    result = {
+        "mode": "fanout" if fanout else "single",
+        "requests": requests,
+        "concurrency": concurrency,
+        "mean_s": round(statistics.mean(latencies), 3),
+        "p50_s": round(statistics.median(latencies), 3),
+        "max_s": round(max(latencies), 3),
+        "wall_s": round(wall, 3),
+    }
+    if first_event:
+        result["first_profile_mean_s"] = round(statistics.mean(first_event), 3)
+    return result
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens-per-sec", type=float, default=250.0)
+    parser.add_argument("--latency", type=float, default=0.3, help="per-call overhead / time to first token")
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--stub-port", type=int, default=5901)
+    parser.add_argument("--app-port", type=int, default=5902)
+    args = parser.parse_args()
+
+    stub = start_server("bench.stub_llm:app", args.stub_port, {
+        "STUB_LATENCY": str(args.latency),
+        "STUB_TOKENS_PER_SEC": str(args.tokens_per_sec),
+    })
+    app = start_server("main:app", args.app_port, {
+        "GROQ_API_KEY": "stub",
+        "GROQ_BASE_URL": f"http://127.0.0.1:{args.stub_port}",
+    })
+    try:
+        await wait_ready(f"http://127.0.0.1:{args.stub_port}/docs")
+        await wait_ready(f"http://127.0.0.1:{args.app_port}/")
+        print(f"stub: {args.latency}s per call + decode at {args.tokens_per_sec:.0f} tokens/s")
+        base_url = f"http://127.0.0.1:{args.app_port}"
+        for fanout in (False, True):
+            print(await run_mode(base_url, fanout, args.requests, args.concurrency, args.stream))
+    finally:
+        app.terminate()
+        stub.terminate()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
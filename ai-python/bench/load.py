@@ -0,0 +1,263 @@
+"""
+Load test for the three user-facing endpoints against the stub LLM, with
+results saved as JSON so runs can be compared between versions.
+
+Starts bench/stub_llm.py and main.py as subprocesses, then runs each
+scenario as a closed loop: --concurrency virtual users send --requests
+requests in total, each starting its next request as soon as the last one
+returns.
+
+  analyze           POST /analyze with a synthetic resume (bench.samples corpus)
+  analyze-linkedin  POST /analyze-linkedin with a synthetic LinkedIn export
+  chat              POST /chat-with-mentor; each user keeps one session going
+
+Uploads are unique PDFs of varying size sent with X-Cache-Bypass, so the
+result cache and coalescing do not hide the LLM calls. The stub's knobs
+(--latency, --tokens-per-sec, --rate-429, --bad-json-rate) are passed
+through, so the same run can measure retries and JSON repair under load.
+
+Each scenario reports p50/p95/p99 latency, RPS, errors and the app
+process's resident memory (start and peak, sampled from /proc, so Linux
+only). --out writes the run, including the service's per-model calls,
+latency and cost (/stats/models); --baseline compares it with an earlier run
+and exits non-zero when a latency, throughput, error or memory figure got
+worse by more than --tolerance.
+
+Usage (from ai-python/):
+    python -m bench.load --requests 200 --concurrency 16 --out results/$(git rev-parse --short HEAD).json
+    python -m bench.load --rate-429 0.05 --bad-json-rate 0.1 --baseline results/main.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+from bench.concurrency import HERE, start_server, wait_ready
+from bench.samples import make_corpus
+
+SCENARIOS = ("analyze", "analyze-linkedin", "chat")
+
+# figure -> True when higher is better; the rest are lower-is-better
+COMPARED = {"p50_ms": False, "p95_ms": False, "p99_ms": False, "rps": True, "error_rate": False,
+            "rss_peak_mb": False}
+
+CHAT_MESSAGES = [
+    "What should I build next to get a backend role?",
+    "How do I show Kafka experience without a job that used it?",
+    "Which of my projects should go first on the resume?",
+    "How do I prepare for a system design round?",
+]
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def git_version() -> str:
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def sample_memory(pid: int, samples: List[float]):
+    while True:
+        rss = rss_mb(pid)
+        if rss is not None:
+            samples.append(rss)
+        await asyncio.sleep(0.05)
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, requests: int, concurrency: int,
+                       max_pages: int, app_pid: int) -> dict:
+    kind = "linkedin" if name == "analyze-linkedin" else "resume"
+    corpus = make_corpus(kind, requests, max_pages, seed=SCENARIOS.index(name)) if name != "chat" else []
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    issued = 0
+
+    async def send(i: int, session: dict) -> str:
+        """'ok' or a short error label"""
+        if name == "chat":
+            body = {"message": CHAT_MESSAGES[i % len(CHAT_MESSAGES)], **session}
+            r = await client.post("/chat-with-mentor", json=body)
+            data = r.json() if r.status_code == 200 else {}
+            if "session_id" not in data:
+                return str(r.status_code) if r.status_code != 200 else "reply_error"
+            session["session_id"] = data["session_id"]
+            return "ok"
+        filename, pdf = corpus[i]
+        r = await client.post(
+            "/analyze" if name == "analyze" else "/analyze-linkedin",
+            files={"file": (filename, pdf, "application/pdf")},
+            headers={"X-Cache-Bypass": "1"},
+        )
+        if r.status_code != 200:
+            return str(r.status_code)
+        return "status_error" if r.json().get("status") == "error" else "ok"
+
+    async def user():
+        nonlocal issued
+        session: dict = {}
+        while issued < requests:
+            i = issued
+            issued += 1
+            t0 = time.perf_counter()
+            try:
+                outcome = await send(i, session)
+            except httpx.HTTPError as e:
+                outcome = type(e).__name__
+            latencies.append(time.perf_counter() - t0)
+            if outcome != "ok":
+                errors[outcome] = errors.get(outcome, 0) + 1
+
+    memory: List[float] = []
+    sampler = asyncio.create_task(sample_memory(app_pid, memory))
+    rss_start = rss_mb(app_pid)
+    t0 = time.perf_counter()
+    await asyncio.gather(*[user() for _ in range(concurrency)])
+    wall = time.perf_counter() - t0
+    sampler.cancel()
+
+    ordered = sorted(latencies)
+    failed = sum(errors.values())
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "ok": requests - failed,
+        "errors": errors,
+        "error_rate": round(failed / requests, 4),
+        "wall_s": round(wall, 3),
+        "rps": round(requests / wall, 2),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 1),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 1),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 1),
+        "max_ms": round(ordered[-1] * 1000, 1),
+        "rss_start_mb": rss_start,
+        "rss_peak_mb": max(memory) if memory else None,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Print figure-by-figure changes; returns the regressions"""
+    regressions = []
+    print(f"baseline {baseline.get('version', '?')} -> current {current['version']}")
+    changed = sorted(key for key, value in current["config"].items()
+                     if not key.endswith("_port") and baseline.get("config", {}).get(key) != value)
+    if changed:
+        print(f"  note: run settings differ ({', '.join(changed)}); the figures are not like for like")
+    for name, now in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            print(f"  {name}: not in baseline")
+            continue
+        for figure, higher_is_better in COMPARED.items():
+            old, new = before.get(figure), now.get(figure)
+            if old is None or new is None:
+                continue
+            if figure == "error_rate":
+                # Rates near zero make relative changes meaningless; compare percentage points
+                worse = new - old > tolerance / 10
+                change = f"{(new - old) * 100:+.1f} pp"
+            else:
+                delta = (new - old) / old if old else 0.0
+                worse = -delta > tolerance if higher_is_better else delta > tolerance
+                change = f"{delta:+.1%}"
+            flag = "  REGRESSION" if worse else ""
+            print(f"  {name:17} {figure:12} {old:>10} -> {new:>10} ({change}){flag}")
+            if worse:
+                regressions.append(f"{name} {figure}")
+    return regressions
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=100, help="per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-pages", type=int, default=4, help="uploads are 1..max-pages pages")
+    parser.add_argument("--latency", type=float, default=0.5, help="stub seconds per call")
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0, help="stub decode speed; 0 = instant")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of stub calls answered 429")
+    parser.add_argument("--bad-json-rate", type=float, default=0.0, help="fraction of stub JSON replies damaged")
+    parser.add_argument("--stub-port", type=int, default=5901)
+    parser.add_argument("--app-port", type=int, default=5902)
+    parser.add_argument("--out", help="write the results as JSON here")
+    parser.add_argument("--baseline", help="earlier --out file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative change before failing")
+    args = parser.parse_args()
+
+    config = {key: value for key, value in vars(args).items() if key not in ("out", "baseline", "tolerance")}
+    stub = start_server("bench.stub_llm:app", args.stub_port, {
+        "STUB_LATENCY": str(args.latency),
+        "STUB_TOKENS_PER_SEC": str(args.tokens_per_sec),
+        "STUB_429_RATE": str(args.rate_429),
+        "STUB_BAD_JSON_RATE": str(args.bad_json_rate),
+    })
+    app = start_server("main:app", args.app_port, {
+        "GROQ_API_KEY": "stub",
+        "GROQ_BASE_URL": f"http://127.0.0.1:{args.stub_port}",
+    })
+    base_url = f"http://127.0.0.1:{args.app_port}"
+    try:
+        await wait_ready(f"http://127.0.0.1:{args.stub_port}/docs")
+        await wait_ready(f"{base_url}/ready", timeout=60)
+        results = {
+            "version": git_version(),
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "cores": os.cpu_count(),
+            "config": config,
+            "scenarios": {},
+        }
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, timeout=600, limits=limits) as client:
+            for name in args.scenarios:
+                result = await run_scenario(client, name, args.requests, args.concurrency, args.max_pages, app.pid)
+                results["scenarios"][name] = result
+                print({"scenario": name, **result})
+            results["parsing"] = (await client.get("/stats/parsing")).json()
+            results["models"] = (await client.get("/stats/models")).json()["models"]
+    finally:
+        app.terminate()
+        stub.terminate()
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {args.out}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,44 @@
+"""
+/match ranking speed: index N synthetic resumes, then rank them against a JD.
+
+Usage (from ai-python/):
+    python -m bench.match --resumes 500 5000
+"""
+
+import argparse
+import random
+import time
+
+from bench.skills import make_resume
+from matching import ResumeIndex
+
+JD = ("Backend engineer to build event-driven microservices. Must have Java or Kotlin, Spring Boot, "
+      "Kafka, PostgreSQL and Redis; Kubernetes (k8s), Docker and AWS in production; CI/CD with "
+      "GitHub Actions. Nice to have: Grafana, Prometheus, Terraform.")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resumes", type=int, nargs="+", default=[500, 5000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    for count in args.resumes:
+        index = ResumeIndex(max_docs=count)
+        corpus = [make_resume(rng) for _ in range(count)]
+        t0 = time.perf_counter()
+        for i, text in enumerate(corpus):
+            index.add(f"resume-{i}.pdf", f"{text}\nref {i}")
+        build = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            ranked = index.rank(JD)
+        rank_ms = (time.perf_counter() - t0) / args.repeat * 1000
+        print(f"{count:>6} resumes: index {build:.2f}s ({count / build:.0f}/s), "
+              f"rank {rank_ms:.1f} ms, top score {ranked[0][1]:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+JSON stage: how many damaged replies repair and re-ask recover, what that
+saves over regenerating, and orjson vs stdlib json on a full analysis.
+
+Replies are the stub's resume analysis, cut off at a random point or
+given trailing commas (bench.stub_llm.damage). Re-asks are answered with
+the requested keys of the full reply, as a well-behaved model would.
+
+Usage (from ai-python/):
+    python -m bench.parsing --replies 2000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+
+from bench.stub_llm import RESUME_REPLY, damage
+from fastjson import dumps, loads
+from preprocess import estimate_tokens
+from schemas import ResumeAnalysis
+from structured import StructuredParser
+
+
+def time_per_call(fn, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1e6
+
+
+async def run(replies: int):
+    random.seed(3)
+    logging.disable(logging.WARNING)
+    full = json.dumps(RESUME_REPLY, indent=2)
+    parser = StructuredParser()
+
+    async def reask(extra):
+        wanted = [key.strip('" ') for key in
+                  extra[-1]["content"].split("ONLY the keys", 1)[1].split(", following")[0].split(",")]
+        return json.dumps({key: RESUME_REPLY[key] for key in wanted if key in RESUME_REPLY})
+
+    damaged = [damage(full) for _ in range(replies)]
+    t0 = time.perf_counter()
+    for reply in damaged:
+        await parser.parse(reply, ResumeAnalysis, reask)
+    elapsed = time.perf_counter() - t0
+    stats = parser.snapshot()
+    regenerate = replies * estimate_tokens(full)
+    spent = stats["reask_tokens"]
+    print(f"{replies} damaged replies in {elapsed:.2f}s ({elapsed / replies * 1000:.2f} ms each)")
+    print(f"  repaired {stats['repaired']}, re-asked {stats['reasked']}, failed {stats['failed']}")
+    print(f"  completion tokens: full regeneration {regenerate}, re-asks {spent} "
+          f"-> saved {regenerate - spent} ({(regenerate - spent) / regenerate:.0%})")
+
+    compact = dumps(RESUME_REPLY)
+    print(f"dumps ({len(compact)} B): json {time_per_call(lambda: json.dumps(RESUME_REPLY), 2000):.1f} us, "
+          f"orjson {time_per_call(lambda: dumps(RESUME_REPLY), 2000):.1f} us")
+    print(f"loads: json {time_per_call(lambda: json.loads(compact), 2000):.1f} us, "
+          f"orjson {time_per_call(lambda: loads(compact), 2000):.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--replies", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.replies))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+PDF extraction benchmark over a synthetic corpus.
+
+Times every installed backend on PDFs of increasing page count, both
+reading the whole document and stopping at the /analyze character budget.
+
+Usage (from ai-python/):
+    python -m bench.pdf_extract --pages 1 5 20 60 --repeat 5
+"""
+
+import argparse
+import time
+
+from bench.samples import make_pdf
+from pdf_extract import available_backends, extract_text
+
+
+def time_extract(pdf: bytes, backend: str, max_chars, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        extract_text(pdf, max_chars=max_chars, max_pages=0, backend=backend)
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 5, 20, 60])
+    parser.add_argument("--budget", type=int, default=7000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = {pages: make_pdf(pages=pages) for pages in args.pages}
+    print(f"{'backend':<10} {'pages':>5} {'full ms':>9} {'budget ms':>10} {'speedup':>8}")
+    for backend in available_backends():
+        for pages, pdf in corpus.items():
+            full = time_extract(pdf, backend, None, args.repeat)
+            budget = time_extract(pdf, backend, args.budget, args.repeat)
+            print(f"{backend:<10} {pages:>5} {full:>9.1f} {budget:>10.1f} {full / budget:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Synthetic PDF fixtures for the benchmark scripts.
+
+Builds minimal, valid single-font PDFs by hand so the benchmarks need no
+extra dependencies beyond what main.py already uses. make_corpus() varies
+page count and density so a load test sees a spread of upload sizes;
+`python -m bench.samples --out corpus/` writes such a corpus to disk.
+"""
+
+import argparse
+import os
+import random
+from typing import List, Sequence, Tuple
+
+RESUME_LINES = [
+    "Jane Doe - Backend Engineer",
+    "jane.doe@example.com | linkedin.com/in/janedoe | github.com/janedoe",
+    "SKILLS: Java, Spring Boot, Python, FastAPI, PostgreSQL, Docker, Git, Jira",
+    "EXPERIENCE: Built REST services handling 2k requests per second.",
+    "PROJECTS: Career planner using React, Redis and Kafka with JUnit tests.",
+    "EDUCATION: B.Tech Computer Science, 2021 - 2025",
+]
+
+# Text as LinkedIn's "Save to PDF" export lays it out
+LINKEDIN_LINES = [
+    "Contact: jane.doe@example.com | www.linkedin.com/in/janedoe | github.com/janedoe",
+    "Top Skills: Spring Boot, Apache Kafka, PostgreSQL",
+    "Jane Doe - Backend Engineer | Java & Spring Boot | Building reliable APIs",
+    "Summary: Backend engineer who enjoys making slow services fast.",
+    "Experience: Software Engineer at Acme Corp, Jun 2023 - Present (2 years)",
+    "Education: B.Tech Computer Science, Example Institute of Technology, 2019 - 2023",
+    "Certifications: AWS Certified Cloud Practitioner",
+]
+
+CORPUS_LINES = {"resume": RESUME_LINES, "linkedin": LINKEDIN_LINES}
+
+
+def _escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages: int = 1, lines_per_page: int = 40, variant: int = 0,
+             lines: Sequence[str] = RESUME_LINES) -> bytes:
+    """Return PDF bytes with `pages` pages of resume-like text; `variant` makes the text unique"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page_no in range(pages):
+        body = ["BT /F1 10 Tf 40 800 Td 12 TL"]
+        for i in range(lines_per_page):
+            line = f"{lines[i % len(lines)]} (page {page_no + 1}, line {i + 1}, v{variant})"
+            body.append(f"({_escape(line)}) '")
+        body.append("ET")
+        stream = "\n".join(body).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), len(kids)
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def make_corpus(kind: str = "resume", count: int = 20, max_pages: int = 4, seed: int = 0) -> List[Tuple[str, bytes]]:
+    """(filename, PDF) pairs of 1..max_pages pages and 15-50 lines per page, each with unique text"""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        pages, density = rng.randint(1, max_pages), rng.randint(15, 50)
+        pdf = make_pdf(pages=pages, lines_per_page=density, variant=seed * 100000 + i, lines=CORPUS_LINES[kind])
+        corpus.append((f"{kind}-{i:04d}-{pages}p.pdf", pdf))
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", required=True, help="directory to write the PDFs to")
+    parser.add_argument("--kind", choices=sorted(CORPUS_LINES), nargs="+", default=sorted(CORPUS_LINES))
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--max-pages", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for kind in args.kind:
+        corpus = make_corpus(kind, args.count, args.max_pages, args.seed)
+        for name, pdf in corpus:
+            with open(os.path.join(args.out, name), "wb") as f:
+                f.write(pdf)
+        print(f"{kind}: {len(corpus)} PDFs, {sum(len(pdf) for _, pdf in corpus) // 1024} KiB in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Skill extractor throughput.
+
+Matches the taxonomy against synthetic resumes of a realistic length
+(about one page of text each) and reports resumes per second, plus the
+per-resume cost when PDF extraction is included.
+
+Usage (from ai-python/):
+    python -m bench.skills --resumes 2000
+"""
+
+import argparse
+import random
+import time
+
+from bench.samples import RESUME_LINES, make_pdf
+from skills import SKILL_TAXONOMY, extract_pdf_skills, extract_skills
+
+FILLER = ("Led a team of four", "improved latency by 35%", "worked closely with product",
+          "owned the on-call rotation", "mentored two interns", "shipped weekly releases")
+
+
+def make_resume(rng: random.Random, lines: int = 45) -> str:
+    aliases = [alias for skills in SKILL_TAXONOMY.values() for names in skills.values() for alias in names]
+    body = list(RESUME_LINES)
+    for _ in range(lines - len(body)):
+        body.append(f"{rng.choice(FILLER)} using {rng.choice(aliases)} and {rng.choice(aliases)}, {rng.choice(FILLER)}.")
+    return "\n".join(body)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--resumes", type=int, default=2000)
+    parser.add_argument("--pdfs", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    corpus = [make_resume(rng) for _ in range(args.resumes)]
+    t0 = time.perf_counter()
+    found = sum(len(extract_skills(text)) for text in corpus)
+    elapsed = time.perf_counter() - t0
+    avg_chars = sum(map(len, corpus)) / len(corpus)
+    print(f"text: {args.resumes} resumes (~{avg_chars:.0f} chars) in {elapsed:.2f}s "
+          f"-> {args.resumes / elapsed:.0f} resumes/s, {found / args.resumes:.1f} skills each")
+
+    pdfs = [make_pdf(pages=2, variant=i) for i in range(args.pdfs)]
+    t0 = time.perf_counter()
+    for pdf in pdfs:
+        extract_pdf_skills(pdf, 24000)
+    elapsed = time.perf_counter() - t0
+    print(f"pdf:  {args.pdfs} two-page PDFs in {elapsed:.2f}s -> {elapsed / args.pdfs * 1000:.1f} ms each")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Local stand-in for the Groq chat completions API.
+
+Point main.py at it with GROQ_BASE_URL=http://127.0.0.1:<port> and any
+non-empty GROQ_API_KEY. STUB_LATENCY (seconds) controls how long each
+completion takes; streamed completions spread that time over their chunks.
+STUB_TOKENS_PER_SEC adds decode time proportional to the reply length
+(~4 chars per token), so long single-shot replies cost more than short
+fan-out parts, as they do on a real model. STUB_429_RATE (0-1) makes that
+fraction of calls fail with a 429 carrying `retry-after: STUB_RETRY_AFTER`.
+STUB_BAD_JSON_RATE (0-1) damages that fraction of JSON replies: cut off
+mid-way as if max_tokens ran out, or given trailing commas.
+
+To exercise model routing, STUB_MODEL_LATENCY ("model=seconds,...")
+overrides STUB_LATENCY per model, and STUB_429_MODELS (comma-separated)
+limits the 429s to those models.
+
+JSON replies follow the prompt's schema: a full resume analysis, the
+profile-only part, a single project (fan-out mode) or a LinkedIn audit. A
+follow-up asking for "ONLY the keys ..." gets just those keys of the full
+reply. Mentor chat gets a few sentences of plain text.
+"""
+
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+STUB_LATENCY = float(os.getenv("STUB_LATENCY", "1.0"))
+STUB_STREAM_CHUNK = int(os.getenv("STUB_STREAM_CHUNK", "16"))
+STUB_TOKENS_PER_SEC = float(os.getenv("STUB_TOKENS_PER_SEC", "0"))
+STUB_429_RATE = float(os.getenv("STUB_429_RATE", "0"))
+STUB_RETRY_AFTER = os.getenv("STUB_RETRY_AFTER", "1")
+STUB_BAD_JSON_RATE = float(os.getenv("STUB_BAD_JSON_RATE", "0"))
+STUB_MODEL_LATENCY = {model.strip(): float(seconds) for model, seconds in
+                      (pair.split("=", 1) for pair in os.getenv("STUB_MODEL_LATENCY", "").split(",") if "=" in pair)}
+STUB_429_MODELS = {model.strip() for model in os.getenv("STUB_429_MODELS", "").split(",") if model.strip()}
+
+PROFILE_REPLY = {
+    "candidate_profile": {
+        "name": "Jane Doe",
+        "total_score": 72,
+        "market_fit_level": "Interview Ready",
+        "current_skills": ["Java", "Spring Boot", "Docker"],
+        "missing_skills": ["Kubernetes", "AWS", "Kafka", "Redis"],
+    },
+    "radar_chart_data": [{"skill": skill, "userScore": 60, "marketScore": 90}
+                         for skill in ("Problem Solving", "Backend", "Cloud", "Data", "Testing")],
+}
+
+
+def project_reply(project_type: str) -> dict:
+    return {
+        "type": project_type,
+        "title": f"{project_type} Order Platform",
+        "tagline": "Event-driven order processing with observability built in",
+        "description": " ".join(
+            f"Sentence {i} explains how Kafka consumers, a Spring Boot API and PostgreSQL fit together "
+            f"to process orders reliably under load." for i in range(4)
+        ),
+        "system_architecture": "API gateway -> Spring Boot services -> Kafka -> PostgreSQL, Redis cache, "
+                               "Prometheus and Grafana for metrics, deployed on Kubernetes.",
+        "tech_stack": [{"name": name, "usage": f"{name} usage in the platform", "icon": name}
+                       for name in ("Java", "Kafka", "PostgreSQL", "Redis", "Docker", "Kubernetes")],
+        "learning_milestones": [{"week": week, "task": f"Week {week}: build and test the next service slice "
+                                                       f"with integration tests and load tests."}
+                                for week in range(1, 7)],
+        "mock_interview_questions": [f"Scenario {i}: a consumer falls behind during a traffic spike; "
+                                     f"how do you detect it and keep orders flowing?" for i in range(1, 9)],
+    }
+
+
+PROJECT_TYPES = ("Gap Filler", "Strength Builder", "Showstopper")
+RESUME_REPLY = {
+    "status": "success",
+    **PROFILE_REPLY,
+    "recommended_projects": [project_reply(t) for t in PROJECT_TYPES],
+}
+
+
+def linkedin_section(score: int) -> dict:
+    return {"status": "good" if score >= 7 else "needs_improvement", "score": score,
+            "current": "Assessment of the current section",
+            "recommendation": "Specific, actionable change with an example of the improved wording."}
+
+
+LINKEDIN_REPLY = {
+    "status": "success",
+    "overall_score": 6.9,
+    "professionalism_score": 7.3,
+    "completeness_score": 6.3,
+    "optimization_score": 6.7,
+    **{section: linkedin_section(score) for section, score in (
+        ("custom_url", 8), ("github_link", 6), ("professional_email", 7), ("profile_header", 7),
+        ("summary", 6), ("education", 8), ("certifications", 4), ("skills_section", 7))},
+    "priority_actions": [{"title": f"Action {i}", "impact": "High",
+                          "description": "Step-by-step instructions for the change and where to make it."}
+                         for i in range(1, 4)],
+}
+
+MENTOR_REPLY = " ".join(
+    f"Point {i}: pick one backend project, ship it end to end and write down what you measured." for i in range(1, 5)
+)
+
+
+def json_reply(prompt: str) -> dict:
+    if '"professional_email"' in prompt:
+        return LINKEDIN_REPLY
+    if '"recommended_projects"' in prompt:
+        return RESUME_REPLY
+    if '"project"' in prompt:
+        project_type = next((t for t in PROJECT_TYPES if f'"{t}"' in prompt), PROJECT_TYPES[0])
+        return {"project": project_reply(project_type)}
+    if '"candidate_profile"' in prompt:
+        return PROFILE_REPLY
+    return RESUME_REPLY
+
+
+def reask_reply(messages: list) -> dict:
+    """Only the keys a re-ask names, taken from the reply to the original prompt"""
+    full = json_reply(messages[1]["content"] if len(messages) > 1 else "")
+    wanted = re.findall(r'"(\w+)"', messages[-1]["content"].split("ONLY the keys", 1)[1].split(", following")[0])
+    return {key: full[key] for key in wanted if key in full}
+
+
+def damage(content: str) -> str:
+    if random.random() < 0.5:
+        return content[:random.randint(len(content) // 3, len(content) - 2)]
+    return re.sub(r'([}\]"])(\s*[}\]])', r"\1,\2", content)
+
+
+def latency_for(body: dict) -> float:
+    return STUB_MODEL_LATENCY.get(body.get("model"), STUB_LATENCY)
+
+
+def decode_seconds(content: str) -> float:
+    return len(content) / 4 / STUB_TOKENS_PER_SEC if STUB_TOKENS_PER_SEC > 0 else 0.0
+
+app = FastAPI(title="Stub Groq")
+
+
+async def stream_chunks(body: dict, content: str):
+    pieces = [content[i:i + STUB_STREAM_CHUNK] for i in range(0, len(content), STUB_STREAM_CHUNK)]
+    delay = (latency_for(body) + decode_seconds(content)) / max(len(pieces), 1)
+    base = {"id": f"chatcmpl-{uuid.uuid4().hex}", "object": "chat.completion.chunk",
+            "created": int(time.time()), "model": body.get("model", "stub")}
+    for piece in pieces:
+        await asyncio.sleep(delay)
+        chunk = {**base, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+        yield f"data: {json.dumps(chunk)}\n\n"
+    done = {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "x_groq": {"id": base["id"], "usage": {"prompt_tokens": 100, "completion_tokens": len(pieces),
+                                                   "total_tokens": 100 + len(pieces)}}}
+    yield f"data: {json.dumps(done)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    if random.random() < STUB_429_RATE and (not STUB_429_MODELS or body.get("model") in STUB_429_MODELS):
+        return JSONResponse(
+            status_code=429,
+            content={"error": {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}},
+            headers={"retry-after": STUB_RETRY_AFTER},
+        )
+    wants_json = (body.get("response_format") or {}).get("type") == "json_object"
+    messages = body.get("messages") or []
+    prompt = messages[-1]["content"] if messages else ""
+    if not wants_json:
+        content = MENTOR_REPLY
+    elif "ONLY the keys" in prompt:
+        content = json.dumps(reask_reply(messages))
+    else:
+        content = json.dumps(json_reply(prompt))
+        if random.random() < STUB_BAD_JSON_RATE:
+            content = damage(content)
+    if body.get("stream"):
+        return StreamingResponse(stream_chunks(body, content), media_type="text/event-stream")
+    await asyncio.sleep(latency_for(body) + decode_seconds(content))
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 100, "completion_tokens": len(content) // 4, "total_tokens": 100 + len(content) // 4},
+    }
+
+
+@app.get("/openai/v1/models")
+async def list_models():
+    """What GroqPool.warm_up() calls to open its connections"""
+    return {"object": "list", "data": [{"id": model, "object": "model", "owned_by": "stub"}
+                                       for model in ("llama-3.3-70b-versatile", "llama-3.1-8b-instant")]}
@@ -0,0 +1,186 @@
+"""
+Content-addressed cache for analysis results.
+
+Results are keyed by a hash of the extracted PDF text plus everything else
+that changes the answer (endpoint, job description, prompt version), so the
+same resume uploaded twice costs one LLM call.
+
+Two tiers:
+  - memory: LRU with TTL, bounded by entry count and total JSON bytes
+  - disk:   optional SQLite file (RESULT_CACHE_DB) that survives restarts
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from fastjson import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", str(24 * 3600)))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "512"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESULT_CACHE_DB = os.getenv("RESULT_CACHE_DB", "")
+
+
+def make_cache_key(endpoint: str, text: str, jd: Optional[str] = None, prompt_version: str = "1") -> str:
+    """sha256 over every input that affects the LLM output"""
+    h = hashlib.sha256()
+    for part in (endpoint, prompt_version, (jd or "").strip(), text):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def wants_bypass(headers) -> bool:
+    """`X-Cache-Bypass: 1` or `Cache-Control: no-cache` skips the cache lookup"""
+    if headers.get("x-cache-bypass", "").lower() in ("1", "true", "yes"):
+        return True
+    return "no-cache" in headers.get("cache-control", "").lower()
+
+
+class MemoryTier:
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, Tuple[float, int, str]]" = OrderedDict()
+        self.bytes = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, size, payload = entry
+        if expires_at < time.time():
+            self._drop(key)
+            return None
+        self.entries.move_to_end(key)
+        return payload
+
+    def set(self, key: str, payload: str, expires_at: float):
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self._drop(key)
+        self.entries[key] = (expires_at, size, payload)
+        self.bytes += size
+        while self.entries and (len(self.entries) > self.max_entries or self.bytes > self.max_bytes):
+            oldest = next(iter(self.entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def _drop(self, key: str):
+        _, size, _ = self.entries.pop(key)
+        self.bytes -= size
+
+
+class DiskTier:
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, expires_at REAL, payload TEXT)"
+        )
+
+    def get(self, key: str) -> Optional[Tuple[float, str]]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT expires_at, payload FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row and row[0] < time.time():
+                self.conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+        return row
+
+    def set(self, key: str, payload: str, expires_at: float):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results (key, expires_at, payload) VALUES (?, ?, ?)",
+                (key, expires_at, payload),
+            )
+
+    def purge_expired(self) -> int:
+        with self.lock:
+            return self.conn.execute("DELETE FROM results WHERE expires_at < ?", (time.time(),)).rowcount
+
+    def count(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES, max_bytes: int = RESULT_CACHE_MAX_BYTES,
+                 ttl: float = RESULT_CACHE_TTL, db_path: str = RESULT_CACHE_DB):
+        self.ttl = ttl
+        self.memory = MemoryTier(max_entries, max_bytes, ttl)
+        self.disk: Optional[DiskTier] = None
+        if db_path:
+            try:
+                self.disk = DiskTier(db_path)
+                removed = self.disk.purge_expired()
+                logger.info(f"💾 Result cache on disk: {db_path} ({removed} expired entries purged)")
+            except sqlite3.Error as e:
+                logger.error(f"Result cache disk tier disabled: {e}")
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypassed": 0, "stores": 0}
+
+    def get(self, key: str) -> Optional[dict]:
+        payload = self.memory.get(key)
+        if payload is not None:
+            self.counters["memory_hits"] += 1
+            return loads(payload)
+        if self.disk:
+            row = self.disk.get(key)
+            if row:
+                expires_at, payload = row
+                self.memory.set(key, payload, expires_at)
+                self.counters["disk_hits"] += 1
+                return loads(payload)
+        self.counters["misses"] += 1
+        return None
+
+    def set(self, key: str, result: dict):
+        # Error payloads are never cached so a retry gets a fresh LLM call
+        if not isinstance(result, dict) or result.get("status") == "error":
+            return
+        payload = dumps(result)
+        expires_at = time.time() + self.ttl
+        self.memory.set(key, payload, expires_at)
+        if self.disk:
+            self.disk.set(key, payload, expires_at)
+        self.counters["stores"] += 1
+
+    def record_bypass(self):
+        self.counters["bypassed"] += 1
+
+    def close(self):
+        if self.disk:
+            self.disk.close()
+
+    def snapshot(self) -> dict:
+        hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+        lookups = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self.memory.entries),
+            "memory_bytes": self.memory.bytes,
+            "memory_evictions": self.memory.evictions,
+            "disk_enabled": self.disk is not None,
+            "disk_entries": self.disk.count() if self.disk else 0,
+            "ttl_s": self.ttl,
+        }
@@ -0,0 +1,26 @@
+"""
+orjson-backed JSON helpers.
+
+Analysis results are 10-30 KB of nested JSON, serialized on every
+response, cache write, SSE event and NDJSON line. orjson does that several
+times faster than the stdlib encoder and emits compact UTF-8 directly.
+`JSONResponse` is a drop-in for FastAPI's, rendering through orjson.
+"""
+
+import orjson
+from fastapi.responses import JSONResponse as _JSONResponse
+
+JSONDecodeError = orjson.JSONDecodeError
+
+
+def dumps(data) -> str:
+    return orjson.dumps(data).decode("utf-8")
+
+
+def loads(data):
+    return orjson.loads(data)
+
+
+class JSONResponse(_JSONResponse):
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
@@ -0,0 +1,491 @@
+"""
+Asynchronous analysis jobs.
+
+With `job=true`, /analyze and /analyze-linkedin return 202 and a job ID
+as soon as the PDF text is extracted. A fixed pool of JOB_WORKERS workers
+runs the LLM calls. Callers fetch the result with GET /jobs/{id}, which
+can long-poll with `?wait=`, and/or receive it as a POST to the job's
+callback_url. Either way no HTTP connection (or servlet thread) is held
+for the length of a 70B completion.
+
+Jobs are kept in memory unless JOB_DB names a SQLite file (multi-worker
+mode sets one). With a file, jobs that were queued or interrupted mid-run
+go back on the queue on startup, and undelivered callbacks are retried.
+The extracted resume text is dropped as soon as a job finishes, and
+finished jobs are purged JOB_TTL seconds later.
+
+Several server workers can share one JOB_DB. A worker takes a job (or a
+callback) with a conditional UPDATE that only one of them can win, and
+stamps it with its pid. Every JOB_SWEEP_INTERVAL seconds, each worker
+picks up jobs that have waited that long and jobs whose owner process
+died. On shutdown a worker stops taking jobs, gives running ones a grace
+period to finish, and hands back the rest as queued.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+from fastjson import dumps, loads
+from metrics import (
+    JOB_CALLBACKS,
+    JOB_QUEUE_DEPTH,
+    JOB_RUN_SECONDS,
+    JOB_WAIT_SECONDS,
+    JOB_WORKER_BUSY_SECONDS,
+    JOB_WORKERS,
+    JOB_WORKERS_BUSY,
+    JOBS_TOTAL,
+    current_endpoint,
+)
+from ratelimit import RateLimitExceeded
+from shared_state import connect
+
+logger = logging.getLogger(__name__)
+
+# SQLite file that keeps jobs across restarts; "" keeps them in memory only (lost on restart)
+JOB_DB = os.getenv("JOB_DB", "")
+JOB_WORKERS_COUNT = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "1000"))
+JOB_TTL = float(os.getenv("JOB_TTL", str(24 * 3600)))
+# Attempts per job; rate-limited attempts are retried after the limiter's retry-after
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_CALLBACK_RETRIES = int(os.getenv("JOB_CALLBACK_RETRIES", "5"))
+JOB_CALLBACK_TIMEOUT = float(os.getenv("JOB_CALLBACK_TIMEOUT", "10"))
+# When set, callbacks carry X-Signature: sha256=<HMAC of the body>
+JOB_CALLBACK_SECRET = os.getenv("JOB_CALLBACK_SECRET", "")
+# Comma-separated hosts callbacks may target; empty allows any host that resolves to public addresses
+JOB_CALLBACK_HOSTS = {h.strip().lower() for h in os.getenv("JOB_CALLBACK_HOSTS", "").split(",") if h.strip()}
+JOB_SWEEP_INTERVAL = float(os.getenv("JOB_SWEEP_INTERVAL", "15"))
+# How often a long-poll re-reads a job another worker is running
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+
+FINISHED = ("succeeded", "failed")
+
+# (kind, text, params) -> result dict; {"status": "error"} results fail the job
+JobHandler = Callable[[str, str, dict], Awaitable[dict]]
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+def pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def blocked_address(address: str) -> bool:
+    """Loopback, private, link-local and other non-public addresses a callback must not reach"""
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return not ip.is_global or ip.is_multicast
+
+
+def resolve_callback(url: str) -> Tuple[Optional[str], Optional[str]]:
+    """(problem, address): why url cannot be used as a callback, or the checked address to send it to.
+
+    Hosts outside JOB_CALLBACK_HOSTS are resolved, and rejected if any address
+    is not public, so a job cannot be used to POST into the internal network.
+    The address is None for allow-listed hosts, which are trusted as they are.
+    Resolves DNS, so call it off the event loop.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        return "callback_url must be an absolute http(s) URL", None
+    host = parsed.hostname.lower()
+    if JOB_CALLBACK_HOSTS:
+        return (None if host in JOB_CALLBACK_HOSTS else f"callback_url host {parsed.hostname} is not allowed"), None
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)}
+    except (socket.gaierror, UnicodeError, ValueError):
+        return f"callback_url host {parsed.hostname} does not resolve", None
+    if not addresses or any(blocked_address(address) for address in addresses):
+        return f"callback_url host {parsed.hostname} is not a public address", None
+    # IPv4 first: it is the one most likely to be routable from here
+    return None, min(addresses, key=lambda address: (":" in address, address))
+
+
+def callback_url_error(url: str) -> Optional[str]:
+    """Why url cannot be used as a callback, or None if it can"""
+    return resolve_callback(url)[0]
+
+
+def pinned_request(url: str, address: Optional[str]) -> Tuple[str, dict, dict]:
+    """(url, headers, extensions) that connect to the checked address instead of resolving the host again.
+
+    The Host header and the TLS server name (certificate check included) stay those of
+    the original host, so a DNS answer that changes after the check cannot redirect the POST.
+    """
+    if address is None:
+        return url, {}, {}
+    original = httpx.URL(url)
+    pinned = original.copy_with(host=address.split("%", 1)[0])
+    return str(pinned), {"Host": original.netloc.decode("ascii")}, {"sni_hostname": original.host}
+
+
+class JobStore:
+    COLUMNS = ("id", "kind", "status", "params", "input", "callback_url", "callback_status", "attempts",
+               "result", "error", "created_at", "queued_at", "started_at", "finished_at", "owner")
+
+    def __init__(self, path: str):
+        self.lock = threading.Lock()
+        if path:
+            self.conn = connect(path)
+        else:
+            self.conn = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY, kind TEXT, status TEXT, params TEXT, input TEXT,
+                callback_url TEXT, callback_status TEXT, attempts INTEGER DEFAULT 0,
+                result TEXT, error TEXT, created_at REAL, queued_at REAL, started_at REAL, finished_at REAL
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        if "owner" not in {row[1] for row in self.conn.execute("PRAGMA table_info(jobs)")}:
+            # Stores created before jobs had an owning worker
+            self.conn.execute("ALTER TABLE jobs ADD COLUMN owner INTEGER")
+
+    def _row(self, row) -> dict:
+        job = dict(zip(self.COLUMNS, row))
+        job["params"] = loads(job["params"]) if job["params"] else {}
+        job["result"] = loads(job["result"]) if job["result"] else None
+        return job
+
+    def insert(self, job: dict):
+        with self.lock:
+            self.conn.execute(
+                f"INSERT INTO jobs ({', '.join(job)}) VALUES ({', '.join('?' * len(job))})",
+                [dumps(v) if k in ("params", "result") else v for k, v in job.items()],
+            )
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self.lock:
+            row = self.conn.execute(f"SELECT {', '.join(self.COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def update(self, job_id: str, **fields):
+        values = [dumps(v) if k == "result" and v is not None else v for k, v in fields.items()]
+        with self.lock:
+            self.conn.execute(f"UPDATE jobs SET {', '.join(f'{k} = ?' for k in fields)} WHERE id = ?",
+                              [*values, job_id])
+
+    def claim(self, job_id: str, where: str, *args, **fields) -> bool:
+        """Apply fields only if the row still matches `where`; True for the one worker that won"""
+        with self.lock:
+            return self.conn.execute(
+                f"UPDATE jobs SET {', '.join(f'{k} = ?' for k in fields)} WHERE id = ? AND {where}",
+                [*fields.values(), job_id, *args],
+            ).rowcount == 1
+
+    def owned(self, where: str, *args) -> List[tuple]:
+        """(id, owner) of the rows matching where"""
+        with self.lock:
+            return self.conn.execute(f"SELECT id, owner FROM jobs WHERE {where}", args).fetchall()
+
+    def count(self, status: str) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+    def ids(self, where: str, *args) -> List[str]:
+        with self.lock:
+            return [r[0] for r in self.conn.execute(f"SELECT id FROM jobs WHERE {where} ORDER BY created_at", args)]
+
+    def purge(self, finished_before: float) -> int:
+        with self.lock:
+            return self.conn.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND finished_at < ?", (finished_before,)
+            ).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class JobQueue:
+    def __init__(self, path: str = JOB_DB, workers: int = JOB_WORKERS_COUNT, max_queued: int = JOB_QUEUE_MAX):
+        self.path = path
+        self.workers = workers
+        self.max_queued = max_queued
+        self.store: Optional[JobStore] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self.http: Optional[httpx.AsyncClient] = None
+        self.handler: Optional[JobHandler] = None
+        self.busy = 0
+        self.draining = False
+        self.pid = os.getpid()
+        self.tasks = set()
+        # Job IDs in this worker's local queue, so the sweep does not add them twice
+        self.local = set()
+        self.waiters: Dict[str, asyncio.Event] = {}
+        self.stats = {"submitted": 0, "recovered": 0, "retried": 0, "callbacks_delivered": 0, "callbacks_failed": 0}
+
+    def start(self, handler: JobHandler):
+        """Open the store, requeue unfinished jobs and start the workers (needs the running loop)"""
+        self.handler = handler
+        self.draining = False
+        self.store = JobStore(self.path)
+        self.queue = asyncio.Queue()
+        self.http = httpx.AsyncClient(timeout=JOB_CALLBACK_TIMEOUT)
+        purged = self.store.purge(time.time() - JOB_TTL)
+        self._sweep(stale_after=0, startup=True)
+        for _ in range(self.workers):
+            self._spawn(self._work())
+        self._spawn(self._sweep_forever())
+        JOB_WORKERS.set(self.workers)
+        logger.info(f"📬 Job queue: {self.workers} workers, {self.stats['recovered']} jobs recovered, "
+                    f"{purged} expired jobs purged ({self.path or 'in memory'})")
+
+    def _orphaned(self, owner: Optional[int], startup: bool) -> bool:
+        if owner == self.pid:
+            # At startup our own pid in the store is a previous run of this process (e.g. a container restart)
+            return startup
+        return not pid_alive(owner)
+
+    def _sweep(self, stale_after: float, startup: bool = False):
+        """Queue jobs waiting over stale_after seconds and take over work of dead workers"""
+        for job_id, owner in self.store.owned("status = 'running'"):
+            if self._orphaned(owner, startup) and self.store.claim(
+                job_id, "status = 'running' AND owner IS ?", owner, owner=None, status="queued", queued_at=time.time()
+            ):
+                self._enqueue(job_id)
+                self.stats["recovered"] += 1
+        for job_id in self.store.ids("status = 'queued' AND queued_at <= ?", time.time() - stale_after):
+            self._enqueue(job_id)
+        for job_id, owner in self.store.owned("status IN ('succeeded', 'failed') AND callback_status IN "
+                                              "('pending', 'delivering')"):
+            if self._orphaned(owner, startup):
+                self._spawn(self._deliver(job_id, owner))
+        JOB_QUEUE_DEPTH.set(self.store.count("queued"))
+
+    async def _sweep_forever(self):
+        while True:
+            await asyncio.sleep(JOB_SWEEP_INTERVAL)
+            self.store.purge(time.time() - JOB_TTL)
+            if self.path:
+                self._sweep(stale_after=JOB_SWEEP_INTERVAL)
+
+    def _enqueue(self, job_id: str):
+        if job_id not in self.local and not self.draining:
+            self.local.add(job_id)
+            self.queue.put_nowait(job_id)
+
+    async def stop(self, drain_seconds: float = 0.0):
+        """Stop taking jobs, let running ones finish for up to drain_seconds, requeue the rest"""
+        self.draining = True
+        deadline = time.monotonic() + drain_seconds
+        if self.busy:
+            logger.info(f"⏳ Draining {self.busy} running job(s) (up to {drain_seconds:.0f}s)")
+        while self.busy and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.store is not None:
+            handed_back = self.store.owned("status = 'running' AND owner = ?", self.pid)
+            for job_id, _ in handed_back:
+                self.store.claim(job_id, "owner = ?", self.pid, status="queued", owner=None, queued_at=time.time())
+            if handed_back:
+                logger.warning(f"⚠️ {len(handed_back)} unfinished job(s) handed back to the queue")
+        if self.http is not None:
+            await self.http.aclose()
+        if self.store is not None:
+            self.store.close()
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def submit(self, kind: str, text: str, params: dict, callback_url: Optional[str] = None) -> dict:
+        if self.store.count("queued") >= self.max_queued:
+            raise JobQueueFull(f"Job queue is full ({self.max_queued} waiting)")
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex, "kind": kind, "status": "queued", "params": params, "input": text,
+            "callback_url": callback_url, "callback_status": "pending" if callback_url else None,
+            "attempts": 0, "created_at": now, "queued_at": now,
+        }
+        self.store.insert(job)
+        self._enqueue(job["id"])
+        JOB_QUEUE_DEPTH.set(self.store.count("queued"))
+        self.stats["submitted"] += 1
+        return self.public(self.store.get(job["id"]))
+
+    def get(self, job_id: str) -> Optional[dict]:
+        job = self.store.get(job_id)
+        return self.public(job) if job else None
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[dict]:
+        """The job once it finishes, or as it stands after `timeout` seconds"""
+        job = self.get(job_id)
+        if job is None or job["status"] in FINISHED or timeout <= 0:
+            return job
+        event = self.waiters.setdefault(job_id, asyncio.Event())
+        deadline = time.monotonic() + timeout
+        try:
+            # The event fires for jobs run by this worker; jobs on other workers show up in the store
+            while time.monotonic() < deadline:
+                try:
+                    await asyncio.wait_for(event.wait(), min(deadline - time.monotonic(), JOB_POLL_INTERVAL))
+                except asyncio.TimeoutError:
+                    pass
+                job = self.get(job_id)
+                if job is None or job["status"] in FINISHED:
+                    return job
+        finally:
+            self.waiters.pop(job_id, None)
+        return self.get(job_id)
+
+    def public(self, job: dict) -> dict:
+        view = {
+            "job_id": job["id"],
+            "kind": job["kind"],
+            "status": job["status"],
+            "attempts": job["attempts"],
+            "created_at": job["created_at"],
+            "started_at": job["started_at"],
+            "finished_at": job["finished_at"],
+        }
+        if job["callback_url"]:
+            # "delivering" only marks which worker holds the delivery
+            view["callback_status"] = "pending" if job["callback_status"] == "delivering" else job["callback_status"]
+        if job["status"] == "queued":
+            view["queue_depth"] = self.store.count("queued")
+        if job["status"] in FINISHED:
+            view["result"] = job["result"]
+            if job["error"]:
+                view["error"] = job["error"]
+        return view
+
+    async def _work(self):
+        current_endpoint.set("/jobs")
+        while not self.draining:
+            job_id = await self.queue.get()
+            self.local.discard(job_id)
+            job = self.store.get(job_id)
+            if self.draining or job is None or job["status"] != "queued":
+                continue
+            t0 = time.time()
+            attempts = job["attempts"] + 1
+            if not self.store.claim(job_id, "status = 'queued'", status="running", started_at=t0,
+                                    attempts=attempts, owner=self.pid):
+                # Another worker got there first
+                continue
+            self.busy += 1
+            JOB_WORKERS_BUSY.set(self.busy)
+            JOB_QUEUE_DEPTH.set(self.store.count("queued"))
+            JOB_WAIT_SECONDS.observe(max(0.0, t0 - job["queued_at"]))
+            try:
+                await self._run(job, attempts)
+            finally:
+                elapsed = time.time() - t0
+                JOB_RUN_SECONDS.labels(job["kind"]).observe(elapsed)
+                JOB_WORKER_BUSY_SECONDS.inc(elapsed)
+                self.busy -= 1
+                JOB_WORKERS_BUSY.set(self.busy)
+
+    async def _run(self, job: dict, attempts: int):
+        job_id, kind = job["id"], job["kind"]
+        try:
+            result = await self.handler(kind, job["input"], job["params"])
+        except RateLimitExceeded as e:
+            if attempts < JOB_MAX_ATTEMPTS:
+                logger.warning(f"⏳ Job {job_id} rate limited, retrying in {e.retry_after:.1f}s")
+                self.store.update(job_id, status="queued", owner=None, queued_at=time.time() + e.retry_after)
+                asyncio.get_running_loop().call_later(e.retry_after, self._enqueue, job_id)
+                self.stats["retried"] += 1
+                JOBS_TOTAL.labels(kind, "retried").inc()
+                return
+            result = {"status": "error", "message": "AI service is busy, please retry shortly"}
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Job {job_id} failed: {e}")
+            result = {"status": "error", "message": str(e)}
+
+        status = "failed" if result.get("status") == "error" else "succeeded"
+        # The resume text is only needed to run the job; do not keep it next to the result
+        self.store.update(job_id, status=status, result=result, finished_at=time.time(), input=None,
+                          error=result.get("message") if status == "failed" else None,
+                          callback_status="delivering" if job["callback_url"] else None)
+        JOBS_TOTAL.labels(kind, status).inc()
+        logger.info(f"📬 Job {job_id} {status} after {attempts} attempt(s)")
+        event = self.waiters.pop(job_id, None)
+        if event is not None:
+            event.set()
+        if job["callback_url"]:
+            self._spawn(self._deliver(job_id, self.pid))
+
+    async def _deliver(self, job_id: str, owner: Optional[int]):
+        # Claim the delivery so only one worker sends it (a no-op when we already own it)
+        if not self.store.claim(job_id, "owner IS ? AND callback_status IN ('pending', 'delivering')", owner,
+                                owner=self.pid, callback_status="delivering"):
+            return
+        job = self.store.get(job_id)
+        body = dumps(self.public(job)).encode("utf-8")
+        headers = {"Content-Type": "application/json", "X-Job-Id": job_id}
+        if JOB_CALLBACK_SECRET:
+            digest = hmac.new(JOB_CALLBACK_SECRET.encode("utf-8"), body, hashlib.sha256).hexdigest()
+            headers["X-Signature"] = f"sha256={digest}"
+        # Checked again at delivery (the host may resolve somewhere else by now), then sent to that address
+        problem, address = await asyncio.get_running_loop().run_in_executor(None, resolve_callback,
+                                                                            job["callback_url"])
+        url, host_headers, extensions = pinned_request(job["callback_url"], address)
+        for attempt in range(0 if problem else JOB_CALLBACK_RETRIES):
+            try:
+                response = await self.http.post(url, content=body, headers={**headers, **host_headers},
+                                                extensions=extensions)
+                if response.status_code < 300:
+                    self.store.update(job_id, callback_status="delivered")
+                    self.stats["callbacks_delivered"] += 1
+                    JOB_CALLBACKS.labels("delivered").inc()
+                    return
+                problem = f"HTTP {response.status_code}"
+                if response.status_code < 500 and response.status_code not in (408, 429):
+                    break
+            except httpx.HTTPError as e:
+                problem = str(e) or type(e).__name__
+            if attempt + 1 < JOB_CALLBACK_RETRIES:
+                await asyncio.sleep(min(2 ** attempt, 30))
+        logger.warning(f"⚠️ Job {job_id} callback failed: {problem}")
+        self.store.update(job_id, callback_status="failed")
+        self.stats["callbacks_failed"] += 1
+        JOB_CALLBACKS.labels("failed").inc()
+
+    def snapshot(self) -> dict:
+        return {
+            "workers": self.workers,
+            "busy": self.busy,
+            "utilization": round(self.busy / self.workers, 3) if self.workers else 0.0,
+            "pid": self.pid,
+            "draining": self.draining,
+            "queue_depth": self.store.count("queued") if self.store is not None else 0,
+            "max_queued": self.max_queued,
+            "jobs": self.store.counts() if self.store is not None else {},
+            **self.stats,
+        }
@@ -0,0 +1,321 @@
+"""
+Shared Groq clients for the AI service.
+
+One long-lived AsyncGroq client per API key, each backed by its own pooled
+httpx.AsyncClient so connections (and their TLS sessions) are reused across
+requests. Clients are opened on app startup and closed on shutdown.
+
+Every call goes through the key's KeyScheduler (ratelimit.py) first, and
+429s / transient failures are retried here with jittered backoff, so the
+SDK's own retries are off by default. Calls that name a `task` get their
+model from the ModelRouter (routing.py) and move to a smaller model on a
+429 or timeout instead of retrying.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+import httpx
+from groq import APIConnectionError, AsyncGroq, InternalServerError, RateLimitError
+
+from ratelimit import (
+    GROQ_RETRY_ATTEMPTS,
+    PRIORITY_ANALYSIS,
+    PRIORITY_INTERACTIVE,
+    RateLimitExceeded,
+    backoff_delay,
+    parse_retry_after,
+    scheduler_for,
+)
+from metrics import record_llm_call
+from routing import ModelRouter, ModelUnavailable, current_trace
+
+logger = logging.getLogger(__name__)
+
+# Pool / timeout settings (override via env)
+GROQ_POOL_MAX_CONNECTIONS = int(os.getenv("GROQ_POOL_MAX_CONNECTIONS", "100"))
+GROQ_POOL_MAX_KEEPALIVE = int(os.getenv("GROQ_POOL_MAX_KEEPALIVE", "20"))
+GROQ_KEEPALIVE_EXPIRY = float(os.getenv("GROQ_KEEPALIVE_EXPIRY", "60"))
+GROQ_CONNECT_TIMEOUT = float(os.getenv("GROQ_CONNECT_TIMEOUT", "10"))
+GROQ_READ_TIMEOUT = float(os.getenv("GROQ_READ_TIMEOUT", "120"))
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "0"))
+
+
+def estimate_request_tokens(request: dict) -> int:
+    """Rough token cost of a chat request: ~4 chars per prompt token plus the max_tokens reserve"""
+    prompt_chars = sum(len(m.get("content") or "") for m in request.get("messages", []))
+    return prompt_chars // 4 + int(request.get("max_tokens") or 0)
+
+
+class ClientStats:
+    """Per-key counters, including how much time goes into opening connections"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.latency_ms_total = 0.0
+        self.latency_ms_max = 0.0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+        self.connect_ms_total = 0.0
+
+    def as_dict(self) -> dict:
+        avg = self.latency_ms_total / self.requests if self.requests else 0.0
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "avg_latency_ms": round(avg, 1),
+            "max_latency_ms": round(self.latency_ms_max, 1),
+            "connections_opened": self.connections_opened,
+            "tls_handshakes": self.tls_handshakes,
+            "connect_ms_total": round(self.connect_ms_total, 1),
+            # Connection setup cost amortised over every request on this key
+            "connect_ms_per_request": round(self.connect_ms_total / self.requests, 2) if self.requests else 0.0,
+        }
+
+
+class GroqPool:
+    """Holds one AsyncGroq client per named key ("analysis", "linkedin", "chat")"""
+
+    def __init__(self, keys: Dict[str, Optional[str]]):
+        self.keys = keys
+        self.clients: Dict[str, AsyncGroq] = {}
+        self.stats: Dict[str, ClientStats] = {name: ClientStats() for name in keys}
+        self.schedulers = {name: scheduler_for(name) for name in keys}
+        self.router = ModelRouter()
+
+    def _make_trace(self, name: str):
+        stats = self.stats[name]
+        started: Dict[str, float] = {}
+
+        async def trace(event: str, info: dict):
+            # httpcore emits *.started / *.complete pairs for each connection phase
+            if event in ("connection.connect_tcp.started", "connection.start_tls.started"):
+                started[event] = time.perf_counter()
+            elif event == "connection.connect_tcp.complete":
+                stats.connections_opened += 1
+                t0 = started.pop("connection.connect_tcp.started", None)
+                if t0 is not None:
+                    stats.connect_ms_total += (time.perf_counter() - t0) * 1000
+            elif event == "connection.start_tls.complete":
+                stats.tls_handshakes += 1
+                t0 = started.pop("connection.start_tls.started", None)
+                if t0 is not None:
+                    stats.connect_ms_total += (time.perf_counter() - t0) * 1000
+
+        async def on_request(request: httpx.Request):
+            request.extensions["trace"] = trace
+
+        return on_request
+
+    def start(self):
+        if all(name in self.clients for name, key in self.keys.items() if key):
+            return
+        for name, key in self.keys.items():
+            if not key or name in self.clients:
+                continue
+            timeout = httpx.Timeout(GROQ_READ_TIMEOUT, connect=GROQ_CONNECT_TIMEOUT)
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=GROQ_POOL_MAX_CONNECTIONS,
+                    max_keepalive_connections=GROQ_POOL_MAX_KEEPALIVE,
+                    keepalive_expiry=GROQ_KEEPALIVE_EXPIRY,
+                ),
+                timeout=timeout,
+                event_hooks={"request": [self._make_trace(name)]},
+            )
+            self.clients[name] = AsyncGroq(
+                api_key=key,
+                http_client=http_client,
+                timeout=timeout,
+                max_retries=GROQ_MAX_RETRIES,
+            )
+        logger.info(f"🔌 Groq client pool ready: {sorted(self.clients)}")
+
+    async def warm_up(self, timeout: float = 5.0):
+        """Open a connection (TCP + TLS) per key before the first real request needs one"""
+        async def touch(name: str, client: AsyncGroq):
+            try:
+                await asyncio.wait_for(client.models.list(), timeout)
+            except Exception as e:
+                logger.warning(f"⚠️ Groq {name} warmup failed: {e}")
+
+        self.start()
+        await asyncio.gather(*[touch(name, client) for name, client in self.clients.items()])
+
+    async def close(self):
+        for client in self.clients.values():
+            await client.close()
+        self.clients.clear()
+
+    def get(self, name: str) -> AsyncGroq:
+        if name not in self.clients:
+            # Lazily open clients if the app is used without its lifespan (e.g. scripts)
+            self.start()
+        return self.clients[name]
+
+    async def _create(self, name: str, priority: int, reserved: int, kwargs: dict,
+                      timeout: Optional[float] = None, fallback: bool = False):
+        """Schedule and send one completion, retrying 429s and transient failures
+
+        With `fallback`, a 429 or running past `timeout` raises ModelUnavailable
+        so the caller can move to a smaller model instead.
+        """
+        client = self.get(name)
+        scheduler = self.schedulers[name]
+        for attempt in range(GROQ_RETRY_ATTEMPTS + 1):
+            await scheduler.acquire(reserved, priority)
+            try:
+                call = client.chat.completions.create(**kwargs)
+                return await (call if timeout is None else asyncio.wait_for(call, timeout))
+            except asyncio.TimeoutError as e:
+                # The reservation stands: the abandoned reply may still have used the tokens
+                raise ModelUnavailable("timeout") from e
+            except RateLimitError as e:
+                # The request slot is spent, but no tokens were
+                scheduler.settle(reserved, 0)
+                retry_after = parse_retry_after(e.response.headers)
+                if fallback:
+                    # Limits are per model: another one may have room, so leave the key unpenalized
+                    raise ModelUnavailable("rate_limited", retry_after) from e
+                if attempt == GROQ_RETRY_ATTEMPTS:
+                    raise RateLimitExceeded(f"Groq {name} key is rate limited", retry_after or 1.0) from e
+                delay = backoff_delay(attempt, retry_after)
+                scheduler.penalize(delay)
+                logger.warning(f"⚠️ Groq 429 on {name} key, retrying in {delay:.1f}s")
+            except (APIConnectionError, InternalServerError) as e:
+                scheduler.settle(reserved, 0)
+                if attempt == GROQ_RETRY_ATTEMPTS:
+                    raise
+                delay = backoff_delay(attempt)
+                logger.warning(f"⚠️ Groq {name} call failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _routed(self, name: str, priority: int, reserved: int, kwargs: dict,
+                      task: Optional[str], attempt: dict):
+        """_create on each of the task's models in turn; `attempt` ends up describing the one that answered"""
+        if task is None:
+            attempt.update(model=kwargs.get("model"), started=time.perf_counter())
+            return await self._create(name, priority, reserved, kwargs)
+        max_tokens = int(kwargs.get("max_tokens") or 0)
+        plan = self.router.plan(task, reserved - max_tokens, max_tokens)
+        for i, (model, timeout) in enumerate(plan):
+            attempt.update(model=model, started=time.perf_counter())
+            try:
+                response = await self._create(name, priority, reserved, {**kwargs, "model": model},
+                                              timeout, fallback=i < len(plan) - 1)
+            except ModelUnavailable as e:
+                self.router.record(model, task, time.perf_counter() - attempt["started"], e.reason)
+                self.router.record_fallback(task, model, plan[i + 1][0], e)
+                continue
+            trace = current_trace()
+            if trace is not None:
+                trace.models.add(model)
+            return response
+
+    def _record_attempt(self, task: Optional[str], attempt: dict, outcome: str,
+                        prompt_tokens: Optional[int], completion_tokens: Optional[int]):
+        if task is not None and "started" in attempt:
+            self.router.record(attempt["model"], task, time.perf_counter() - attempt["started"], outcome,
+                               prompt_tokens, completion_tokens)
+
+    async def chat(self, name: str, priority: int = PRIORITY_ANALYSIS, task: Optional[str] = None, **kwargs):
+        """chat.completions.create on the named client, with scheduling and latency bookkeeping"""
+        stats = self.stats[name]
+        stats.requests += 1
+        reserved = estimate_request_tokens(kwargs)
+        usage = None
+        outcome = "cancelled"
+        attempt: dict = {}
+        t0 = time.perf_counter()
+        try:
+            completion = await self._routed(name, priority, reserved, kwargs, task, attempt)
+            usage = getattr(completion, "usage", None)
+            self.schedulers[name].settle(reserved, getattr(usage, "total_tokens", None))
+            outcome = "success"
+            return completion
+        except RateLimitExceeded:
+            stats.errors += 1
+            outcome = "rate_limited"
+            raise
+        except Exception:
+            stats.errors += 1
+            outcome = "error"
+            raise
+        finally:
+            elapsed = (time.perf_counter() - t0) * 1000
+            stats.latency_ms_total += elapsed
+            stats.latency_ms_max = max(stats.latency_ms_max, elapsed)
+            record_llm_call(name, elapsed / 1000, outcome,
+                            getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None))
+            self._record_attempt(task, attempt, outcome,
+                                 getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None))
+
+    async def stream_chat(self, name: str, priority: int = PRIORITY_INTERACTIVE, task: Optional[str] = None,
+                          **kwargs):
+        """Streamed chat.completions.create; yields content deltas as they arrive
+
+        Falling back to a smaller model is only possible until the stream has
+        started, i.e. on a 429 or a slow first response.
+        """
+        stats = self.stats[name]
+        stats.requests += 1
+        reserved = estimate_request_tokens(kwargs)
+        prompt_tokens = reserved - int(kwargs.get("max_tokens") or 0)
+        output_chars = 0
+        completion_tokens = None
+        usage = None
+        outcome = "cancelled"
+        attempt: dict = {}
+        t0 = time.perf_counter()
+        try:
+            stream = await self._routed(name, priority, reserved, {**kwargs, "stream": True}, task, attempt)
+            async for chunk in stream:
+                # Groq reports usage on the final chunk under x_groq
+                usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None) or usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    output_chars += len(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+            if usage is None:
+                completion_tokens = output_chars // 4
+            else:
+                prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens
+            self.schedulers[name].settle(reserved, prompt_tokens + completion_tokens)
+            outcome = "success"
+        except RateLimitExceeded:
+            stats.errors += 1
+            outcome = "rate_limited"
+            raise
+        except Exception:
+            stats.errors += 1
+            outcome = "error"
+            raise
+        finally:
+            elapsed = (time.perf_counter() - t0) * 1000
+            stats.latency_ms_total += elapsed
+            stats.latency_ms_max = max(stats.latency_ms_max, elapsed)
+            record_llm_call(name, elapsed / 1000, outcome,
+                            prompt_tokens if completion_tokens is not None else None, completion_tokens)
+            self._record_attempt(task, attempt, outcome,
+                                 prompt_tokens if completion_tokens is not None else None, completion_tokens)
+
+    def scheduler_snapshot(self) -> dict:
+        return {name: scheduler.snapshot() for name, scheduler in self.schedulers.items()}
+
+    def snapshot(self) -> dict:
+        return {
+            "pool": {
+                "max_connections": GROQ_POOL_MAX_CONNECTIONS,
+                "max_keepalive_connections": GROQ_POOL_MAX_KEEPALIVE,
+                "keepalive_expiry_s": GROQ_KEEPALIVE_EXPIRY,
+                "connect_timeout_s": GROQ_CONNECT_TIMEOUT,
+                "read_timeout_s": GROQ_READ_TIMEOUT,
+            },
+            "clients": {
+                name: {"open": name in self.clients, **stats.as_dict()}
+                for name, stats in self.stats.items()
+            },
+        }
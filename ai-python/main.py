@@ -1,24 +1,44 @@
-print("--------------------------------------------------")
-print("🚀 STARTING GROQ TRIPLE KEY: RESUME + LINKEDIN + CHAT")
-print("--------------------------------------------------")
-
 import uvicorn
-from fastapi import FastAPI, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, Form, Request
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import PyPDF2
-import io
-import json
 import os
 import logging
 import re
-from typing import Optional
+import glob
+import math
+import sys
+import tempfile
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from typing import List, Optional, Tuple
 from dotenv import load_dotenv
-from groq import Groq
 
+# Before the local modules below, which read their settings at import time
 load_dotenv()
 
+from llm import GroqPool, estimate_request_tokens
+from ratelimit import PRIORITY_ANALYSIS, PRIORITY_BULK, PRIORITY_INTERACTIVE, RateLimitExceeded
+from cache import ResultCache, make_cache_key, wants_bypass
+from singleflight import SingleFlight
+from streaming import IncrementalJSONParser, iter_result_events, sse_event
+from pdf_extract import PDF_MAX_UPLOAD_BYTES, PDFLimitError, select_backend, upload_too_large, warm_up as warm_up_pdf
+from preprocess import extract_clean_text, extract_prompt_text, fit_to_budget
+from skills import extract_pdf_skills, extract_skills, group_by_category, merge_skills
+from batch import BATCH_MAX_EXTRACTED_BYTES, ArchiveError, BatchJob, BatchRegistry, expand_uploads, ndjson_line
+from matching import ResumeIndex, content_hash
+from sessions import SessionStore, compact_context
+from shared_state import off_loop
+from jobs import JobQueue, JobQueueFull, callback_url_error
+from fastjson import JSONResponse
+from schemas import LinkedInAnalysis, ProfilePart, ProjectPart, ResumeAnalysis
+from structured import StructuredParser
+from routing import set_latency_budget, start_trace
+from metrics import MetricsMiddleware, mark_worker_stopped, observe_stage, render as render_metrics
+
 # Three separate Groq API keys
 GROQ_ANALYSIS_KEY = os.getenv("GROQ_ANALYSIS_KEY") or os.getenv("GROQ_API_KEY")
 GROQ_LINKEDIN_KEY = os.getenv("GROQ_LINKEDIN_KEY") or os.getenv("GROQ_API_KEY")
@@ -27,7 +47,118 @@ GROQ_CHAT_KEY = os.getenv("GROQ_CHAT_KEY") or os.getenv("GROQ_API_KEY")
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="CareerArchitect AI - Triple Engine", version="19.0.0")
+# PDF parsing is CPU-bound, so it runs on a bounded pool instead of the event loop.
+# A process pool sidesteps the GIL; PDF_EXECUTOR=thread keeps everything in-process.
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "4"))
+PDF_EXECUTOR = os.getenv("PDF_EXECUTOR", "process")
+# Seconds one PDF may take before it is given up on (and, in a process pool, its worker killed)
+PDF_EXTRACT_TIMEOUT = float(os.getenv("PDF_EXTRACT_TIMEOUT", "30"))
+
+def make_pdf_executor():
+    if PDF_EXECUTOR == "thread":
+        return ThreadPoolExecutor(max_workers=PDF_WORKERS, thread_name_prefix="pdf")
+    return ProcessPoolExecutor(max_workers=PDF_WORKERS)
+
+def kill_pdf_executor(executor):
+    """Stop a pool now, including a worker stuck on a PDF (threads cannot be killed and are left to finish)"""
+    for process in list((getattr(executor, "_processes", None) or {}).values()):
+        process.kill()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+# Threads / processes start on first use, which warm_up() makes happen at startup
+pdf_executor = make_pdf_executor()
+
+# Raw characters pulled from a PDF; preprocessing then picks what fits the prompt
+PDF_EXTRACT_CHARS = int(os.getenv("PDF_EXTRACT_CHARS", "24000"))
+# Estimated tokens of resume / profile text each prompt may carry
+RESUME_TEXT_TOKENS = int(os.getenv("RESUME_TEXT_TOKENS", "1750"))
+LINKEDIN_TEXT_TOKENS = int(os.getenv("LINKEDIN_TEXT_TOKENS", "2000"))
+# Characters of job description quoted in JD-aware prompts
+JD_MAX_CHARS = int(os.getenv("JD_MAX_CHARS", "3000"))
+
+# One pooled client per key, opened at startup and closed at shutdown
+groq_pool = GroqPool({
+    "analysis": GROQ_ANALYSIS_KEY,
+    "linkedin": GROQ_LINKEDIN_KEY,
+    "chat": GROQ_CHAT_KEY,
+})
+
+# Bump these whenever a prompt changes so stale cached analyses are not served
+RESUME_PROMPT_VERSION = "4"
+RESUME_FANOUT_PROMPT_VERSION = "3"
+LINKEDIN_PROMPT_VERSION = "2"
+
+# Fan-out mode splits /analyze into a profile call plus one call per project, run in parallel.
+# ANALYZE_FANOUT sets the default; the `fanout` form field overrides it per request.
+ANALYZE_FANOUT = os.getenv("ANALYZE_FANOUT", "false").lower() in ("1", "true", "yes")
+
+# Top-level arrays whose elements are streamed one by one in SSE mode
+STREAMED_ITEMS = ("recommended_projects",)
+
+result_cache = ResultCache()
+# Repairs and validates model JSON, re-asking only for missing fields
+json_parser = StructuredParser()
+inflight = SingleFlight()
+
+BATCH_MAX_UPLOAD_BYTES = int(os.getenv("BATCH_MAX_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+batch_registry = BatchRegistry()
+batch_tasks = set()
+
+# Extracted resumes kept for /match, so re-ranking applicants needs no re-extraction
+resume_index = ResumeIndex()
+MATCH_MAX_TOP_K = int(os.getenv("MATCH_MAX_TOP_K", "20"))
+
+# Mentor chat sessions: stored analysis, running summary and a token-windowed history
+chat_sessions = SessionStore()
+
+# Async job mode (job=true): persisted queue drained by a bounded worker pool
+job_queue = JobQueue()
+# Longest GET /jobs/{id}?wait= long-poll, in seconds
+JOB_MAX_WAIT = float(os.getenv("JOB_MAX_WAIT", "30"))
+
+# Open Groq connections at startup (GET /models per key) so the first request skips the handshake
+GROQ_WARMUP = os.getenv("GROQ_WARMUP", "true").lower() in ("1", "true", "yes")
+# On shutdown, how long running batches and jobs get to finish before they are cancelled
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "30"))
+# Not ready until warmed up, and not ready again once draining; see GET /ready
+readiness = {"ready": False, "draining": False}
+
+async def warm_up():
+    """Start the PDF pool processes with the backend imported, and open the Groq client pools"""
+    loop = asyncio.get_running_loop()
+    pids = await asyncio.gather(*[loop.run_in_executor(pdf_executor, warm_up_pdf) for _ in range(PDF_WORKERS)])
+    logger.info(f"📄 PDF backend: {select_backend()} ({PDF_EXECUTOR} pool x{PDF_WORKERS}, "
+                f"{len(set(pids))} warmed)")
+    if GROQ_WARMUP:
+        await groq_pool.warm_up()
+
+async def drain_batches():
+    if batch_tasks:
+        logger.info(f"⏳ Draining {len(batch_tasks)} running batch(es) (up to {SHUTDOWN_DRAIN_SECONDS:.0f}s)")
+        await asyncio.wait(list(batch_tasks), timeout=SHUTDOWN_DRAIN_SECONDS)
+    for task in batch_tasks:
+        task.cancel()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global pdf_executor
+    groq_pool.start()
+    await warm_up()
+    job_queue.start(run_job)
+    readiness.update(ready=True, draining=False)
+    logger.info(f"✅ Worker {os.getpid()} ready")
+    yield
+    readiness["draining"] = True
+    await asyncio.gather(drain_batches(), job_queue.stop(SHUTDOWN_DRAIN_SECONDS))
+    chat_sessions.cancel_tasks()
+    await groq_pool.close()
+    result_cache.close()
+    pdf_executor.shutdown(wait=False)
+    # Unstarted replacement, in case the app is started again in this process (tests, TestClient)
+    pdf_executor = make_pdf_executor()
+    mark_worker_stopped()
+
+app = FastAPI(title="CareerArchitect AI - Triple Engine", version="19.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -35,32 +166,178 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 # ============================================
 # HELPER FUNCTIONS
 # ============================================
 
-def extract_text_from_pdf(file_content: bytes) -> str:
-    try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-        text = "\n".join([page.extract_text() for page in pdf_reader.pages])
-        return text.strip()
-    except Exception as e:
-        logger.error(f"PDF Error: {e}")
+async def read_upload(file: UploadFile, max_bytes: int = PDF_MAX_UPLOAD_BYTES) -> bytes:
+    """Read an upload, refusing anything over max_bytes without buffering it all"""
+    with observe_stage("upload_read"):
+        content = await file.read(max_bytes + 1)
+    if len(content) > max_bytes:
+        raise upload_too_large() if max_bytes == PDF_MAX_UPLOAD_BYTES else PDFLimitError(
+            f"Upload is larger than the {max_bytes / (1024 * 1024):.1f} MB limit"
+        )
+    return content
+
+async def read_batch_uploads(files: List[UploadFile]) -> List[Tuple[str, bytes]]:
+    """Read batch uploads, rejecting the batch as soon as their bytes pass BATCH_MAX_EXTRACTED_BYTES"""
+    uploads = []
+    remaining = BATCH_MAX_EXTRACTED_BYTES
+    for i, f in enumerate(files):
+        # Never read past what the batch has left, so a request buffers at most the total cap
+        limit = min(BATCH_MAX_UPLOAD_BYTES, remaining)
+        try:
+            content = await read_upload(f, limit)
+        except PDFLimitError:
+            if limit < BATCH_MAX_UPLOAD_BYTES:
+                raise ValueError(f"Batch is larger than {BATCH_MAX_EXTRACTED_BYTES} bytes") from None
+            raise
+        remaining -= len(content)
+        uploads.append((f.filename or f"file-{i}.pdf", content))
+    return uploads
+
+def parse_latency_budget(value) -> Optional[float]:
+    """A JSON latency_budget in seconds (None when absent); ValueError for anything but a finite number"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"latency_budget must be a number, not {type(value).__name__}")
+    seconds = float(value)
+    if not math.isfinite(seconds):
+        raise ValueError("latency_budget must be finite")
+    return seconds
+
+def replace_pdf_executor(broken):
+    """Swap in a fresh pool unless another request already replaced `broken`"""
+    global pdf_executor
+    if pdf_executor is broken:
+        logger.warning("♻️ Replacing the PDF pool")
+        kill_pdf_executor(broken)
+        pdf_executor = make_pdf_executor()
+
+async def run_on_pdf_pool(fn, *args):
+    """fn(*args) on the PDF pool, with a timeout and one retry if a worker process died"""
+    loop = asyncio.get_running_loop()
+    for attempt in range(2):
+        executor = pdf_executor
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(executor, fn, *args), PDF_EXTRACT_TIMEOUT)
+        except asyncio.TimeoutError:
+            # The worker is still busy with this PDF; a fresh pool is the only way to get the slot back
+            if isinstance(executor, ProcessPoolExecutor):
+                replace_pdf_executor(executor)
+            raise PDFLimitError(f"PDF took longer than {PDF_EXTRACT_TIMEOUT:.0f}s to extract")
+        except BrokenProcessPool:
+            # A worker crashed (native fault, OOM kill) or the pool was recycled under this request
+            replace_pdf_executor(executor)
+            if attempt:
+                raise
+
+async def extract_text_from_pdf_async(file_content: bytes, max_tokens: int) -> str:
+    """Extract, normalize and budget PDF text on the PDF pool so the event loop stays free"""
+    with observe_stage("pdf_extract"):
+        text, raw_chars = await run_on_pdf_pool(extract_prompt_text, file_content, PDF_EXTRACT_CHARS, max_tokens)
+    if text:
+        logger.info(f"✂️ Prompt text: {raw_chars} -> {len(text)} chars")
+    return text
+
+async def parse_llm_json(raw: str, model, key: str, llm_request: dict, priority: int = PRIORITY_ANALYSIS) -> dict:
+    """Repair and validate a reply against `model`; missing fields are re-asked with the same prompt"""
+    async def reask(extra: List[dict]) -> str:
+        followup = {**llm_request, "messages": llm_request["messages"] + extra}
+        completion = await groq_pool.chat(key, priority=priority, **followup)
+        return completion.choices[0].message.content
+    return await json_parser.parse(raw, model, reask)
+
+def with_current_skills(profile, detected: List[str]):
+    """Turn the model's `additional_skills` into `current_skills` = detected + additional"""
+    if not isinstance(profile, dict):
+        return profile
+    extra = profile.get("additional_skills") or profile.get("current_skills") or []
+    merged = {}
+    for key, value in profile.items():
+        if key in ("additional_skills", "current_skills"):
+            merged.setdefault("current_skills", merge_skills(detected, extra))
+        else:
+            merged[key] = value
+    merged.setdefault("current_skills", merge_skills(detected, extra))
+    return merged
+
+def jd_skill_fit(jd: Optional[str], skills: List[str]) -> Optional[dict]:
+    """Taxonomy skills the JD asks for, split into what the resume shows and lacks"""
+    if not jd or not jd.strip():
+        return None
+    have = {skill.lower() for skill in skills}
+    jd_skills = extract_skills(jd[:JD_MAX_CHARS])
+    return {
+        "jd_skills": jd_skills,
+        "matched_skills": [skill for skill in jd_skills if skill.lower() in have],
+        "missing_skills": [skill for skill in jd_skills if skill.lower() not in have],
+    }
+
+def jd_prompt_section(jd: Optional[str], skills: List[str]) -> str:
+    """Extra instructions + JSON field for JD-aware scoring ("" without a JD)"""
+    fit = jd_skill_fit(jd, skills)
+    if fit is None:
         return ""
+    return f"""
+        **JOB DESCRIPTION FIT:**
+           - The candidate is applying for the job description below. Judge the resume against it.
+           - JD skills the resume shows: {", ".join(fit["matched_skills"]) or "none detected"}
+           - JD skills the resume lacks: {", ".join(fit["missing_skills"]) or "none detected"}
+           - Put the JD's most important gaps first in "missing_skills" and let them drive the "Gap Filler" project.
+           - Add a top-level "jd_match" object to the JSON:
+             "jd_match": {{"match_score": 0-100, "matched_requirements": ["..."], "missing_requirements": ["..."], "summary": "2-3 sentences"}}
 
-def clean_json_response(text: str):
-    try:
-        if "```" in text:
-            text = text.replace("```json", "").replace("```", "")
-        start = text.find('{')
-        end = text.rfind('}')
-        if start == -1 or end == -1: 
-            return {"status": "error", "message": "No JSON found"}
-        return json.loads(text[start:end+1])
-    except Exception as e:
-        logger.error(f"JSON Parse Error: {e}")
-        return {"status": "error", "message": "Invalid JSON format"}
+        JOB DESCRIPTION:
+        {jd.strip()[:JD_MAX_CHARS]}
+        """
+
+def jd_project_hint(jd: Optional[str]) -> str:
+    if not jd or not jd.strip():
+        return ""
+    return ("The candidate is targeting this role; make the project relevant to it:\n        "
+            + jd.strip()[:JD_MAX_CHARS // 2] + "\n")
+
+def fill_current_skills(result: dict, detected: List[str], jd: Optional[str] = None) -> dict:
+    """Post-process a parsed analysis: merged current_skills and, with a JD, the local skill fit"""
+    if isinstance(result.get("candidate_profile"), dict):
+        result["candidate_profile"] = with_current_skills(result["candidate_profile"], detected)
+        fit = jd_skill_fit(jd, detected)
+        if fit is not None:
+            llm_match = result.get("jd_match") if isinstance(result.get("jd_match"), dict) else {}
+            result["jd_match"] = {**llm_match, **fit}
+            result["jd_analysis"] = True
+    return result
+
+def rate_limited_response(e: RateLimitExceeded) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"status": "error", "message": "AI service is busy, please retry shortly"},
+        headers={"Retry-After": str(max(1, int(round(e.retry_after))))},
+    )
+
+def cache_lookup(request: Request, cache_key: str):
+    """Return (cached_result, cache_status); cached_result is None on miss/bypass"""
+    if wants_bypass(request.headers):
+        result_cache.record_bypass()
+        return None, "BYPASS"
+    cached = result_cache.get(cache_key)
+    return cached, ("HIT" if cached is not None else "MISS")
+
+async def coalesced_analysis(cache_key: str, run):
+    """Share one run() among identical concurrent requests and cache its result"""
+    async def run_and_store():
+        trace = start_trace()
+        result = await run()
+        # A smaller stand-in model's answer is served once, not kept for everyone
+        if not trace.downgraded:
+            result_cache.set(cache_key, result)
+        return result
+    return await inflight.do(cache_key, run_and_store)
 
 # ============================================
 # LINKEDIN ANALYSIS HELPERS
@@ -125,31 +402,84 @@ def health_check():
 def health_check_head():
     return {"status": "alive"}
 
+@app.get("/ready")
+def readiness_check():
+    """503 until warmup is done and again once the worker starts draining, for load balancer checks"""
+    if readiness["ready"] and not readiness["draining"]:
+        return {"status": "ready", "pid": os.getpid()}
+    return JSONResponse(status_code=503, content={
+        "status": "draining" if readiness["draining"] else "starting", "pid": os.getpid(),
+    })
+
+@app.get("/stats/cache")
+def cache_stats():
+    """Hit/miss counters and tier sizes for the analysis result cache"""
+    return {**result_cache.snapshot(), "coalescing": inflight.snapshot()}
+
+@app.get("/stats/ratelimit")
+def ratelimit_stats():
+    """Per-key budgets, queue depth, wait times and 429 retries"""
+    return groq_pool.scheduler_snapshot()
+
+@app.get("/stats/clients")
+def client_stats():
+    """Groq client pool settings plus per-key request and connection-setup counters"""
+    return groq_pool.snapshot()
+
+@app.get("/stats/models")
+def model_stats():
+    """Routing table plus per-model calls, latency, tokens, estimated cost and fallbacks"""
+    return groq_pool.router.snapshot()
+
+@app.get("/stats/parsing")
+def parsing_stats():
+    """Model JSON outcomes: clean, repaired, re-asked or failed, plus tokens saved by repair"""
+    return json_parser.snapshot()
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus exposition: per-stage latency, token usage, JSON failures, in-flight requests"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 # ============================================
-# ENDPOINT 1: RESUME ANALYSIS
+# ENDPOINT 0: SKILL EXTRACTION (NO LLM)
 # ============================================
 
-@app.post("/analyze")
-async def analyze_resume(file: UploadFile = File(...), jd: Optional[str] = Form(None)):
-    
-    if not GROQ_ANALYSIS_KEY:
-        return JSONResponse(status_code=503, content={"status": "error", "message": "GROQ_ANALYSIS_KEY missing"})
-
+@app.post("/skills")
+async def detect_skills(file: Optional[UploadFile] = File(None), text: Optional[str] = Form(None)):
+    """Taxonomy match over a resume PDF (or raw text); no Groq call"""
+    if file is None and not text:
+        return JSONResponse(status_code=400, content={"status": "error", "message": "Send a PDF `file` or `text`"})
     try:
-        content = await file.read()
-        text = extract_text_from_pdf(content)
-        if not text:
-            return JSONResponse(status_code=400, content={"status": "error", "message": "Empty or unreadable PDF"})
+        if file is not None:
+            content = await read_upload(file)
+            with observe_stage("pdf_extract"):
+                skills = await run_on_pdf_pool(extract_pdf_skills, content, PDF_EXTRACT_CHARS)
+        else:
+            skills = extract_skills(text[:PDF_EXTRACT_CHARS])
+        return {"status": "success", "skills": skills, "by_category": group_by_category(skills)}
+    except PDFLimitError as e:
+        return JSONResponse(status_code=413, content={"status": "error", "message": str(e)})
+    except Exception as e:
+        logger.error(f"❌ Skill Extraction Error: {e}")
+        return JSONResponse(status_code=500, content={"status": "error", "message": str(e)})
 
-        client = Groq(api_key=GROQ_ANALYSIS_KEY)
-        
-        prompt = """
+# ============================================
+# ENDPOINT 1: RESUME ANALYSIS
+# ============================================
+
+def build_resume_request(text: str, jd: Optional[str] = None, skills: Optional[List[str]] = None) -> dict:
+    """Chat-completion arguments for a full resume analysis"""
+    skills = extract_skills(text) if skills is None else skills
+    detected = ", ".join(skills) or "none"
+    prompt = """
         You are a Senior Engineering Mentor. Analyze this resume with high attention to detail.
         
-        1. **MAXIMUM SKILL DETECTION:**
-           - Extract EVERY technical keyword found (Languages, Frameworks, Libraries, Tools, Databases).
-           - Look inside project descriptions (e.g., if they mention "JUnit", add it).
-           - Do not ignore "secondary" skills like Git, Jira, or Postman; include them!
+        1. **ADDITIONAL SKILLS:**
+           - These skills were already detected in the resume: """ + detected + """
+           - List ONLY technical skills the resume mentions that are NOT in that list (Languages, Frameworks, Libraries, Tools, Databases).
+           - Look inside project descriptions; an empty list is fine.
 
         2. **MISSING SKILLS (Growth Plan):**
            - Identify at least **4 to 6** critical skills they need to acquire to reach the next level.
@@ -170,7 +500,7 @@ async def analyze_resume(file: UploadFile = File(...), jd: Optional[str] = Form(
             "name": "Candidate Name",
             "total_score": 0-100,
             "market_fit_level": "Entry Level" | "Interview Ready" | "High Potential",
-            "current_skills": ["Skill1", "Skill2", "Skill3", "..."],
+            "additional_skills": ["Skill1", "Skill2", "..."],
             "missing_skills": ["Gap1", "Gap2", "Gap3", "Gap4", "Gap5", "Gap6"] 
           },
           "radar_chart_data": [
@@ -213,59 +543,529 @@ async def analyze_resume(file: UploadFile = File(...), jd: Optional[str] = Form(
             }
           ]
         }
-
+        """ + jd_prompt_section(jd, skills) + """
         RESUME TEXT:
-        """ + text[:7000]
+        """ + text
 
-        logger.info("⏳ Analyzing Resume...")
-        
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "You are a detailed Technical Mentor. Output valid JSON with rich content."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3, 
-            max_tokens=7000, 
-            response_format={"type": "json_object"}
-        )
+    return dict(
+        task="resume",
+        messages=[
+            {"role": "system", "content": "You are a detailed Technical Mentor. Output valid JSON with rich content."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.3, 
+        max_tokens=7000, 
+        response_format={"type": "json_object"}
+    )
+
+# Project slots generated by fan-out mode, in response order, with what each one should target
+PROJECT_TYPES = {
+    "Gap Filler": "closes the candidate's most important missing skills",
+    "Strength Builder": "deepens the candidate's strongest existing skills into production-grade work",
+    "Showstopper": "an ambitious, portfolio-defining system combining their strengths with modern industry tech",
+}
+
+def build_profile_request(text: str, jd: Optional[str] = None, skills: Optional[List[str]] = None) -> dict:
+    """Fan-out call 1: candidate profile and radar chart only (short output)"""
+    skills = extract_skills(text) if skills is None else skills
+    detected = ", ".join(skills) or "none"
+    prompt = """
+        You are a Senior Engineering Mentor. Analyze this resume with high attention to detail.
         
-        raw_response = completion.choices[0].message.content
-        result = clean_json_response(raw_response)
+        1. **ADDITIONAL SKILLS:**
+           - These skills were already detected in the resume: """ + detected + """
+           - List ONLY technical skills the resume mentions that are NOT in that list (Languages, Frameworks, Libraries, Tools, Databases).
+           - Look inside project descriptions; an empty list is fine.
+
+        2. **MISSING SKILLS (Growth Plan):**
+           - Identify at least **4 to 6** critical skills they need to acquire to reach the next level.
+           - Focus on modern industry standards (e.g., if they know Java, suggest Spring Cloud, Docker, Kubernetes, AWS).
+
+        3. **DYNAMIC RADAR CHART:**
+           - Generate 5 axes relevant to the candidate's specific domain (e.g., if Embedded -> "Low Level", if Web -> "Frontend").
+           - Always include "Problem Solving".
+
+        REQUIRED JSON STRUCTURE:
+        {
+          "candidate_profile": {
+            "name": "Candidate Name",
+            "total_score": 0-100,
+            "market_fit_level": "Entry Level" | "Interview Ready" | "High Potential",
+            "additional_skills": ["Skill1", "Skill2", "..."],
+            "missing_skills": ["Gap1", "Gap2", "Gap3", "Gap4", "Gap5", "Gap6"] 
+          },
+          "radar_chart_data": [
+            {"skill": "Problem Solving", "userScore": 60, "marketScore": 90},
+            {"skill": "Dynamic Category 1", "userScore": 50, "marketScore": 85},
+            {"skill": "Dynamic Category 2", "userScore": 40, "marketScore": 80},
+            {"skill": "Dynamic Category 3", "userScore": 70, "marketScore": 95},
+            {"skill": "Dynamic Category 4", "userScore": 20, "marketScore": 85}
+          ]
+        }
+        """ + jd_prompt_section(jd, skills) + """
+        RESUME TEXT:
+        """ + text
+
+    return dict(
+        task="resume_profile",
+        messages=[
+            {"role": "system", "content": "You are a detailed Technical Mentor. Output valid JSON."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.3,
+        max_tokens=1200,
+        response_format={"type": "json_object"}
+    )
+
+def build_project_request(text: str, project_type: str, jd: Optional[str] = None) -> dict:
+    """Fan-out calls 2-4: one recommended project of the given type"""
+    prompt = f"""
+        You are a Senior Engineering Mentor. Based on this resume, design ONE "{project_type}" project:
+        a project that {PROJECT_TYPES[project_type]}.
+
+        - **Description:** Must be 3-4 sentences long. Explain the technical "How", the business "Why", and the complexity.
+        - **Questions:** Generate **8** scenario-based interview questions for the project.
+
+        REQUIRED JSON STRUCTURE:
+        {{
+          "project": {{
+            "type": "{project_type}",
+            "title": "Project Title",
+            "tagline": "Compelling tagline",
+            "description": "3-4 sentence detailed technical explanation.",
+            "system_architecture": "Detailed tech breakdown.",
+            "tech_stack": [{{"name": "Tech", "usage": "Usage", "icon": "React"}}],
+            "learning_milestones": [{{"week": 1, "task": "Detailed task..."}}],
+            "mock_interview_questions": ["Q1", "Q2", "Q3", "Q4", "Q5", "Q6", "Q7", "Q8"]
+          }}
+        }}
+        {jd_project_hint(jd)}
+        RESUME TEXT:
+        """ + text
+
+    return dict(
+        task="resume_project",
+        messages=[
+            {"role": "system", "content": "You are a detailed Technical Mentor. Output valid JSON with rich content."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.3,
+        max_tokens=2200,
+        response_format={"type": "json_object"}
+    )
+
+def start_resume_fanout(text: str, jd: Optional[str], priority: int) -> List[asyncio.Task]:
+    """Launch the profile call and one call per project type; task i answers part i"""
+    with observe_stage("prompt_build"):
+        skills = extract_skills(text)
+        llm_requests = [(build_profile_request(text, jd, skills), ProfilePart)]
+        llm_requests += [(build_project_request(text, project_type, jd), ProjectPart) for project_type in PROJECT_TYPES]
+
+    async def part(llm_request: dict, model) -> dict:
+        completion = await groq_pool.chat("analysis", priority=priority, **llm_request)
+        result = await parse_llm_json(completion.choices[0].message.content, model, "analysis", llm_request, priority)
+        return fill_current_skills(result, skills, jd)
+
+    return [asyncio.ensure_future(part(llm_request, model)) for llm_request, model in llm_requests]
+
+def merge_resume_fanout(parts: List[dict]) -> dict:
+    """Assemble fan-out parts into the single-call response schema"""
+    for piece in parts:
+        if piece.get("status") == "error":
+            return piece
+    profile, projects = parts[0], parts[1:]
+    merged = {
+        "status": "success",
+        "candidate_profile": profile.get("candidate_profile", {}),
+        "radar_chart_data": profile.get("radar_chart_data", []),
+        "recommended_projects": [piece.get("project", piece) for piece in projects],
+    }
+    if "jd_match" in profile:
+        merged["jd_match"] = profile["jd_match"]
+        merged["jd_analysis"] = True
+    return merged
+
+async def run_resume_fanout(text: str, jd: Optional[str] = None, priority: int = PRIORITY_ANALYSIS) -> dict:
+    """Fan-out analysis: wall time is roughly the slowest sub-call instead of one long decode"""
+    logger.info("⏳ Analyzing Resume (fan-out)...")
+    tasks = start_resume_fanout(text, jd, priority)
+    try:
+        parts = await asyncio.gather(*tasks)
+    finally:
+        # One failed part fails the analysis; don't leave the others running
+        for task in tasks:
+            task.cancel()
+    return merge_resume_fanout(parts)
+
+async def run_resume_analysis(text: str, jd: Optional[str] = None, priority: int = PRIORITY_ANALYSIS) -> dict:
+    """Single LLM pass over the resume text; callers handle caching"""
+    logger.info("⏳ Analyzing Resume...")
+    
+    with observe_stage("prompt_build"):
+        skills = extract_skills(text)
+        llm_request = build_resume_request(text, jd, skills)
+    completion = await groq_pool.chat("analysis", priority=priority, **llm_request)
+    
+    raw_response = completion.choices[0].message.content
+    result = await parse_llm_json(raw_response, ResumeAnalysis, "analysis", llm_request, priority)
+    return fill_current_skills(result, skills, jd)
+
+async def stream_resume_analysis(cache_key: str, text: str, jd: Optional[str], cached: Optional[dict]):
+    """SSE stream: one event per top-level field, one per project, then `done`"""
+    if cached is not None:
+        for key, index, value in iter_result_events(cached, STREAMED_ITEMS):
+            yield sse_event(value if index is None else {"index": index, "item": value}, key)
+        yield sse_event(cached, "done")
+        return
+
+    yield sse_event({"status": "started"}, "start")
+    parser = IncrementalJSONParser(stream_items=STREAMED_ITEMS)
+    chunks = []
+    sent_keys, sent_items = set(), 0
+    trace = start_trace()
+    try:
+        logger.info("⏳ Streaming Resume Analysis...")
+        with observe_stage("prompt_build"):
+            skills = extract_skills(text)
+            llm_request = build_resume_request(text, jd, skills)
+            # None for a missing or blank JD
+            fit = jd_skill_fit(jd, skills)
+        async for delta in groq_pool.stream_chat("analysis", priority=PRIORITY_ANALYSIS, **llm_request):
+            chunks.append(delta)
+            for key, index, value in parser.feed(delta):
+                if key == "candidate_profile":
+                    value = with_current_skills(value, skills)
+                elif key == "jd_match" and fit:
+                    value = {**(value if isinstance(value, dict) else {}), **fit}
+                if index is None:
+                    sent_keys.add(key)
+                else:
+                    sent_items = index + 1
+                yield sse_event(value if index is None else {"index": index, "item": value}, key)
+        result = await parse_llm_json("".join(chunks), ResumeAnalysis, "analysis", llm_request)
+        result = fill_current_skills(result, skills, jd)
+        if result.get("status") != "error":
+            # Fields that only became usable through repair or a re-ask
+            for key, index, value in iter_result_events(result, STREAMED_ITEMS):
+                if (key not in sent_keys) if index is None else (index >= sent_items):
+                    yield sse_event(value if index is None else {"index": index, "item": value}, key)
+        if not trace.downgraded:
+            result_cache.set(cache_key, result)
+        logger.info("✅ Resume Analysis Stream Complete")
+        yield sse_event(result, "done")
+    except Exception as e:
+        logger.error(f"❌ Resume Analysis Stream Error: {e}")
+        yield sse_event({"status": "error", "message": str(e)}, "error")
+
+async def stream_resume_fanout(cache_key: str, text: str, jd: Optional[str], cached: Optional[dict]):
+    """Fan-out flavour of stream_resume_analysis: events fire as each sub-call finishes"""
+    if cached is not None:
+        async for event in stream_resume_analysis(cache_key, text, jd, cached):
+            yield event
+        return
+
+    yield sse_event({"status": "started"}, "start")
+    trace = start_trace()
+    tasks = start_resume_fanout(text, jd, PRIORITY_ANALYSIS)
+    parts: List[Optional[dict]] = [None] * len(tasks)
+
+    async def indexed(index: int, task: asyncio.Task):
+        return index, await task
+
+    try:
+        logger.info("⏳ Streaming Resume Analysis (fan-out)...")
+        for next_part in asyncio.as_completed([indexed(i, task) for i, task in enumerate(tasks)]):
+            index, piece = await next_part
+            if piece.get("status") == "error":
+                raise ValueError(piece.get("message", "Invalid JSON format"))
+            parts[index] = piece
+            if index == 0:
+                for key in ("candidate_profile", "radar_chart_data", "jd_match"):
+                    if key in piece:
+                        yield sse_event(piece.get(key), key)
+            else:
+                yield sse_event({"index": index - 1, "item": piece.get("project", piece)}, "recommended_projects")
+        result = merge_resume_fanout(parts)
+        if not trace.downgraded:
+            result_cache.set(cache_key, result)
+        logger.info("✅ Resume Analysis Stream Complete")
+        yield sse_event(result, "done")
+    except Exception as e:
+        logger.error(f"❌ Resume Analysis Stream Error: {e}")
+        yield sse_event({"status": "error", "message": str(e)}, "error")
+    finally:
+        for task in tasks:
+            task.cancel()
+
+@app.post("/analyze")
+async def analyze_resume(
+    request: Request,
+    file: UploadFile = File(...),
+    jd: Optional[str] = Form(None),
+    stream: bool = Form(False),
+    fanout: Optional[bool] = Form(None),
+    job: bool = Form(False),
+    callback_url: Optional[str] = Form(None),
+    latency_budget: Optional[float] = Form(None),
+):
+    
+    if not GROQ_ANALYSIS_KEY:
+        return JSONResponse(status_code=503, content={"status": "error", "message": "GROQ_ANALYSIS_KEY missing"})
+    set_latency_budget(latency_budget)
+
+    try:
+        content = await read_upload(file)
+        text = await extract_text_from_pdf_async(content, RESUME_TEXT_TOKENS)
+        if not text:
+            return JSONResponse(status_code=400, content={"status": "error", "message": "Empty or unreadable PDF"})
+
+        fanout = ANALYZE_FANOUT if fanout is None else fanout
+        if job:
+            return await submit_job("analyze", text, {"jd": jd, "fanout": fanout}, callback_url)
+        if fanout:
+            cache_key = make_cache_key("analyze-fanout", text, jd, RESUME_FANOUT_PROMPT_VERSION)
+        else:
+            cache_key = make_cache_key("analyze", text, jd, RESUME_PROMPT_VERSION)
+        cached, cache_status = cache_lookup(request, cache_key)
+        if stream:
+            streamer = stream_resume_fanout if fanout else stream_resume_analysis
+            return StreamingResponse(
+                streamer(cache_key, text, jd, cached),
+                media_type="text/event-stream",
+                headers={"X-Cache": cache_status, "Cache-Control": "no-cache"},
+            )
+        if cached is not None:
+            logger.info("⚡ Resume Analysis served from cache")
+            return JSONResponse(content=cached, headers={"X-Cache": cache_status})
+
+        run = run_resume_fanout if fanout else run_resume_analysis
+        result = await coalesced_analysis(cache_key, lambda: run(text, jd))
         
         logger.info("✅ Resume Analysis Complete")
-        return JSONResponse(content=result)
+        return JSONResponse(content=result, headers={"X-Cache": cache_status})
 
+    except PDFLimitError as e:
+        return JSONResponse(status_code=413, content={"status": "error", "message": str(e)})
+    except RateLimitExceeded as e:
+        logger.warning(f"⏳ Resume Analysis rate limited: {e}")
+        return rate_limited_response(e)
     except Exception as e:
         logger.error(f"❌ Resume Analysis Error: {e}")
         return JSONResponse(status_code=500, content={"status": "error", "message": str(e)})
 
 # ============================================
-# ENDPOINT 2: LINKEDIN PROFILE ANALYSIS
+# ENDPOINT 1b: BATCH RESUME ANALYSIS
 # ============================================
 
-@app.post("/analyze-linkedin")
-async def analyze_linkedin(file: UploadFile = File(...)):
-    
-    if not GROQ_LINKEDIN_KEY:
-        return JSONResponse(status_code=503, content={"status": "error", "message": "GROQ_LINKEDIN_KEY missing"})
-
+async def analyze_batch_file(job: BatchJob, index: int, filename: str, content: Optional[bytes]):
+    """Analyze one file of a batch under the shared batch budget and record its result"""
+    entry = {"index": index, "filename": filename}
     try:
-        content = await file.read()
-        text = extract_text_from_pdf(content)
+        if content is None:
+            raise upload_too_large()
+        text = await extract_text_from_pdf_async(content, RESUME_TEXT_TOKENS)
         if not text:
-            return JSONResponse(status_code=400, content={"status": "error", "message": "Empty or unreadable LinkedIn PDF"})
+            raise ValueError("Empty or unreadable PDF")
 
-        # Pre-extract some data for better analysis
-        linkedin_url = extract_linkedin_url(text)
-        is_custom_url = is_custom_linkedin_url(linkedin_url)
-        email = extract_email(text)
-        is_prof_email = is_professional_email(email)
-        github_url = extract_github_link(text)
-        
-        client = Groq(api_key=GROQ_LINKEDIN_KEY)
-        
-        prompt = f"""
+        cache_key = make_cache_key("analyze", text, job.jd, RESUME_PROMPT_VERSION)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            result = cached
+        else:
+            async def run():
+                async with batch_registry.llm_slots:
+                    await batch_registry.token_budget.acquire(
+                        estimate_request_tokens(build_resume_request(text, job.jd))
+                    )
+                    return await run_resume_analysis(text, job.jd, priority=PRIORITY_BULK)
+            result = await coalesced_analysis(cache_key, run)
+
+        entry["status"] = "error" if result.get("status") == "error" else "success"
+        entry["cached"] = cached is not None
+        entry["result"] = result
+    except Exception as e:
+        logger.error(f"❌ Batch file {filename} failed: {e}")
+        entry.update(status="error", message=str(e))
+    await job.add_result(entry)
+
+async def run_batch(job: BatchJob, files: list):
+    await asyncio.gather(*[
+        analyze_batch_file(job, index, filename, content)
+        for index, (filename, content) in enumerate(files)
+    ])
+    logger.info(f"✅ Batch {job.id} finished ({job.total} files)")
+
+async def stream_batch(job: BatchJob, after: int = 0):
+    """NDJSON: job summary, one line per file as it finishes, then the final summary"""
+    yield ndjson_line({"type": "job", **job.summary()})
+    async for result in job.follow(after):
+        yield ndjson_line({"type": "result", **result})
+    yield ndjson_line({"type": "job", **job.summary()})
+
+@app.post("/analyze/batch")
+async def analyze_batch(
+    files: List[UploadFile] = File(...),
+    jd: Optional[str] = Form(None),
+    stream: bool = Form(True),
+):
+    if not GROQ_ANALYSIS_KEY:
+        return JSONResponse(status_code=503, content={"status": "error", "message": "GROQ_ANALYSIS_KEY missing"})
+
+    try:
+        uploads = await read_batch_uploads(files)
+        loop = asyncio.get_running_loop()
+        expanded = await loop.run_in_executor(None, expand_uploads, uploads, PDF_MAX_UPLOAD_BYTES)
+    except ArchiveError as e:
+        return JSONResponse(status_code=400, content={"status": "error", "message": str(e)})
+    except (PDFLimitError, ValueError) as e:
+        return JSONResponse(status_code=413, content={"status": "error", "message": str(e)})
+    if not expanded:
+        return JSONResponse(status_code=400, content={"status": "error", "message": "No PDF files in batch"})
+
+    job = await off_loop(batch_registry.db, batch_registry.create, len(expanded), jd)
+    task = asyncio.create_task(run_batch(job, expanded))
+    batch_tasks.add(task)
+    task.add_done_callback(batch_tasks.discard)
+    logger.info(f"⏳ Batch {job.id} started ({job.total} files)")
+
+    if stream:
+        return StreamingResponse(stream_batch(job), media_type="application/x-ndjson",
+                                 headers={"X-Job-Id": job.id})
+    return JSONResponse(status_code=202, content=job.summary())
+
+@app.get("/analyze/batch/{job_id}")
+async def get_batch(job_id: str, after: int = 0, stream: bool = False):
+    """Poll a batch (results from index `after`) or, with stream=true, resume its NDJSON feed"""
+    job = await off_loop(batch_registry.db, batch_registry.get, job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"status": "error", "message": "Unknown or expired job"})
+    if stream:
+        return StreamingResponse(stream_batch(job, after), media_type="application/x-ndjson",
+                                 headers={"X-Job-Id": job.id})
+    return {**job.summary(), "results": job.results[after:]}
+
+# ============================================
+# ENDPOINT 1c: RESUME <-> JD MATCHING
+# ============================================
+
+async def index_upload(filename: str, content: Optional[bytes]):
+    """Extract and index one uploaded resume (skipped if these bytes were indexed before)"""
+    if content is None:
+        raise upload_too_large()
+    upload_hash = content_hash(content)
+    doc = await off_loop(resume_index.db, resume_index.lookup_upload, upload_hash)
+    if doc is not None:
+        return doc
+    with observe_stage("pdf_extract"):
+        text = await run_on_pdf_pool(extract_clean_text, content, PDF_EXTRACT_CHARS)
+    if not text:
+        raise ValueError("Empty or unreadable PDF")
+    return await off_loop(resume_index.db, resume_index.add, filename, text, upload_hash)
+
+async def analyze_match(doc, jd: str) -> dict:
+    """JD-aware LLM analysis for one shortlisted resume, sharing /analyze's cache"""
+    text = fit_to_budget(doc.text, RESUME_TEXT_TOKENS)
+    cache_key = make_cache_key("analyze", text, jd, RESUME_PROMPT_VERSION)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    return await coalesced_analysis(cache_key, lambda: run_resume_analysis(text, jd))
+
+@app.post("/match")
+async def match_resumes(
+    jd: str = Form(...),
+    files: Optional[List[UploadFile]] = File(None),
+    resume_ids: Optional[str] = Form(None),
+    top_k: int = Form(5),
+    analyze: bool = Form(True),
+):
+    """Rank resumes against a JD locally (BM25), then run the LLM on the top_k only.
+
+    Candidates are the uploaded PDFs/zips plus any previously indexed `resume_ids`
+    (comma-separated); with neither, the whole index is ranked.
+    """
+    if not jd.strip():
+        return JSONResponse(status_code=400, content={"status": "error", "message": "jd is required"})
+    if analyze and not GROQ_ANALYSIS_KEY:
+        return JSONResponse(status_code=503, content={"status": "error", "message": "GROQ_ANALYSIS_KEY missing"})
+    top_k = max(0, min(top_k, MATCH_MAX_TOP_K))
+
+    try:
+        uploads = await read_batch_uploads(files or [])
+        loop = asyncio.get_running_loop()
+        expanded = await loop.run_in_executor(None, expand_uploads, uploads, PDF_MAX_UPLOAD_BYTES)
+    except ArchiveError as e:
+        return JSONResponse(status_code=400, content={"status": "error", "message": str(e)})
+    except (PDFLimitError, ValueError) as e:
+        return JSONResponse(status_code=413, content={"status": "error", "message": str(e)})
+
+    outcomes = await asyncio.gather(*[index_upload(name, content) for name, content in expanded],
+                                    return_exceptions=True)
+    skipped = [{"filename": name, "message": str(outcome)}
+               for (name, _), outcome in zip(expanded, outcomes) if isinstance(outcome, Exception)]
+    candidate_ids = [doc.id for doc in outcomes if not isinstance(doc, Exception)]
+    requested_ids = [rid.strip() for rid in (resume_ids or "").split(",") if rid.strip()]
+    unknown_ids = [rid for rid in requested_ids if await off_loop(resume_index.db, resume_index.get, rid) is None]
+    candidate_ids += [rid for rid in requested_ids if rid not in unknown_ids]
+    if not candidate_ids and (expanded or requested_ids):
+        return JSONResponse(status_code=400, content={
+            "status": "error", "message": "No readable resumes to rank", "skipped": skipped, "unknown_ids": unknown_ids,
+        })
+
+    with observe_stage("rank"):
+        ranked = await off_loop(resume_index.db, resume_index.rank, jd,
+                                candidate_ids if (expanded or requested_ids) else None)
+    logger.info(f"🏁 Ranked {len(ranked)} resumes against JD (index size {len(resume_index)})")
+
+    shortlist = ranked[:top_k] if analyze else []
+    analyses = await asyncio.gather(*[analyze_match(doc, jd) for doc, _ in shortlist], return_exceptions=True)
+
+    jd_skills = jd_skill_fit(jd, [])["jd_skills"]
+    wanted = {skill.lower() for skill in jd_skills}
+    results = []
+    for rank, (doc, score) in enumerate(ranked, start=1):
+        matched = [skill for skill in doc.skills if skill.lower() in wanted]
+        entry = {
+            "rank": rank,
+            "resume_id": doc.id,
+            "filename": doc.filename,
+            "score": round(score, 3),
+            "skill_coverage": round(len(matched) / len(wanted), 2) if wanted else None,
+            "matched_skills": matched,
+        }
+        if rank <= len(analyses):
+            analysis = analyses[rank - 1]
+            if isinstance(analysis, RateLimitExceeded):
+                entry["analysis"] = {"status": "error", "message": "AI service is busy, please retry shortly"}
+            elif isinstance(analysis, Exception):
+                entry["analysis"] = {"status": "error", "message": str(analysis)}
+            else:
+                entry["analysis"] = analysis
+        results.append(entry)
+
+    return {
+        "status": "success",
+        "jd_skills": jd_skills,
+        "ranked": results,
+        "skipped": skipped,
+        "unknown_ids": unknown_ids,
+        "index_size": len(resume_index),
+    }
+
+# ============================================
+# ENDPOINT 2: LINKEDIN PROFILE ANALYSIS
+# ============================================
+
+def build_linkedin_request(text: str) -> dict:
+    """Chat-completion arguments for a LinkedIn profile audit"""
+    # Pre-extract some data for better analysis
+    linkedin_url = extract_linkedin_url(text)
+    is_custom_url = is_custom_linkedin_url(linkedin_url)
+    email = extract_email(text)
+    is_prof_email = is_professional_email(email)
+    github_url = extract_github_link(text)
+    
+    prompt = f"""
         You are a LinkedIn Profile Optimization Expert and Career Coach. Analyze this LinkedIn profile PDF with extreme attention to professional branding details.
 
         **CRITICAL INSTRUCTION - Email Field:**
@@ -416,27 +1216,67 @@ async def analyze_linkedin(file: UploadFile = File(...)):
         }}
 
         LINKEDIN PROFILE TEXT:
-        """ + text[:8000]
+        """ + text
 
-        logger.info("⏳ Analyzing LinkedIn Profile...")
-        
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "You are a LinkedIn Career Coach and Branding Expert. Provide detailed, actionable feedback. Output valid JSON. ALWAYS use the actual email address in the 'current' field, never write descriptions."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.2, 
-            max_tokens=6000, 
-            response_format={"type": "json_object"}
-        )
-        
-        raw_response = completion.choices[0].message.content
-        result = clean_json_response(raw_response)
+    return dict(
+        task="linkedin",
+        messages=[
+            {"role": "system", "content": "You are a LinkedIn Career Coach and Branding Expert. Provide detailed, actionable feedback. Output valid JSON. ALWAYS use the actual email address in the 'current' field, never write descriptions."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.2, 
+        max_tokens=6000, 
+        response_format={"type": "json_object"}
+    )
+
+async def run_linkedin_analysis(text: str) -> dict:
+    """Single LLM pass over the LinkedIn profile text; callers handle caching"""
+    logger.info("⏳ Analyzing LinkedIn Profile...")
+    
+    with observe_stage("prompt_build"):
+        llm_request = build_linkedin_request(text)
+    completion = await groq_pool.chat("linkedin", **llm_request)
+    
+    raw_response = completion.choices[0].message.content
+    return await parse_llm_json(raw_response, LinkedInAnalysis, "linkedin", llm_request)
+
+@app.post("/analyze-linkedin")
+async def analyze_linkedin(
+    request: Request,
+    file: UploadFile = File(...),
+    job: bool = Form(False),
+    callback_url: Optional[str] = Form(None),
+    latency_budget: Optional[float] = Form(None),
+):
+    
+    if not GROQ_LINKEDIN_KEY:
+        return JSONResponse(status_code=503, content={"status": "error", "message": "GROQ_LINKEDIN_KEY missing"})
+    set_latency_budget(latency_budget)
+
+    try:
+        content = await read_upload(file)
+        text = await extract_text_from_pdf_async(content, LINKEDIN_TEXT_TOKENS)
+        if not text:
+            return JSONResponse(status_code=400, content={"status": "error", "message": "Empty or unreadable LinkedIn PDF"})
+        if job:
+            return await submit_job("analyze-linkedin", text, {}, callback_url)
+
+        cache_key = make_cache_key("analyze-linkedin", text, None, LINKEDIN_PROMPT_VERSION)
+        cached, cache_status = cache_lookup(request, cache_key)
+        if cached is not None:
+            logger.info("⚡ LinkedIn Analysis served from cache")
+            return JSONResponse(content=cached, headers={"X-Cache": cache_status})
+
+        result = await coalesced_analysis(cache_key, lambda: run_linkedin_analysis(text))
         
         logger.info("✅ LinkedIn Analysis Complete")
-        return JSONResponse(content=result)
+        return JSONResponse(content=result, headers={"X-Cache": cache_status})
 
+    except PDFLimitError as e:
+        return JSONResponse(status_code=413, content={"status": "error", "message": str(e)})
+    except RateLimitExceeded as e:
+        logger.warning(f"⏳ LinkedIn Analysis rate limited: {e}")
+        return rate_limited_response(e)
     except Exception as e:
         logger.error(f"❌ LinkedIn Analysis Error: {e}")
         return JSONResponse(status_code=500, content={"status": "error", "message": str(e)})
@@ -445,48 +1285,292 @@ async def analyze_linkedin(file: UploadFile = File(...)):
 # ENDPOINT 3: CHAT WITH MENTOR
 # ============================================
 
+MENTOR_SYSTEM_PROMPT = "You are a helpful Career Mentor AI assistant. Provide detailed, actionable advice about career development, projects, and technical skills."
+
+async def summarize_turns(summary: str, turns: List[dict]) -> str:
+    """Fold older chat turns into the session's running summary (small model, background priority)"""
+    transcript = "\n".join(f"{turn['role'].upper()}: {turn['content']}" for turn in turns)
+    completion = await groq_pool.chat(
+        "chat",
+        priority=PRIORITY_BULK,
+        task="chat_summary",
+        messages=[
+            {"role": "system", "content": "You maintain a running summary of a career-mentoring chat. Keep the user's goals, decisions, advice already given and open questions. Max 150 words, plain text."},
+            {"role": "user", "content": f"Current summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}\n\nUpdated summary:"}
+        ],
+        temperature=0.2,
+        max_tokens=300
+    )
+    return completion.choices[0].message.content.strip()
+
+def chat_session_for(request: dict):
+    """Resolve (or start) the caller's session; returns (session, is_new).
+
+    An unknown or expired `session_id` sent without `context` or `chat_history`
+    returns (None, False): a fresh session would lose the analysis, so the
+    client is told to resend them instead.
+    """
+    session_id = request.get("session_id")
+    session = chat_sessions.get(session_id) if session_id else None
+    context = request.get("context")
+    if session is None:
+        if session_id and not context and not request.get("chat_history"):
+            return None, False
+        session = chat_sessions.create(compact_context(context))
+        # Stateless clients send their own history; keep the part that fits the window
+        for turn in request.get("chat_history") or []:
+            if isinstance(turn, dict) and turn.get("role") in ("user", "assistant") and turn.get("content"):
+                session.add(turn["role"], str(turn["content"]))
+        session.turns = session.window()
+        session.save()
+        return session, True
+    if context:
+        # A new analysis replaces the stored one
+        session.context = compact_context(context)
+        session.save()
+    return session, False
+
+async def stream_chat_reply(session, user_turn: dict, messages: list):
+    """SSE stream of reply tokens: `data: {"delta": ...}` events, then `data: [DONE]`"""
+    chunks = []
+    try:
+        async for delta in groq_pool.stream_chat(
+            "chat",
+            priority=PRIORITY_INTERACTIVE,
+            task="chat",
+            messages=messages,
+            temperature=0.7,
+            max_tokens=1500
+        ):
+            chunks.append(delta)
+            yield sse_event({"delta": delta})
+        await off_loop(chat_sessions.db, session.add, "assistant", "".join(chunks))
+        chat_sessions.schedule_compaction(session, summarize_turns)
+    except Exception as e:
+        logger.error(f"Chat Stream Error: {e}")
+        await off_loop(chat_sessions.db, session.forget, user_turn)
+        yield sse_event({"message": "Sorry, I encountered an error. Please try again."}, "error")
+    yield sse_event("[DONE]")
+
+@app.post("/chat/sessions")
+async def create_chat_session(request: dict):
+    """Start a mentor session, storing the analysis (`context`) once for all later turns"""
+    session = await off_loop(chat_sessions.db, chat_sessions.create, compact_context(request.get("context")))
+    return {"session_id": session.id, **session.snapshot()}
+
+@app.get("/chat/sessions/{session_id}")
+def get_chat_session(session_id: str):
+    session = chat_sessions.get(session_id)
+    if session is None:
+        return JSONResponse(status_code=404, content={"status": "error", "message": "Unknown or expired session"})
+    return session.snapshot()
+
+@app.delete("/chat/sessions/{session_id}")
+def delete_chat_session(session_id: str):
+    return {"deleted": chat_sessions.delete(session_id)}
+
+@app.get("/stats/chat")
+def chat_stats():
+    return chat_sessions.snapshot()
+
 @app.post("/chat-with-mentor")
 async def chat_with_mentor(request: dict):
     if not GROQ_CHAT_KEY:
         return {"reply": "Chat Service Unavailable"}
     
     try:
-        user_message = request.get("message", "")
-        context = request.get("context", "")
-        
-        client = Groq(api_key=GROQ_CHAT_KEY)
-        
-        system_prompt = "You are a helpful Career Mentor AI assistant. Provide detailed, actionable advice about career development, projects, and technical skills."
+        budget = parse_latency_budget(request.get("latency_budget"))
+    except ValueError:
+        return JSONResponse(status_code=400, content={
+            "status": "error", "message": "latency_budget must be a number of seconds"})
+
+    session = user_turn = None
+    try:
+        user_message = request.get("message") or request.get("user_message") or ""
+        set_latency_budget(budget)
+        session, is_new = await off_loop(chat_sessions.db, chat_session_for, request)
+        if session is None:
+            return JSONResponse(status_code=404, content={
+                "status": "error", "message": "Unknown or expired session; resend context and chat_history",
+                "session_expired": True,
+            })
+        # The caller's session was gone and has been rebuilt from what it resent
+        expired = is_new and bool(request.get("session_id"))
+        user_turn = await off_loop(chat_sessions.db, session.add, "user", user_message)
+        messages = session.messages(MENTOR_SYSTEM_PROMPT)
         
-        if context:
-            system_prompt += f"\n\nContext about the user:\n{context[:2000]}"
+        if request.get("stream"):
+            headers = {"Cache-Control": "no-cache", "X-Session-Id": session.id}
+            if expired:
+                headers["X-Session-Expired"] = "1"
+            return StreamingResponse(
+                stream_chat_reply(session, user_turn, messages),
+                media_type="text/event-stream",
+                headers=headers,
+            )
         
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
+        completion = await groq_pool.chat(
+            "chat",
+            priority=PRIORITY_INTERACTIVE,
+            task="chat",
+            messages=messages,
             temperature=0.7,
             max_tokens=1500
         )
         
         reply = completion.choices[0].message.content
-        return {"reply": reply}
+        await off_loop(chat_sessions.db, session.add, "assistant", reply)
+        chat_sessions.schedule_compaction(session, summarize_turns)
+        return {"reply": reply, "session_id": session.id, "session_expired": expired}
         
+    except RateLimitExceeded as e:
+        logger.warning(f"Chat rate limited: {e}")
+        if session is not None:
+            await off_loop(chat_sessions.db, session.forget, user_turn)
+        return {"reply": "I'm handling a lot of questions right now. Please try again in a few seconds."}
     except Exception as e:
         logger.error(f"Chat Error: {e}")
+        if session is not None:
+            await off_loop(chat_sessions.db, session.forget, user_turn)
         return {"reply": "Sorry, I encountered an error. Please try again."}
 
+# ============================================
+# ENDPOINT 4: ASYNC JOBS
+# ============================================
+
+async def run_job(kind: str, text: str, params: dict) -> dict:
+    """Job worker handler: the same cached, coalesced analysis the synchronous endpoints run"""
+    if kind == "analyze-linkedin":
+        cache_key = make_cache_key("analyze-linkedin", text, None, LINKEDIN_PROMPT_VERSION)
+        run = lambda: run_linkedin_analysis(text)
+    else:
+        jd = params.get("jd")
+        if params.get("fanout"):
+            cache_key = make_cache_key("analyze-fanout", text, jd, RESUME_FANOUT_PROMPT_VERSION)
+            run = lambda: run_resume_fanout(text, jd)
+        else:
+            cache_key = make_cache_key("analyze", text, jd, RESUME_PROMPT_VERSION)
+            run = lambda: run_resume_analysis(text, jd)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    return await coalesced_analysis(cache_key, run)
+
+async def submit_job(kind: str, text: str, params: dict, callback_url: Optional[str]) -> JSONResponse:
+    """202 + job ID for a job=true request; the text is already extracted"""
+    if callback_url:
+        problem = await asyncio.get_running_loop().run_in_executor(None, callback_url_error, callback_url)
+        if problem:
+            return JSONResponse(status_code=400, content={"status": "error", "message": problem})
+    try:
+        job = job_queue.submit(kind, text, params, callback_url)
+    except JobQueueFull as e:
+        return JSONResponse(status_code=503, content={"status": "error", "message": str(e)},
+                            headers={"Retry-After": "30"})
+    logger.info(f"📬 Queued {kind} job {job['job_id']}")
+    status_url = f"/jobs/{job['job_id']}"
+    return JSONResponse(status_code=202, content={**job, "status_url": status_url}, headers={"Location": status_url})
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """Job status, with `result` once finished; `wait` long-polls up to JOB_MAX_WAIT seconds"""
+    job = await job_queue.wait(job_id, max(0.0, min(wait, JOB_MAX_WAIT)))
+    if job is None:
+        return JSONResponse(status_code=404, content={"status": "error", "message": "Unknown or expired job"})
+    return job
+
+@app.get("/stats/jobs")
+def job_stats():
+    """Queue depth, worker utilization, jobs per status, retries and callback deliveries"""
+    return job_queue.snapshot()
+
 # ============================================
 # SERVER STARTUP
 # ============================================
 
+# Server processes; "auto" (or 0) starts one per CPU core
+WEB_CONCURRENCY = os.getenv("WEB_CONCURRENCY", "1")
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "5001"))
+
+def cgroup_cpu_limit() -> Optional[float]:
+    """CPUs allowed by the container's CFS quota (cgroup v2, then v1), or None when unlimited"""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    for base in ("/sys/fs/cgroup/cpu", "/sys/fs/cgroup/cpu,cpuacct"):
+        try:
+            with open(os.path.join(base, "cpu.cfs_quota_us")) as f:
+                quota = int(f.read())
+            with open(os.path.join(base, "cpu.cfs_period_us")) as f:
+                period = int(f.read())
+        except (OSError, ValueError):
+            continue
+        return quota / period if quota > 0 and period > 0 else None
+    return None
+
+def available_cpus() -> int:
+    """CPUs this process can actually use: its affinity mask, capped by any cgroup quota.
+
+    os.cpu_count() reports the host's cores, which overcounts inside a container.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        # Not available on macOS/Windows
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        # A 1.5 CPU quota still gets 2 workers: they mostly wait on the LLM
+        cpus = min(cpus, math.ceil(limit))
+    return max(1, cpus)
+
+def worker_count() -> int:
+    if WEB_CONCURRENCY.strip().lower() in ("auto", "0"):
+        return available_cpus()
+    return max(1, int(WEB_CONCURRENCY))
+
+def configure_workers(workers: int):
+    """Defaults that let several worker processes share one host's state (explicit env wins)"""
+    os.environ.setdefault("SHARED_STATE_DB", "shared_state.db")
+    os.environ.setdefault("RESULT_CACHE_DB", "result_cache.db")
+    os.environ.setdefault("JOB_DB", "jobs.db")
+    # Split the cores between the workers' PDF pools instead of starting PDF_WORKERS in each
+    os.environ.setdefault("PDF_WORKERS", str(max(1, available_cpus() // workers)))
+    metrics_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR",
+                                        os.path.join(tempfile.gettempdir(), "careerarchitect-metrics"))
+    os.makedirs(metrics_dir, exist_ok=True)
+    # Files left by a previous run would be added to this run's counters; only ours are removed,
+    # in case the directory is shared or was pointed somewhere it should not be
+    for stale in glob.glob(os.path.join(metrics_dir, "*.db")):
+        try:
+            os.remove(stale)
+        except OSError:
+            pass
+
 if __name__ == "__main__":
+    workers = worker_count()
+    print("--------------------------------------------------")
+    print("🚀 STARTING GROQ TRIPLE KEY: RESUME + LINKEDIN + CHAT")
+    print("--------------------------------------------------")
     print("\n✅ All API Keys Loaded:")
     print(f"   - Resume Analysis: {'✓' if GROQ_ANALYSIS_KEY else '✗'}")
     print(f"   - LinkedIn Analysis: {'✓' if GROQ_LINKEDIN_KEY else '✗'}")
     print(f"   - Chat Service: {'✓' if GROQ_CHAT_KEY else '✗'}")
-    print("\n🚀 Server starting on http://0.0.0.0:5001\n")
-    
-    uvicorn.run(app, host="0.0.0.0", port=5001)
\ No newline at end of file
+    print(f"\n🚀 Server starting on http://{HOST}:{PORT} ({workers} worker{'s' if workers > 1 else ''})\n")
+
+    if workers > 1:
+        configure_workers(workers)
+        # Hand over to the uvicorn CLI rather than uvicorn.run(): its spawned workers (and their PDF
+        # pools) would otherwise re-run this whole script as __mp_main__ before importing main:app
+        os.execvp(sys.executable, [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--app-dir", os.path.dirname(os.path.abspath(__file__)),
+            "--host", HOST, "--port", str(PORT), "--workers", str(workers),
+            "--timeout-graceful-shutdown", str(int(SHUTDOWN_DRAIN_SECONDS)),
+        ])
+    else:
+        uvicorn.run(app, host=HOST, port=PORT, timeout_graceful_shutdown=int(SHUTDOWN_DRAIN_SECONDS))
@@ -0,0 +1,221 @@
+"""
+Resume-to-JD ranking without the LLM.
+
+ResumeIndex keeps previously extracted resumes in memory as BM25 postings.
+Documents are indexed on their words plus one `skill:<name>` term per
+taxonomy skill (skills.py), so a JD asking for "Kubernetes" matches a
+resume that says "k8s". Ranking a JD scores every candidate at once with
+NumPy: the cost is one vectorized update per JD term, not per resume.
+
+Resumes are keyed by a hash of their text, and uploads by a hash of their
+bytes, so re-screening the same applicants skips PDF extraction entirely.
+The oldest resumes are evicted past MATCH_INDEX_MAX_DOCS.
+
+With SHARED_STATE_DB set, every added resume is also appended to a table
+there. Each worker replays rows it has not seen yet before answering, so a
+resume_id returned by one worker can be ranked by any other.
+"""
+
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from shared_state import SharedDB, shared_db
+from skills import extract_skills
+
+MATCH_INDEX_MAX_DOCS = int(os.getenv("MATCH_INDEX_MAX_DOCS", "5000"))
+# Query weight of a JD skill term relative to a plain word
+MATCH_SKILL_WEIGHT = float(os.getenv("MATCH_SKILL_WEIGHT", "2.0"))
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+you your we our us they their he she his her i me my not but if so than then there these those which who
+about above after all also any can could do does each etc into just may more most must new no only other
+should such through under up use used using very what when where while within would
+ability able candidate candidates experience experienced good great hands highly ideal job knowledge
+looking plus preferred required requirements responsibilities role skills strong team understanding
+work working year years
+""".split())
+
+
+def _words(text: str) -> List[str]:
+    return [word for word in _WORD.findall(text.lower()) if word not in STOPWORDS and len(word) > 1]
+
+
+def document_terms(text: str, skills: Optional[List[str]] = None) -> Counter:
+    terms = Counter(_words(text))
+    for skill in extract_skills(text) if skills is None else skills:
+        terms[f"skill:{skill.lower()}"] += 1
+    return terms
+
+
+def text_id(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+class IndexedResume:
+    __slots__ = ("id", "filename", "text", "skills", "terms", "length", "row")
+
+    def __init__(self, resume_id: str, filename: str, text: str, skills: List[str], terms: Counter):
+        self.id = resume_id
+        self.filename = filename
+        self.text = text
+        self.skills = skills
+        self.terms = terms
+        self.length = sum(terms.values())
+        self.row = -1
+
+
+class ResumeIndex:
+    """In-memory BM25 index; rows are append-only and compacted once half are evicted"""
+
+    def __init__(self, max_docs: int = MATCH_INDEX_MAX_DOCS, db: Optional[SharedDB] = None):
+        self.max_docs = max_docs
+        self.docs: "OrderedDict[str, IndexedResume]" = OrderedDict()
+        self.by_upload: Dict[str, str] = {}
+        self._reset_rows()
+        self.db = db if db is not None else shared_db()
+        self.synced = 0
+        # With SHARED_STATE_DB the index is used from threadpool threads (see off_loop)
+        self.lock = threading.RLock()
+        if self.db is not None:
+            self.db.execute("CREATE TABLE IF NOT EXISTS match_resumes "
+                            "(seq INTEGER PRIMARY KEY AUTOINCREMENT, filename TEXT, text TEXT, upload_hash TEXT)")
+
+    def _reset_rows(self):
+        self.rows: List[Optional[IndexedResume]] = []
+        self.lengths: List[int] = []
+        self.postings: Dict[str, tuple] = {}
+        self.df: Counter = Counter()
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def _append_row(self, doc: IndexedResume):
+        doc.row = len(self.rows)
+        self.rows.append(doc)
+        self.lengths.append(doc.length)
+        for term, count in doc.terms.items():
+            rows, counts = self.postings.setdefault(term, ([], []))
+            rows.append(doc.row)
+            counts.append(count)
+            self.df[term] += 1
+
+    def _compact(self):
+        docs = list(self.docs.values())
+        self._reset_rows()
+        for doc in docs:
+            self._append_row(doc)
+
+    def sync(self):
+        """Index resumes other workers added since the last call (no-op without SHARED_STATE_DB)"""
+        if self.db is None:
+            return
+        with self.lock:
+            rows = self.db.query("SELECT seq, filename, text, upload_hash FROM match_resumes WHERE seq > ? "
+                                 "ORDER BY seq", (self.synced,))
+            for seq, filename, text, upload_hash in rows:
+                self._add(filename, text, upload_hash)
+                self.synced = seq
+            if rows:
+                # The table only needs to reach back as far as the index does
+                self.db.execute("DELETE FROM match_resumes WHERE seq <= ?", (self.synced - 2 * self.max_docs,))
+
+    def lookup_upload(self, upload_hash: str) -> Optional[IndexedResume]:
+        with self.lock:
+            self.sync()
+            resume_id = self.by_upload.get(upload_hash)
+            return self.docs.get(resume_id) if resume_id else None
+
+    def get(self, resume_id: str) -> Optional[IndexedResume]:
+        with self.lock:
+            self.sync()
+            return self.docs.get(resume_id)
+
+    def add(self, filename: str, text: str, upload_hash: Optional[str] = None) -> IndexedResume:
+        with self.lock:
+            if self.db is not None:
+                self.db.execute("INSERT INTO match_resumes (filename, text, upload_hash) VALUES (?, ?, ?)",
+                                (filename, text, upload_hash))
+                self.sync()
+            return self._add(filename, text, upload_hash)
+
+    def _add(self, filename: str, text: str, upload_hash: Optional[str] = None) -> IndexedResume:
+        resume_id = text_id(text)
+        doc = self.docs.get(resume_id)
+        if doc is None:
+            skills = extract_skills(text)
+            doc = IndexedResume(resume_id, filename, text, skills, document_terms(text, skills))
+            self.docs[resume_id] = doc
+            self._append_row(doc)
+            self._evict()
+        else:
+            self.docs.move_to_end(resume_id)
+        if upload_hash:
+            self.by_upload[upload_hash] = resume_id
+        return doc
+
+    def _evict(self):
+        while len(self.docs) > self.max_docs:
+            _, doc = self.docs.popitem(last=False)
+            self.rows[doc.row] = None
+            for term in doc.terms:
+                self.df[term] -= 1
+        if len(self.rows) > 2 * max(len(self.docs), 1):
+            self.by_upload = {h: rid for h, rid in self.by_upload.items() if rid in self.docs}
+            self._compact()
+
+    def rank(self, jd: str, resume_ids: Optional[Iterable[str]] = None) -> List[tuple]:
+        """[(doc, score)] best first, over resume_ids (or the whole index)"""
+        with self.lock:
+            return self._rank(jd, resume_ids)
+
+    def _rank(self, jd: str, resume_ids: Optional[Iterable[str]]) -> List[tuple]:
+        self.sync()
+        if not self.docs:
+            return []
+        n_rows = len(self.rows)
+        if resume_ids is None:
+            candidates = np.array([doc.row for doc in self.docs.values()], dtype=np.int64)
+        else:
+            candidates = np.array(sorted({self.docs[r].row for r in resume_ids if r in self.docs}), dtype=np.int64)
+        if candidates.size == 0:
+            return []
+
+        lengths = np.asarray(self.lengths, dtype=np.float64)
+        live = len(self.docs)
+        avg_length = sum(doc.length for doc in self.docs.values()) / live or 1.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / avg_length)
+
+        query = {term: 1.0 for term in _words(jd)}
+        query.update({f"skill:{skill.lower()}": MATCH_SKILL_WEIGHT for skill in extract_skills(jd)})
+
+        scores = np.zeros(n_rows, dtype=np.float64)
+        for term, weight in query.items():
+            posting = self.postings.get(term)
+            df = self.df.get(term, 0)
+            if posting is None or df <= 0:
+                continue
+            idf = math.log(1 + (live - df + 0.5) / (df + 0.5))
+            rows = np.asarray(posting[0], dtype=np.int64)
+            tf = np.asarray(posting[1], dtype=np.float64)
+            scores[rows] += weight * idf * tf * (BM25_K1 + 1) / (tf + norm[rows])
+
+        picked = scores[candidates]
+        order = np.argsort(-picked, kind="stable")
+        return [(self.rows[candidates[i]], float(picked[i])) for i in order]
@@ -0,0 +1,231 @@
+"""
+Prometheus metrics for the AI service, served at GET /metrics.
+
+MetricsMiddleware tags every HTTP request with its route template
+("/analyze", "/analyze/batch/{job_id}", ...) and keeps that name in a
+context variable, so code deeper in the call (PDF extraction, the Groq
+pool, JSON parsing) can label its own metrics by endpoint without the
+name being threaded through every function. Background work started from
+a request (batch files, coalesced analyses) inherits the same label.
+
+With several server workers, PROMETHEUS_MULTIPROC_DIR makes each worker
+write its samples to files there and /metrics aggregates all of them, so
+a scrape sees the whole host whichever worker answers it.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+from starlette.routing import Match
+
+if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    # prometheus_client opens each worker's sample files there as soon as the metrics below exist
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+# Seconds; spans a cached hit (~ms) up to a slow 70B completion
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+REQUEST_SECONDS = Histogram(
+    "careerarchitect_request_seconds",
+    "End-to-end HTTP request time, including streamed bodies",
+    ["endpoint", "method", "status"],
+    buckets=STAGE_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "careerarchitect_requests_in_flight",
+    "HTTP requests currently being handled",
+    ["endpoint"],
+    multiprocess_mode="livesum",
+)
+STAGE_SECONDS = Histogram(
+    "careerarchitect_stage_seconds",
+    "Time spent per pipeline stage (upload_read, pdf_extract, prompt_build, llm, json_parse, rank)",
+    ["endpoint", "stage"],
+    buckets=STAGE_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "careerarchitect_llm_tokens_total",
+    "Tokens reported by Groq `usage` (estimated for streams that omit it)",
+    ["endpoint", "key", "kind"],
+)
+LLM_REQUESTS = Counter(
+    "careerarchitect_llm_requests_total",
+    "Groq completions by outcome",
+    ["endpoint", "key", "outcome"],
+)
+LLM_MODEL_SECONDS = Histogram(
+    "careerarchitect_llm_model_seconds",
+    "Groq call time per model and routing task (routing.py), one sample per model tried",
+    ["model", "task", "outcome"],
+    buckets=STAGE_BUCKETS,
+)
+LLM_COST = Counter(
+    "careerarchitect_llm_cost_usd_total",
+    "Estimated Groq spend from reported tokens and list prices",
+    ["model", "task"],
+)
+LLM_FALLBACKS = Counter(
+    "careerarchitect_llm_fallbacks_total",
+    "Calls moved to a smaller model, by the model given up on and why (rate_limited, timeout)",
+    ["task", "model", "reason"],
+)
+JSON_PARSE_FAILURES = Counter(
+    "careerarchitect_json_parse_failures_total",
+    "Model replies that did not parse or validate on the first try",
+    ["endpoint", "reason"],
+)
+JSON_PARSE_OUTCOMES = Counter(
+    "careerarchitect_json_parse_total",
+    "Model replies by parse outcome (clean, repaired, reasked, unvalidated, failed)",
+    ["endpoint", "outcome"],
+)
+JSON_TOKENS_SAVED = Counter(
+    "careerarchitect_json_repair_tokens_saved_total",
+    "Estimated completion tokens kept by repair / partial re-ask instead of regenerating",
+    ["endpoint"],
+)
+JOB_QUEUE_DEPTH = Gauge(
+    "careerarchitect_job_queue_depth",
+    "Async jobs waiting for a worker",
+    # Every worker reads the same shared count
+    multiprocess_mode="livemax",
+)
+JOB_WORKERS = Gauge(
+    "careerarchitect_job_workers",
+    "Size of the async job worker pool",
+    multiprocess_mode="livesum",
+)
+JOB_WORKERS_BUSY = Gauge(
+    "careerarchitect_job_workers_busy",
+    "Async job workers currently running a job",
+    multiprocess_mode="livesum",
+)
+JOB_WORKER_BUSY_SECONDS = Counter(
+    "careerarchitect_job_worker_busy_seconds_total",
+    "Worker time spent on jobs; rate() / careerarchitect_job_workers is utilization",
+)
+JOB_WAIT_SECONDS = Histogram(
+    "careerarchitect_job_wait_seconds",
+    "Time from submission (or retry) until a worker picks the job up",
+    buckets=STAGE_BUCKETS,
+)
+JOB_RUN_SECONDS = Histogram(
+    "careerarchitect_job_run_seconds",
+    "Time a worker spent on one job attempt",
+    ["kind"],
+    buckets=STAGE_BUCKETS,
+)
+JOBS_TOTAL = Counter(
+    "careerarchitect_jobs_total",
+    "Async job attempts by outcome (succeeded, failed, retried)",
+    ["kind", "outcome"],
+)
+JOB_CALLBACKS = Counter(
+    "careerarchitect_job_callbacks_total",
+    "Webhook deliveries by outcome (delivered, failed)",
+    ["outcome"],
+)
+
+current_endpoint: ContextVar[str] = ContextVar("current_endpoint", default="other")
+
+
+def route_template(scope) -> str:
+    """The matching route's path template, so IDs in URLs do not explode label cardinality"""
+    app = scope.get("app")
+    for route in getattr(app, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "other"
+
+
+@contextmanager
+def observe_stage(stage: str):
+    """Time the enclosed block as `stage` of the current endpoint"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(current_endpoint.get(), stage).observe(time.perf_counter() - t0)
+
+
+def record_llm_call(key: str, seconds: float, outcome: str,
+                    prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None):
+    endpoint = current_endpoint.get()
+    STAGE_SECONDS.labels(endpoint, "llm").observe(seconds)
+    LLM_REQUESTS.labels(endpoint, key, outcome).inc()
+    if prompt_tokens:
+        LLM_TOKENS.labels(endpoint, key, "prompt").inc(prompt_tokens)
+    if completion_tokens:
+        LLM_TOKENS.labels(endpoint, key, "completion").inc(completion_tokens)
+
+
+def record_model_call(model: str, task: str, seconds: float, outcome: str, cost_usd: float = 0.0):
+    LLM_MODEL_SECONDS.labels(model, task, outcome).observe(seconds)
+    if cost_usd:
+        LLM_COST.labels(model, task).inc(cost_usd)
+
+
+def record_model_fallback(task: str, model: str, reason: str):
+    LLM_FALLBACKS.labels(task, model, reason).inc()
+
+
+def record_json_failure(reason: str):
+    JSON_PARSE_FAILURES.labels(current_endpoint.get(), reason).inc()
+
+
+def record_json_parse(outcome: str, tokens_saved: int = 0):
+    endpoint = current_endpoint.get()
+    JSON_PARSE_OUTCOMES.labels(endpoint, outcome).inc()
+    if tokens_saved:
+        JSON_TOKENS_SAVED.labels(endpoint).inc(tokens_saved)
+
+
+def render() -> tuple:
+    """(body, content_type) for the /metrics endpoint"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def mark_worker_stopped():
+    """Drop this worker's live gauges from the multiprocess aggregate"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: in-flight gauge, request histogram, endpoint context"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        endpoint = route_template(scope)
+        token = current_endpoint.set(endpoint)
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.labels(endpoint).inc()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.labels(endpoint).dec()
+            REQUEST_SECONDS.labels(endpoint, scope["method"], str(status["code"])).observe(time.perf_counter() - t0)
+            current_endpoint.reset(token)
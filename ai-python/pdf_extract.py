@@ -0,0 +1,161 @@
+"""
+PDF text extraction engine.
+
+Pluggable backends, fastest first: pypdfium2, PyPDF2, pdfminer.six. Only
+PyPDF2 is a hard requirement; pypdfium2 is preferred when installed, and
+any backend can be forced with PDF_BACKEND (see bench/pdf_extract.py).
+Extraction walks pages in order and stops as soon as the character budget
+is reached, so text that the prompt would throw away is never parsed.
+Pages are separated by a form feed (PAGE_BREAK) so later stages can spot
+running headers and footers.
+
+Everything here is plain module-level code so it can run in a
+ProcessPoolExecutor worker.
+"""
+
+import io
+import logging
+import os
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PAGE_BREAK = "\f"
+
+PDF_BACKEND = os.getenv("PDF_BACKEND", "auto")
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "30"))
+PDF_MAX_UPLOAD_BYTES = int(os.getenv("PDF_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+
+
+class PDFLimitError(ValueError):
+    """Upload is larger than the configured size or page limit"""
+
+
+def upload_too_large() -> PDFLimitError:
+    return PDFLimitError(f"PDF is larger than the {PDF_MAX_UPLOAD_BYTES / (1024 * 1024):.1f} MB upload limit")
+
+
+# Each backend opens the document and returns (page_count, page_text_iterator)
+Backend = Callable[[bytes], Tuple[int, Iterator[str]]]
+
+
+def _open_pypdfium2(content: bytes):
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(content)
+
+    def pages():
+        try:
+            for index in range(len(pdf)):
+                page = pdf[index]
+                textpage = page.get_textpage()
+                try:
+                    yield textpage.get_text_range()
+                finally:
+                    textpage.close()
+                    page.close()
+        finally:
+            pdf.close()
+
+    return len(pdf), pages()
+
+
+def _open_pdfminer(content: bytes):
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfparser import PDFParser
+    from pdfminer.pdftypes import resolve1
+
+    document = PDFDocument(PDFParser(io.BytesIO(content)))
+    page_count = int(resolve1(document.catalog["Pages"])["Count"])
+
+    def pages():
+        manager = PDFResourceManager()
+        for page in PDFPage.create_pages(document):
+            out = io.StringIO()
+            device = TextConverter(manager, out, laparams=LAParams())
+            PDFPageInterpreter(manager, device).process_page(page)
+            device.close()
+            yield out.getvalue()
+
+    return page_count, pages()
+
+
+def _open_pypdf2(content: bytes):
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(io.BytesIO(content))
+    return len(reader.pages), (page.extract_text() or "" for page in reader.pages)
+
+
+BACKENDS: Dict[str, Backend] = {
+    "pypdfium2": _open_pypdfium2,
+    "pypdf2": _open_pypdf2,
+    "pdfminer": _open_pdfminer,
+}
+
+_IMPORT_NAMES = {"pypdfium2": "pypdfium2", "pypdf2": "PyPDF2", "pdfminer": "pdfminer"}
+
+
+def available_backends() -> list:
+    found = []
+    for name, module in _IMPORT_NAMES.items():
+        try:
+            __import__(module)
+            found.append(name)
+        except ImportError:
+            pass
+    return found
+
+
+def select_backend(preferred: str = PDF_BACKEND) -> str:
+    available = available_backends()
+    if preferred != "auto":
+        if preferred not in available:
+            raise RuntimeError(f"PDF_BACKEND={preferred} is not installed (available: {available})")
+        return preferred
+    return available[0]
+
+
+def warm_up(backend: Optional[str] = None) -> int:
+    """Import the extraction backend in this process (run once per pool worker at startup); returns the pid"""
+    __import__(_IMPORT_NAMES[backend or select_backend()])
+    # The fallback every deployment has, so a forced backend switch is not a cold import either
+    import PyPDF2  # noqa: F401
+    return os.getpid()
+
+
+def extract_text(content: bytes, max_chars: Optional[int] = None, max_pages: int = PDF_MAX_PAGES,
+                 backend: Optional[str] = None) -> str:
+    """Extract page text until max_chars is reached; raises PDFLimitError over max_pages"""
+    if len(content) > PDF_MAX_UPLOAD_BYTES:
+        raise upload_too_large()
+    page_count, pages = BACKENDS[backend or select_backend()](content)
+    if max_pages and page_count > max_pages:
+        pages.close()
+        raise PDFLimitError(f"PDF has {page_count} pages (limit is {max_pages})")
+
+    parts = []
+    total = 0
+    for page_text in pages:
+        parts.append(page_text)
+        total += len(page_text) + 1
+        if max_chars is not None and total >= max_chars:
+            pages.close()
+            break
+    text = PAGE_BREAK.join(parts).strip()
+    return text[:max_chars] if max_chars is not None else text
+
+
+def extract_text_safe(content: bytes, max_chars: Optional[int] = None) -> str:
+    """extract_text, but unreadable PDFs yield "" (limit violations still raise)"""
+    try:
+        return extract_text(content, max_chars)
+    except PDFLimitError:
+        raise
+    except Exception as e:
+        logger.error(f"PDF Error: {e}")
+        return ""
@@ -0,0 +1,191 @@
+"""
+Text preprocessing between PDF extraction and the prompt.
+
+normalize_text() cleans up PDF-extraction noise (ragged whitespace,
+words hyphenated across line breaks, running headers/footers and page
+numbers). fit_to_budget() then splits the text into sections and keeps
+the highest-signal ones (contact header, skills, projects, experience)
+within a token budget, cutting lower-priority sections first and only
+ever at line boundaries. Kept sections stay in document order.
+"""
+
+import re
+from collections import Counter
+from typing import List, Optional, Set, Tuple
+
+from pdf_extract import extract_text_safe
+
+CHARS_PER_TOKEN = 4
+
+# Lower number = kept first. Anything unrecognised gets DEFAULT_PRIORITY.
+SECTION_PRIORITIES = {
+    "header": 0,
+    "contact": 0,
+    "skills": 1,
+    "projects": 2,
+    "experience": 3,
+    "summary": 4,
+    "education": 5,
+    "certifications": 6,
+    "achievements": 7,
+    "publications": 8,
+    "languages": 9,
+    "interests": 20,
+    "references": 21,
+}
+DEFAULT_PRIORITY = 10
+
+_HEADING_ALIASES = {
+    "skills": ("skills", "technical skills", "top skills", "core competencies", "technologies", "tech stack", "tools"),
+    "projects": ("projects", "personal projects", "academic projects", "key projects"),
+    "experience": ("experience", "work experience", "professional experience", "employment", "internships",
+                   "internship", "work history"),
+    "summary": ("summary", "about", "about me", "profile", "objective", "career objective", "professional summary"),
+    "education": ("education", "academic background", "academics", "qualifications"),
+    "certifications": ("certifications", "certificates", "licenses & certifications", "courses"),
+    "achievements": ("achievements", "awards", "honors", "honors-awards", "accomplishments", "extracurricular"),
+    "publications": ("publications", "research"),
+    "languages": ("languages",),
+    "contact": ("contact", "contact info", "personal details"),
+    "interests": ("interests", "hobbies", "hobbies & interests"),
+    "references": ("references",),
+}
+_HEADINGS = {alias: section for section, aliases in _HEADING_ALIASES.items() for alias in aliases}
+
+# "Page 3", "Page 3 of 5", "3 of 5", "3/5"
+_PAGE_LABEL = re.compile(r"^(page\s*\d+(\s*(of|/)\s*\d+)?|\d+\s*(of|/)\s*\d+)$", re.IGNORECASE)
+_BARE_NUMBER = re.compile(r"^\d{1,4}$")
+# Non-empty lines at the top and bottom of a page searched for page numbers and running headers
+EDGE_LINES = 2
+
+
+def _shape(line: str) -> str:
+    return re.sub(r"\d+", "#", line.lower())
+
+
+def _page_number_lines(pages: List[List[str]]) -> List[Set[int]]:
+    """Per page, the indexes of page-number lines among its first and last non-empty lines.
+
+    A bare number only counts on a multi-page document and when it is within one of
+    the page's position, so "2021" or a CGPA of "9" in the body is left alone.
+    """
+    found = []
+    for position, lines in enumerate(pages, start=1):
+        content = [i for i, line in enumerate(lines) if line]
+        edges = set(content[:EDGE_LINES] + content[-EDGE_LINES:])
+        found.append({
+            i for i in edges
+            if _PAGE_LABEL.match(lines[i])
+            or (len(pages) >= 2 and _BARE_NUMBER.match(lines[i]) and abs(int(lines[i]) - position) <= 1)
+        })
+    return found
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace, join hyphenated line breaks, drop page numbers and running headers/footers.
+
+    Pages are expected to be separated by form feeds (as pdf_extract produces).
+    """
+    text = text.replace("\r\n", "\n").replace("\r", "\n").replace("\u00a0", " ")
+    # "Kuber-\nnetes" -> "Kubernetes" (only when the next line continues in lowercase)
+    text = re.sub(r"(\w)-\n\s*([a-z])", r"\1\2", text)
+    pages = [
+        [re.sub(r"[ \t]+", " ", line).strip() for line in page.split("\n")]
+        for page in text.split("\f")
+    ]
+
+    page_numbers = _page_number_lines(pages)
+
+    # A short line sitting at the top (or bottom) of several pages is a running header (or footer)
+    running = set()
+    if len(pages) >= 2:
+        tops, bottoms = Counter(), Counter()
+        for lines, numbers in zip(pages, page_numbers):
+            content = [line for i, line in enumerate(lines) if line and i not in numbers]
+            tops.update({_shape(line) for line in content[:EDGE_LINES] if len(line) <= 80})
+            bottoms.update({_shape(line) for line in content[-EDGE_LINES:] if len(line) <= 80})
+        threshold = max(2, len(pages) // 2)
+        running = {shape for edge in (tops, bottoms) for shape, n in edge.items() if n >= threshold}
+
+    seen = set()
+    kept = []
+    for lines, numbers in zip(pages, page_numbers):
+        for i, line in enumerate(lines):
+            if i in numbers:
+                continue
+            shape = _shape(line)
+            if shape in running:
+                if shape in seen:
+                    continue
+                seen.add(shape)
+            kept.append(line)
+
+    text = "\n".join(kept)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+def _heading_for(line: str):
+    candidate = line.strip().rstrip(":").strip().lower()
+    if not candidate or len(candidate) > 40:
+        return None
+    return _HEADINGS.get(candidate)
+
+
+def split_sections(text: str) -> List[Tuple[str, List[str]]]:
+    """[(section_name, lines)] in document order; text before the first heading is "header" """
+    sections: List[Tuple[str, List[str]]] = [("header", [])]
+    for line in text.split("\n"):
+        section = _heading_for(line)
+        if section:
+            sections.append((section, [line]))
+        else:
+            sections[-1][1].append(line)
+    return [(name, lines) for name, lines in sections if any(l.strip() for l in lines)]
+
+
+def fit_to_budget(text: str, max_tokens: int) -> str:
+    """Keep the highest-priority sections within max_tokens, trimming the first one that overflows"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    sections = split_sections(text)
+    order = sorted(range(len(sections)), key=lambda i: (SECTION_PRIORITIES.get(sections[i][0], DEFAULT_PRIORITY), i))
+    budget = max_tokens * CHARS_PER_TOKEN
+    kept = {}
+    for index in order:
+        lines = sections[index][1]
+        size = sum(len(line) + 1 for line in lines)
+        if size <= budget:
+            kept[index] = lines
+            budget -= size
+            continue
+        partial = []
+        for line in lines:
+            if len(line) + 1 > budget:
+                break
+            partial.append(line)
+            budget -= len(line) + 1
+        if len(partial) > 1 or (partial and index == 0):
+            kept[index] = partial
+        if budget < 40:
+            break
+    return "\n".join("\n".join(kept[i]) for i in sorted(kept)).strip()
+
+
+def prepare_text(text: str, max_tokens: int) -> str:
+    return fit_to_budget(normalize_text(text), max_tokens)
+
+
+def extract_prompt_text(content: bytes, max_chars: Optional[int], max_tokens: int) -> Tuple[str, int]:
+    """PDF bytes -> (prompt-ready text, raw extracted length); runs in the PDF pool"""
+    raw = extract_text_safe(content, max_chars)
+    return prepare_text(raw, max_tokens), len(raw)
+
+
+def extract_clean_text(content: bytes, max_chars: Optional[int]) -> str:
+    """PDF bytes -> normalized text without a token budget (for indexing); runs in the PDF pool"""
+    return normalize_text(extract_text_safe(content, max_chars))
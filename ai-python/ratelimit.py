@@ -0,0 +1,337 @@
+"""
+Per-key rate limiting and priority scheduling for Groq calls.
+
+Each Groq key has its own request and token budgets (token buckets that
+refill continuously). A call reserves one request plus an estimate of its
+tokens (prompt size + max_tokens) before it is sent; once the response
+arrives the reservation is settled against the real `usage` numbers.
+
+Calls that do not fit the budget queue up and are released in priority
+order (interactive chat before single analyses before bulk batches), with
+a bounded queue depth and a bounded wait. A 429 from Groq blocks the key
+until its retry-after has passed, so queued calls stop hammering it too.
+
+With SHARED_STATE_DB set, bucket levels and 429 blocks live in SQLite, so
+all workers on the host draw from the key's one real budget. Queues stay
+per worker. Stored times are wall-clock (time.time()): the file outlives
+the processes, and time.monotonic() restarts from an arbitrary point on
+every boot.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from typing import Dict, List, Optional
+
+from shared_state import SharedDB, shared_db
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_ANALYSIS = 1
+PRIORITY_BULK = 2
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_ANALYSIS: "analysis", PRIORITY_BULK: "bulk"}
+
+GROQ_QUEUE_MAX_WAIT = float(os.getenv("GROQ_QUEUE_MAX_WAIT", "30"))
+GROQ_QUEUE_MAX_DEPTH = int(os.getenv("GROQ_QUEUE_MAX_DEPTH", "200"))
+GROQ_RETRY_ATTEMPTS = int(os.getenv("GROQ_RETRY_ATTEMPTS", "3"))
+GROQ_RETRY_BASE_DELAY = float(os.getenv("GROQ_RETRY_BASE_DELAY", "1.0"))
+GROQ_RETRY_MAX_DELAY = float(os.getenv("GROQ_RETRY_MAX_DELAY", "30"))
+
+
+class RateLimitExceeded(Exception):
+    """The call could not be scheduled (queue full / wait too long) or Groq kept returning 429"""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Continuously refilling budget; capacity <= 0 means unlimited"""
+
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self, capacity: float, per_seconds: float = 60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / per_seconds if capacity > 0 else 0.0
+        self.level = self.capacity
+        self.updated = self.clock()
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available (requests larger than capacity wait for a full bucket)"""
+        if self.unlimited:
+            return 0.0
+        self.refill()
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def take(self, amount: float):
+        if not self.unlimited:
+            self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount: float):
+        if not self.unlimited:
+            self.level = min(self.capacity, self.level + amount)
+
+    async def acquire(self, amount: float):
+        # Created lazily so the lock binds to the server's running loop
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                delay = self.wait_time(amount)
+                if delay <= 0:
+                    self.take(amount)
+                    return
+                await asyncio.sleep(delay)
+
+
+class SharedTokenBucket(TokenBucket):
+    """TokenBucket whose level is a row in SHARED_STATE_DB, drawn on by every worker"""
+
+    # Persisted across restarts and reboots, so the timestamps must be wall-clock
+    clock = staticmethod(time.time)
+
+    def __init__(self, name: str, db: SharedDB, capacity: float, per_seconds: float = 60.0):
+        super().__init__(capacity, per_seconds)
+        self.name = name
+        self.db = db
+        if not self.unlimited:
+            db.execute("CREATE TABLE IF NOT EXISTS rate_buckets (name TEXT PRIMARY KEY, level REAL, updated REAL)")
+            db.execute("INSERT OR IGNORE INTO rate_buckets (name, level, updated) VALUES (?, ?, ?)",
+                       (name, self.capacity, self.updated))
+
+    def _apply(self, delta: float):
+        """Refill the shared level to now, add delta (capped at capacity) and keep a local copy.
+
+        Only takes and give-backs come here; wait_time() polls through refill() without the write lock.
+        """
+        now = self.clock()
+        with self.db.transaction() as conn:
+            row = conn.execute("SELECT level, updated FROM rate_buckets WHERE name = ?", (self.name,)).fetchone()
+            level, updated = row if row else (self.capacity, now)
+            level = min(self.capacity, min(self.capacity, level + max(0.0, now - updated) * self.rate) + delta)
+            conn.execute("INSERT OR REPLACE INTO rate_buckets (name, level, updated) VALUES (?, ?, ?)",
+                         (self.name, level, now))
+        self.level, self.updated = level, now
+
+    def refill(self):
+        """Read the shared level as of now; a plain WAL read, so it never waits on another worker's write"""
+        now = self.clock()
+        row = self.db.query("SELECT level, updated FROM rate_buckets WHERE name = ?", (self.name,))
+        level, updated = row[0] if row else (self.capacity, now)
+        self.level = min(self.capacity, level + max(0.0, now - updated) * self.rate)
+        self.updated = now
+
+    def take(self, amount: float):
+        if not self.unlimited:
+            self._apply(-min(amount, self.capacity))
+
+    def give_back(self, amount: float):
+        if not self.unlimited:
+            self._apply(amount)
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Exponential backoff with full jitter, never shorter than the server's retry-after"""
+    delay = random.uniform(0, min(GROQ_RETRY_MAX_DELAY, GROQ_RETRY_BASE_DELAY * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after) + random.uniform(0, GROQ_RETRY_BASE_DELAY / 2)
+    return min(delay, GROQ_RETRY_MAX_DELAY)
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    """Seconds from `retry-after` (or Groq's x-ratelimit-reset-* like "7.66s"/"2m59.5s")"""
+    if headers is None:
+        return None
+    for name in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        value = headers.get(name)
+        if not value:
+            continue
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        seconds = 0.0
+        number = ""
+        for ch in value:
+            if ch.isdigit() or ch == ".":
+                number += ch
+            elif number:
+                seconds += float(number) * {"h": 3600, "m": 60, "s": 1}.get(ch, 0)
+                number = ""
+        if seconds:
+            return seconds
+    return None
+
+
+class _Waiter:
+    __slots__ = ("priority", "tokens", "future", "enqueued")
+
+    def __init__(self, priority: int, tokens: int, future: "asyncio.Future"):
+        self.priority = priority
+        self.tokens = tokens
+        self.future = future
+        self.enqueued = time.monotonic()
+
+
+class KeyScheduler:
+    """Request/token budgets plus a priority wait queue for one Groq key"""
+
+    def __init__(self, name: str, rpm: int, tpm: int, shared: Optional[SharedDB] = None):
+        self.name = name
+        self.shared = shared
+        if shared is not None:
+            self.requests = SharedTokenBucket(f"{name}:requests", shared, rpm)
+            self.tokens = SharedTokenBucket(f"{name}:tokens", shared, tpm)
+            shared.execute("CREATE TABLE IF NOT EXISTS rate_blocks (name TEXT PRIMARY KEY, until REAL)")
+        else:
+            self.requests = TokenBucket(rpm)
+            self.tokens = TokenBucket(tpm)
+        self._blocked_until = 0.0
+        self.queue: List[tuple] = []
+        self.seq = itertools.count()
+        self.pump_task: Optional[asyncio.Task] = None
+        self.arrived: Optional[asyncio.Event] = None
+        self.stats = {
+            "granted": 0, "queued": 0, "rejected": 0, "timeouts": 0, "retries": 0,
+            "wait_ms_total": 0.0, "wait_ms_max": 0.0, "max_queue_depth": 0,
+        }
+        self.wait_by_priority: Dict[str, float] = {name: 0.0 for name in PRIORITY_NAMES.values()}
+
+    @property
+    def blocked_until(self) -> float:
+        """time.monotonic() until which the key is blocked (stored as wall-clock when shared)"""
+        if self.shared is not None:
+            row = self.shared.query("SELECT until FROM rate_blocks WHERE name = ?", (self.name,))
+            self._blocked_until = row[0][0] - time.time() + time.monotonic() if row else 0.0
+        return self._blocked_until
+
+    def _delay_for(self, tokens: int) -> float:
+        blocked = max(0.0, self.blocked_until - time.monotonic())
+        return max(blocked, self.requests.wait_time(1), self.tokens.wait_time(tokens))
+
+    def _grant(self, tokens: int):
+        self.requests.take(1)
+        self.tokens.take(tokens)
+        self.stats["granted"] += 1
+
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, w in self.queue if not w.future.done())
+
+    async def acquire(self, tokens: int, priority: int = PRIORITY_ANALYSIS):
+        """Reserve one request and `tokens` tokens, waiting in priority order if needed"""
+        if not self.queue and self._delay_for(tokens) <= 0:
+            self._grant(tokens)
+            return
+        if self.queue_depth() >= GROQ_QUEUE_MAX_DEPTH:
+            self.stats["rejected"] += 1
+            raise RateLimitExceeded(f"Groq {self.name} queue is full", self._delay_for(tokens) or 1.0)
+
+        waiter = _Waiter(priority, tokens, asyncio.get_running_loop().create_future())
+        heapq.heappush(self.queue, (priority, next(self.seq), waiter))
+        self.stats["queued"] += 1
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self.queue_depth())
+        if self.arrived is None:
+            self.arrived = asyncio.Event()
+        self.arrived.set()
+        if self.pump_task is None or self.pump_task.done():
+            self.pump_task = asyncio.create_task(self._pump())
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), GROQ_QUEUE_MAX_WAIT)
+        except asyncio.TimeoutError:
+            if not waiter.future.done():
+                waiter.future.cancel()
+                self.stats["timeouts"] += 1
+                raise RateLimitExceeded(
+                    f"Groq {self.name} rate limit: waited over {GROQ_QUEUE_MAX_WAIT:.0f}s",
+                    self._delay_for(tokens) or 1.0,
+                )
+        except asyncio.CancelledError:
+            if not waiter.future.done():
+                waiter.future.cancel()
+            elif not waiter.future.cancelled():
+                # Granted just as the caller went away: hand the budget back
+                self.settle(tokens, 0, refund_request=True)
+            raise
+        waited = (time.monotonic() - waiter.enqueued) * 1000
+        self.stats["wait_ms_total"] += waited
+        self.stats["wait_ms_max"] = max(self.stats["wait_ms_max"], waited)
+        self.wait_by_priority[PRIORITY_NAMES.get(priority, str(priority))] += waited
+
+    async def _pump(self):
+        """Release queued waiters in priority order as budget becomes available"""
+        while self.queue:
+            while self.queue and self.queue[0][2].future.done():
+                heapq.heappop(self.queue)
+            if not self.queue:
+                break
+            head = self.queue[0][2]
+            delay = self._delay_for(head.tokens)
+            if delay <= 0:
+                heapq.heappop(self.queue)
+                self._grant(head.tokens)
+                head.future.set_result(None)
+                continue
+            # Sleep until the head fits, but wake early if a higher-priority call arrives
+            self.arrived.clear()
+            try:
+                await asyncio.wait_for(self.arrived.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def settle(self, reserved: int, actual: Optional[int], refund_request: bool = False):
+        """Correct a reservation once the real token usage is known"""
+        if actual is not None:
+            if actual < reserved:
+                self.tokens.give_back(reserved - actual)
+            else:
+                self.tokens.take(actual - reserved)
+        if refund_request:
+            self.requests.give_back(1)
+
+    def penalize(self, seconds: float):
+        """Groq said 429: hold every call on this key for `seconds`"""
+        until = time.monotonic() + seconds
+        if self.shared is not None:
+            self.shared.execute("INSERT INTO rate_blocks (name, until) VALUES (?, ?) "
+                                "ON CONFLICT(name) DO UPDATE SET until = max(until, excluded.until)",
+                                (self.name, time.time() + seconds))
+        self._blocked_until = max(self._blocked_until, until)
+        self.stats["retries"] += 1
+
+    def snapshot(self) -> dict:
+        granted_after_wait = max(self.stats["queued"] - self.stats["timeouts"] - self.stats["rejected"], 0)
+        return {
+            "rpm_limit": self.requests.capacity or None,
+            "tpm_limit": self.tokens.capacity or None,
+            "shared": self.shared is not None,
+            "queue_depth": self.queue_depth(),
+            "blocked_for_s": round(max(0.0, self.blocked_until - time.monotonic()), 2),
+            **{k: round(v, 1) if isinstance(v, float) else v for k, v in self.stats.items()},
+            "avg_wait_ms": round(self.stats["wait_ms_total"] / granted_after_wait, 1) if granted_after_wait else 0.0,
+            "wait_ms_by_priority": {k: round(v, 1) for k, v in self.wait_by_priority.items()},
+        }
+
+
+def scheduler_for(name: str) -> KeyScheduler:
+    """Scheduler for a key name, with limits from GROQ_<NAME>_RPM / GROQ_<NAME>_TPM (0 = unlimited)"""
+    prefix = f"GROQ_{name.upper()}"
+    return KeyScheduler(
+        name,
+        rpm=int(os.getenv(f"{prefix}_RPM", os.getenv("GROQ_RPM", "0"))),
+        tpm=int(os.getenv(f"{prefix}_TPM", os.getenv("GROQ_TPM", "0"))),
+        shared=shared_db(),
+    )
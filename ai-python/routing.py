@@ -0,0 +1,262 @@
+"""
+Which Groq model answers each LLM call, and what it falls back to.
+
+Every call names a task ("resume", "linkedin", "chat", ...). ROUTES maps
+the task to its models, largest first:
+
+  - The call starts on the first model, or on the next smaller one when
+    its prompt is under the route's `small_below` estimate (short LinkedIn
+    profiles, ordinary chat turns).
+  - A request may carry a latency budget (set_latency_budget). Models
+    whose expected time does not fit what is left of it are skipped.
+    Expected time is the model's recent average for the task, or a guess
+    from max_tokens and its decode speed until there are samples.
+  - On a 429 or after the route's timeout, GroqPool moves on to the next
+    smaller model instead of waiting out the penalty. Groq's limits are
+    per model, so the smaller one usually has room; the 429'd model is
+    skipped until its retry-after has passed. The last model in the list
+    keeps the usual retries and read timeout.
+
+Per-model latency, tokens and estimated cost are kept here for
+GET /stats/models and exported as metrics, so the table can be tuned from
+real traffic. A result that a smaller model stood in for is not cached
+(start_trace), so the next request gets another try at the preferred model.
+"""
+
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from metrics import record_model_call, record_model_fallback
+
+logger = logging.getLogger(__name__)
+
+LARGE_MODEL = os.getenv("LARGE_MODEL", "llama-3.3-70b-versatile")
+SMALL_MODEL = os.getenv("SMALL_MODEL", "llama-3.1-8b-instant")
+CHAT_SUMMARY_MODEL = os.getenv("CHAT_SUMMARY_MODEL", SMALL_MODEL)
+# Estimated prompt tokens below which these tasks start on SMALL_MODEL; 0 keeps them on LARGE_MODEL
+LINKEDIN_SMALL_BELOW_TOKENS = int(os.getenv("LINKEDIN_SMALL_BELOW_TOKENS", "3000"))
+CHAT_SMALL_BELOW_TOKENS = int(os.getenv("CHAT_SMALL_BELOW_TOKENS", "2500"))
+# false = a call that hits a 429 or a timeout retries its model instead of moving to a smaller one
+MODEL_FALLBACK = os.getenv("MODEL_FALLBACK", "true").lower() in ("1", "true", "yes")
+
+# Average over recent calls: each new latency sample gets this weight
+LATENCY_EWMA_WEIGHT = 0.2
+# Samples before a model's observed latency replaces the estimate
+LATENCY_MIN_SAMPLES = 3
+
+
+class ModelSpec(NamedTuple):
+    input_usd: float       # per 1M prompt tokens
+    output_usd: float      # per 1M completion tokens
+    tokens_per_sec: float  # decode speed, for the latency estimate
+
+
+# Groq list prices and typical speeds; unknown models cost 0 and use DEFAULT_SPEC's speed
+MODELS: Dict[str, ModelSpec] = {
+    "llama-3.3-70b-versatile": ModelSpec(0.59, 0.79, 275),
+    "llama-3.1-8b-instant": ModelSpec(0.05, 0.08, 750),
+}
+DEFAULT_SPEC = ModelSpec(0.0, 0.0, 300)
+
+
+class Route(NamedTuple):
+    models: Tuple[str, ...]  # largest first
+    small_below: int         # prompt tokens under which the call starts on the second model
+    timeout: float           # seconds before a model that has a fallback is given up on
+
+
+def _chain(*models: str) -> Tuple[str, ...]:
+    return tuple(dict.fromkeys(models))
+
+
+ROUTES: Dict[str, Route] = {
+    # Deep analysis keeps the large model; the small one only stands in when it is unavailable
+    "resume": Route(_chain(LARGE_MODEL, SMALL_MODEL), 0, 60),
+    "resume_profile": Route(_chain(LARGE_MODEL, SMALL_MODEL), 0, 20),
+    "resume_project": Route(_chain(LARGE_MODEL, SMALL_MODEL), 0, 30),
+    # URL, email and GitHub are detected locally; short profiles are mostly template filling
+    "linkedin": Route(_chain(LARGE_MODEL, SMALL_MODEL), LINKEDIN_SMALL_BELOW_TOKENS, 45),
+    "chat": Route(_chain(LARGE_MODEL, SMALL_MODEL), CHAT_SMALL_BELOW_TOKENS, 20),
+    "chat_summary": Route(_chain(CHAT_SUMMARY_MODEL), 0, 20),
+}
+
+
+class ModelUnavailable(Exception):
+    """The current model hit a 429 or the route's timeout and a smaller model can take over"""
+
+    def __init__(self, reason: str, retry_after: Optional[float] = None):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+# ============================================
+# PER-REQUEST STATE
+# ============================================
+
+# time.monotonic() by which the request wants its answer; None = no budget
+_deadline: ContextVar[Optional[float]] = ContextVar("latency_deadline", default=None)
+
+
+def set_latency_budget(seconds: Optional[float]):
+    """Give the rest of the current request `seconds` to answer (None or <= 0 = no budget)"""
+    _deadline.set(time.monotonic() + seconds if seconds and seconds > 0 else None)
+
+
+def remaining_budget() -> Optional[float]:
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class RouteTrace:
+    """Models that answered the calls of one analysis, and whether any of them was a stand-in"""
+
+    def __init__(self):
+        self.models: Set[str] = set()
+        # A smaller model stood in (fallback, rate-limit cool-down or latency budget)
+        self.downgraded = False
+
+
+_trace: ContextVar[Optional[RouteTrace]] = ContextVar("route_trace", default=None)
+
+
+def start_trace() -> RouteTrace:
+    """Record routing for the rest of the current task and the tasks it starts"""
+    trace = RouteTrace()
+    _trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[RouteTrace]:
+    return _trace.get()
+
+
+# ============================================
+# ROUTER
+# ============================================
+
+class ModelStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.fallbacks = 0
+        self.latency_ms_total = 0.0
+        self.latency_ms_max = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        # task -> (samples, average seconds)
+        self.by_task: Dict[str, Tuple[int, float]] = {}
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "fallbacks": self.fallbacks,
+            "avg_latency_ms": round(self.latency_ms_total / self.calls, 1) if self.calls else 0.0,
+            "max_latency_ms": round(self.latency_ms_max, 1),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+            "by_task": {task: {"samples": samples, "avg_latency_ms": round(avg * 1000, 1)}
+                        for task, (samples, avg) in self.by_task.items()},
+        }
+
+
+def cost_usd(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    spec = MODELS.get(model, DEFAULT_SPEC)
+    return (prompt_tokens * spec.input_usd + completion_tokens * spec.output_usd) / 1_000_000
+
+
+class ModelRouter:
+    def __init__(self, routes: Dict[str, Route] = ROUTES, fallback: bool = MODEL_FALLBACK):
+        self.routes = routes
+        self.fallback = fallback
+        self.stats: Dict[str, ModelStats] = {}
+        self.fallback_counts: Dict[str, int] = {}
+        # model -> time.monotonic() until which it answered 429
+        self.blocked: Dict[str, float] = {}
+
+    def _stats(self, model: str) -> ModelStats:
+        if model not in self.stats:
+            self.stats[model] = ModelStats()
+        return self.stats[model]
+
+    def expected_seconds(self, model: str, task: str, max_tokens: int) -> float:
+        samples, average = self._stats(model).by_task.get(task, (0, 0.0))
+        if samples >= LATENCY_MIN_SAMPLES:
+            return average
+        # Until measured: replies tend to use about half of max_tokens
+        return 0.5 + max_tokens / 2 / MODELS.get(model, DEFAULT_SPEC).tokens_per_sec
+
+    def plan(self, task: str, prompt_tokens: int, max_tokens: int) -> List[Tuple[str, Optional[float]]]:
+        """(model, timeout) to try in order; the last one has no timeout of its own"""
+        route = self.routes[task]
+        models = list(route.models)
+        start = natural = 1 if len(models) > 1 and prompt_tokens < route.small_below else 0
+        budget = remaining_budget()
+        now = time.monotonic()
+        # Skip rate-limited models and those expected to overrun the budget, keeping at least the smallest
+        while start < len(models) - 1 and (
+                self.blocked.get(models[start], 0.0) > now
+                or (budget is not None and self.expected_seconds(models[start], task, max_tokens) > budget)):
+            start += 1
+        if start > natural:
+            self._downgraded()
+        models = models[start:] if self.fallback else models[start:start + 1]
+        timeout = route.timeout if budget is None else max(min(route.timeout, budget), 0.1)
+        return [(model, timeout if i < len(models) - 1 else None) for i, model in enumerate(models)]
+
+    def record(self, model: str, task: str, seconds: float, outcome: str,
+               prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None):
+        stats = self._stats(model)
+        stats.calls += 1
+        stats.latency_ms_total += seconds * 1000
+        stats.latency_ms_max = max(stats.latency_ms_max, seconds * 1000)
+        cost = 0.0
+        if outcome in ("success", "timeout"):
+            # A timeout is a lower bound on the latency, but still moves the estimate the right way
+            samples, average = stats.by_task.get(task, (0, 0.0))
+            weight = max(LATENCY_EWMA_WEIGHT, 1 / (samples + 1))
+            stats.by_task[task] = (samples + 1, average + (seconds - average) * weight)
+        if outcome == "success":
+            stats.prompt_tokens += prompt_tokens or 0
+            stats.completion_tokens += completion_tokens or 0
+            cost = cost_usd(model, prompt_tokens or 0, completion_tokens or 0)
+            stats.cost_usd += cost
+        elif outcome != "cancelled":
+            stats.errors += 1
+        record_model_call(model, task, seconds, outcome, cost)
+
+    @staticmethod
+    def _downgraded():
+        trace = current_trace()
+        if trace is not None:
+            trace.downgraded = True
+
+    def record_fallback(self, task: str, model: str, to_model: str, error: ModelUnavailable):
+        reason = error.reason
+        if error.retry_after:
+            self.blocked[model] = max(self.blocked.get(model, 0.0), time.monotonic() + error.retry_after)
+        self._stats(model).fallbacks += 1
+        label = f"{task}: {model} -> {to_model} ({reason})"
+        self.fallback_counts[label] = self.fallback_counts.get(label, 0) + 1
+        record_model_fallback(task, model, reason)
+        self._downgraded()
+        logger.warning(f"↘️ {task}: {model} {reason}, falling back to {to_model}")
+
+    def snapshot(self) -> dict:
+        return {
+            "fallback_enabled": self.fallback,
+            "routes": {task: {"models": list(route.models), "small_below_tokens": route.small_below,
+                              "timeout_s": route.timeout}
+                       for task, route in self.routes.items()},
+            "models": {model: stats.as_dict() for model, stats in self.stats.items()},
+            "blocked_for_s": {model: round(until - time.monotonic(), 1)
+                              for model, until in self.blocked.items() if until > time.monotonic()},
+            "fallbacks": self.fallback_counts,
+            "total_cost_usd": round(sum(stats.cost_usd for stats in self.stats.values()), 6),
+        }
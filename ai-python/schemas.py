@@ -0,0 +1,128 @@
+"""
+Pydantic models for the JSON the LLM is asked to produce.
+
+They validate the shape the frontend relies on, not the wording: scores
+may arrive as "75" or 72.5, unknown keys pass through untouched, and
+optional decoration (taglines, icons) gets a default instead of failing
+the whole analysis. A field is only reported as invalid when the UI would
+break without it, which is what structured.py re-asks the model for.
+"""
+
+from typing import List, Optional, Union
+
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+Score = Union[int, float]
+
+
+class LLMModel(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+
+# ============================================
+# RESUME ANALYSIS
+# ============================================
+
+class CandidateProfile(LLMModel):
+    name: str = "Unknown"
+    total_score: Score
+    market_fit_level: str
+    additional_skills: List[str] = []
+    missing_skills: List[str]
+
+
+class RadarPoint(LLMModel):
+    skill: str
+    userScore: Score
+    marketScore: Score
+
+
+class TechItem(LLMModel):
+    name: str
+    usage: str = ""
+    icon: str = ""
+
+
+class Milestone(LLMModel):
+    week: Union[int, str]
+    task: str
+
+
+class Project(LLMModel):
+    type: str
+    title: str
+    tagline: str = ""
+    description: str
+    system_architecture: str = ""
+    tech_stack: List[TechItem]
+    learning_milestones: List[Milestone]
+    mock_interview_questions: List[str] = Field(min_length=1)
+
+
+class JDMatch(LLMModel):
+    match_score: Optional[Score] = None
+    matched_requirements: List[str] = []
+    missing_requirements: List[str] = []
+    summary: str = ""
+
+
+class ResumeAnalysis(LLMModel):
+    status: str = "success"
+    candidate_profile: CandidateProfile
+    radar_chart_data: List[RadarPoint] = Field(min_length=3)
+    recommended_projects: List[Project] = Field(min_length=3)
+    jd_match: Optional[JDMatch] = None
+
+
+class ProfilePart(LLMModel):
+    """Fan-out call 1 (build_profile_request)"""
+    candidate_profile: CandidateProfile
+    radar_chart_data: List[RadarPoint] = Field(min_length=3)
+    jd_match: Optional[JDMatch] = None
+
+
+class ProjectPart(LLMModel):
+    """Fan-out calls 2-4 (build_project_request)"""
+    project: Project
+
+    @model_validator(mode="before")
+    @classmethod
+    def wrap_bare_project(cls, data):
+        # The model sometimes drops the {"project": ...} wrapper
+        if isinstance(data, dict) and "project" not in data and "title" in data:
+            return {"project": data}
+        return data
+
+
+# ============================================
+# LINKEDIN AUDIT
+# ============================================
+
+class LinkedInSection(LLMModel):
+    status: str
+    score: Score
+    current: str = ""
+    recommendation: str
+
+
+class PriorityAction(LLMModel):
+    title: str
+    description: str
+    impact: str = "Medium"
+
+
+class LinkedInAnalysis(LLMModel):
+    status: str = "success"
+    overall_score: Score
+    professionalism_score: Score
+    completeness_score: Score
+    optimization_score: Score
+    custom_url: LinkedInSection
+    github_link: LinkedInSection
+    professional_email: LinkedInSection
+    profile_header: LinkedInSection
+    summary: LinkedInSection
+    education: LinkedInSection
+    certifications: LinkedInSection
+    skills_section: LinkedInSection
+    priority_actions: List[PriorityAction] = Field(min_length=1)
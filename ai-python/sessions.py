@@ -0,0 +1,284 @@
+"""
+Server-side chat sessions for /chat-with-mentor.
+
+A session holds the user's analysis once (compacted to the fields the
+mentor actually needs), a running summary of older turns, and the recent
+turns themselves. Each prompt carries the system prompt, the context, the
+summary and as many recent turns as fit CHAT_HISTORY_TOKENS. Turns that
+fall out of that window are folded into the summary in the background,
+so no turn is lost and no reply waits for summarization.
+
+Sessions live in memory, least recently used first out once there are
+more than CHAT_SESSION_MAX, and expire after CHAT_SESSION_TTL idle seconds.
+With SHARED_STATE_DB set they are stored there instead and re-read on
+every turn, so consecutive messages may go to different workers.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional
+
+from fastjson import dumps, loads
+from preprocess import estimate_tokens
+from shared_state import SharedDB, off_loop, shared_db
+
+logger = logging.getLogger(__name__)
+
+CHAT_SESSION_MAX = int(os.getenv("CHAT_SESSION_MAX", "2000"))
+CHAT_SESSION_TTL = float(os.getenv("CHAT_SESSION_TTL", "3600"))
+CHAT_HISTORY_TOKENS = int(os.getenv("CHAT_HISTORY_TOKENS", "1500"))
+CHAT_CONTEXT_CHARS = int(os.getenv("CHAT_CONTEXT_CHARS", "4000"))
+# Fold evicted turns into the summary once this many tokens have piled up outside the window
+CHAT_SUMMARY_TRIGGER_TOKENS = int(os.getenv("CHAT_SUMMARY_TRIGGER_TOKENS", "300"))
+
+Summarizer = Callable[[str, List[dict]], Awaitable[str]]
+
+
+def compact_context(context) -> str:
+    """The parts of an analysis a mentor needs, as short text (stored once per session)"""
+    if not context:
+        return ""
+    if isinstance(context, str):
+        try:
+            context = json.loads(context)
+        except ValueError:
+            return context[:CHAT_CONTEXT_CHARS]
+    if not isinstance(context, dict):
+        return str(context)[:CHAT_CONTEXT_CHARS]
+
+    lines = []
+    profile = context.get("candidate_profile")
+    if isinstance(profile, dict):
+        lines.append(f"Name: {profile.get('name', 'Unknown')}; score {profile.get('total_score', '?')}/100; "
+                     f"level: {profile.get('market_fit_level', '?')}")
+        lines.append(f"Current skills: {', '.join(map(str, profile.get('current_skills') or []))}")
+        lines.append(f"Missing skills: {', '.join(map(str, profile.get('missing_skills') or []))}")
+    radar = context.get("radar_chart_data")
+    if isinstance(radar, list):
+        scores = [f"{r.get('skill')} {r.get('userScore')}/{r.get('marketScore')}" for r in radar if isinstance(r, dict)]
+        lines.append(f"Skill radar (user/market): {'; '.join(scores)}")
+    for project in context.get("recommended_projects") or []:
+        if isinstance(project, dict):
+            stack = ", ".join(t.get("name", "") for t in project.get("tech_stack") or [] if isinstance(t, dict))
+            lines.append(f"Recommended project ({project.get('type', '')}): {project.get('title', '')} - "
+                         f"{project.get('tagline', '')} [{stack}]")
+    jd_match = context.get("jd_match")
+    if isinstance(jd_match, dict):
+        lines.append(f"Target job fit: {jd_match.get('match_score', '?')}/100. {jd_match.get('summary', '')} "
+                     f"Missing for the job: {', '.join(map(str, jd_match.get('missing_skills') or []))}")
+    if "overall_score" in context:
+        # LinkedIn audit
+        lines.append(f"LinkedIn overall score: {context.get('overall_score')}/10")
+        for action in context.get("priority_actions") or []:
+            if isinstance(action, dict):
+                lines.append(f"LinkedIn action ({action.get('impact', '')}): {action.get('title', '')}")
+    if not lines:
+        return json.dumps(context, separators=(",", ":"))[:CHAT_CONTEXT_CHARS]
+    return "\n".join(lines)[:CHAT_CONTEXT_CHARS]
+
+
+def _turn_tokens(turn: dict) -> int:
+    return estimate_tokens(turn["content"]) + 4
+
+
+class ChatSession:
+    def __init__(self, session_id: str, context: str = "", store: Optional["SessionStore"] = None):
+        self.id = session_id
+        self.context = context
+        self.summary = ""
+        self.turns: List[dict] = []
+        self.created_at = time.time()
+        self.last_used = time.monotonic()
+        self.summarizing = False
+        self.turns_summarized = 0
+        self.store = store
+
+    def save(self):
+        """Write the session back to SHARED_STATE_DB (no-op for in-memory sessions)"""
+        if self.store is not None:
+            self.store.save(self)
+
+    def add(self, role: str, content: str) -> dict:
+        turn = {"role": role, "content": content}
+        self.turns.append(turn)
+        self.save()
+        return turn
+
+    def forget(self, turn: dict):
+        """Drop a turn whose reply failed, so a retry does not repeat it"""
+        for i in range(len(self.turns) - 1, -1, -1):
+            if self.turns[i] is turn:
+                del self.turns[i]
+                self.save()
+                return
+
+    def window(self) -> List[dict]:
+        """Most recent turns that fit CHAT_HISTORY_TOKENS (always at least the last one)"""
+        kept, used = [], 0
+        for turn in reversed(self.turns):
+            cost = _turn_tokens(turn)
+            if kept and used + cost > CHAT_HISTORY_TOKENS:
+                break
+            kept.append(turn)
+            used += cost
+        return list(reversed(kept))
+
+    def overflow(self) -> List[dict]:
+        """Turns older than the window that are not in the summary yet"""
+        return self.turns[:len(self.turns) - len(self.window())]
+
+    def messages(self, system_prompt: str) -> List[dict]:
+        system = system_prompt
+        if self.context:
+            system += f"\n\nContext about the user:\n{self.context}"
+        if self.summary:
+            system += f"\n\nSummary of the conversation so far:\n{self.summary}"
+        return [{"role": "system", "content": system}, *self.window()]
+
+    async def compact(self, summarize: Summarizer):
+        """Fold overflowing turns into the running summary (one compaction at a time)"""
+        overflow = self.overflow()
+        if self.summarizing or sum(map(_turn_tokens, overflow)) < CHAT_SUMMARY_TRIGGER_TOKENS:
+            return
+        self.summarizing = True
+        try:
+            summary = await summarize(self.summary, overflow)
+            if self.store is not None:
+                # Another worker may have added turns meanwhile; start from the stored ones
+                await off_loop(self.store.db, self.store.reload, self)
+            self.summary = summary
+            # New turns may have arrived meanwhile; only drop what was summarized
+            if self.turns[:len(overflow)] == overflow:
+                del self.turns[:len(overflow)]
+                self.turns_summarized += len(overflow)
+            await off_loop(self.store.db if self.store else None, self.save)
+        except Exception as e:
+            logger.warning(f"⚠️ Chat summary for session {self.id} failed: {e}")
+        finally:
+            self.summarizing = False
+
+    def snapshot(self) -> dict:
+        return {
+            "session_id": self.id,
+            "turns": len(self.turns),
+            "turns_summarized": self.turns_summarized,
+            "window_tokens": sum(map(_turn_tokens, self.window())),
+            "context_tokens": estimate_tokens(self.context),
+            "summary_tokens": estimate_tokens(self.summary),
+        }
+
+
+class SessionStore:
+    def __init__(self, max_sessions: int = CHAT_SESSION_MAX, ttl: float = CHAT_SESSION_TTL,
+                 db: Optional[SharedDB] = None):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self.tasks = set()
+        self.stats = {"created": 0, "expired": 0, "evicted": 0, "summaries": 0}
+        self.db = db if db is not None else shared_db()
+        if self.db is not None:
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS chat_sessions (
+                    id TEXT PRIMARY KEY, context TEXT, summary TEXT, turns TEXT,
+                    turns_summarized INTEGER, created_at REAL, last_used REAL
+                )""")
+            self.db.execute("CREATE INDEX IF NOT EXISTS chat_sessions_used ON chat_sessions (last_used)")
+
+    def create(self, context: str = "") -> ChatSession:
+        self._expire()
+        session = ChatSession(uuid.uuid4().hex, context, self if self.db is not None else None)
+        self.stats["created"] += 1
+        if self.db is not None:
+            self.save(session)
+            evicted = self.db.execute(
+                "DELETE FROM chat_sessions WHERE id IN (SELECT id FROM chat_sessions "
+                "ORDER BY last_used DESC LIMIT -1 OFFSET ?)", (self.max_sessions,)
+            ).rowcount
+            self.stats["evicted"] += evicted
+            return session
+        self.sessions[session.id] = session
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+            self.stats["evicted"] += 1
+        return session
+
+    def get(self, session_id: Optional[str]) -> Optional[ChatSession]:
+        self._expire()
+        if self.db is not None:
+            session = ChatSession(session_id or "", store=self)
+            if not self.reload(session):
+                return None
+            self.db.execute("UPDATE chat_sessions SET last_used = ? WHERE id = ?", (time.time(), session.id))
+            return session
+        session = self.sessions.get(session_id or "")
+        if session is not None:
+            session.last_used = time.monotonic()
+            self.sessions.move_to_end(session.id)
+        return session
+
+    def save(self, session: ChatSession):
+        self.db.execute(
+            "INSERT OR REPLACE INTO chat_sessions (id, context, summary, turns, turns_summarized, created_at, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (session.id, session.context, session.summary, dumps(session.turns), session.turns_summarized,
+             session.created_at, time.time()),
+        )
+
+    def reload(self, session: ChatSession) -> bool:
+        """Replace session's fields with the stored row; False if it is gone"""
+        rows = self.db.query("SELECT context, summary, turns, turns_summarized, created_at FROM chat_sessions "
+                             "WHERE id = ?", (session.id,))
+        if not rows:
+            return False
+        session.context, session.summary, turns, session.turns_summarized, session.created_at = rows[0]
+        session.turns = loads(turns)
+        return True
+
+    def delete(self, session_id: str) -> bool:
+        if self.db is not None:
+            return self.db.execute("DELETE FROM chat_sessions WHERE id = ?", (session_id,)).rowcount > 0
+        return self.sessions.pop(session_id, None) is not None
+
+    def _expire(self):
+        if self.db is not None:
+            self.stats["expired"] += self.db.execute(
+                "DELETE FROM chat_sessions WHERE last_used < ?", (time.time() - self.ttl,)
+            ).rowcount
+            return
+        cutoff = time.monotonic() - self.ttl
+        # Oldest-used first, so stop at the first live one
+        while self.sessions:
+            session = next(iter(self.sessions.values()))
+            if session.last_used >= cutoff:
+                break
+            self.sessions.popitem(last=False)
+            self.stats["expired"] += 1
+
+    def schedule_compaction(self, session: ChatSession, summarize: Summarizer):
+        if session.summarizing or sum(map(_turn_tokens, session.overflow())) < CHAT_SUMMARY_TRIGGER_TOKENS:
+            return
+        self.stats["summaries"] += 1
+        task = asyncio.create_task(session.compact(summarize))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def cancel_tasks(self):
+        for task in self.tasks:
+            task.cancel()
+
+    def snapshot(self) -> dict:
+        active = self.db.query("SELECT COUNT(*) FROM chat_sessions")[0][0] if self.db is not None else len(self.sessions)
+        return {
+            "active": active,
+            "shared": self.db is not None,
+            "max_sessions": self.max_sessions,
+            "ttl_s": self.ttl,
+            "history_tokens": CHAT_HISTORY_TOKENS,
+            **self.stats,
+        }
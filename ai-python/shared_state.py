@@ -0,0 +1,86 @@
+"""
+State shared by the uvicorn workers of one host.
+
+With WEB_CONCURRENCY > 1 every worker is a separate process with its own
+memory, so anything a later request may land on a different worker for
+(rate-limit budgets, chat sessions, the /match index, batch results) is
+kept in one SQLite file, SHARED_STATE_DB, opened in WAL mode. Empty (the
+single-worker default) keeps all of it in process memory as before.
+
+SQLite's locking does the cross-process coordination: writers take the
+database lock with BEGIN IMMEDIATE, and busy_timeout makes a worker wait
+for it instead of failing.
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+SHARED_STATE_DB = os.getenv("SHARED_STATE_DB", "")
+# Milliseconds a worker waits for another worker's write lock
+SHARED_STATE_BUSY_TIMEOUT_MS = int(os.getenv("SHARED_STATE_BUSY_TIMEOUT_MS", "5000"))
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Autocommit connection tuned for several processes writing small rows"""
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute(f"PRAGMA busy_timeout={SHARED_STATE_BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SharedDB:
+    """One connection per process; `lock` serializes the threads that use it"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = connect(path)
+
+    def execute(self, sql: str, args=()) -> sqlite3.Cursor:
+        with self.lock:
+            return self.conn.execute(sql, args)
+
+    def query(self, sql: str, args=()) -> list:
+        with self.lock:
+            return self.conn.execute(sql, args).fetchall()
+
+    @contextmanager
+    def transaction(self):
+        """Read-modify-write under the database write lock (no other worker interleaves)"""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_shared: Optional[SharedDB] = None
+
+
+async def off_loop(db: Optional[SharedDB], fn: Callable, *args):
+    """Call fn in the threadpool when it uses a SharedDB, whose writes can wait up to
+    busy_timeout for another worker's lock; in-memory state is called directly"""
+    if db is None:
+        return fn(*args)
+    return await run_in_threadpool(fn, *args)
+
+
+def shared_db() -> Optional[SharedDB]:
+    """The process's SHARED_STATE_DB connection, or None when state is per-process"""
+    global _shared
+    if _shared is None and SHARED_STATE_DB:
+        _shared = SharedDB(SHARED_STATE_DB)
+    return _shared
@@ -0,0 +1,56 @@
+"""
+Request coalescing ("single-flight") for identical in-flight analyses.
+
+The first caller for a key starts the work as its own task; callers that
+arrive while it is running await the same task instead of starting another
+LLM call. The task is shielded from individual waiters being cancelled
+(client disconnects) and is only cancelled once every waiter has gone.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self.flights: Dict[str, _Flight] = {}
+        self.counters = {"started": 0, "coalesced": 0, "abandoned": 0}
+
+    def _forget(self, key: str, flight: _Flight):
+        if self.flights.get(key) is flight:
+            del self.flights[key]
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        """Run fn() once per key among concurrent callers and share its result"""
+        flight = self.flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self.flights[key] = flight
+            flight.task.add_done_callback(lambda _t, f=flight: self._forget(key, f))
+            self.counters["started"] += 1
+        else:
+            self.counters["coalesced"] += 1
+            logger.info("🔗 Joined identical in-flight analysis")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Nobody is left to receive the result, so stop spending tokens on it
+                flight.task.cancel()
+                self._forget(key, flight)
+                self.counters["abandoned"] += 1
+
+    def snapshot(self) -> dict:
+        return {**self.counters, "in_flight": len(self.flights)}
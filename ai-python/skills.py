@@ -0,0 +1,380 @@
+"""
+Deterministic skill extraction.
+
+A curated taxonomy (canonical name -> aliases) is compiled once into a
+token trie, so "k8s", "K8S" and "kubernetes" all come out as "Kubernetes"
+and multi-word names like "Spring Boot" win over their prefixes. Matching
+walks the resume's tokens once, keeping the longest match at each
+position; it needs no Groq call and handles thousands of resumes per
+second (see bench/skills.py).
+
+Aliases that are also everyday words ("Go", "C", "REST", "Excel", "Spring")
+only match in the exact casing listed in CASE_SENSITIVE_ALIASES. Even then
+they are skipped when glued to "&" or "-" ("R&D", "Go-to-market"), a lone
+"C" or "R" that is a grade or ends a sentence is skipped, and a capitalised
+word at the start of a sentence or bullet ("Express interest in...") only
+counts with another skill a few words away. The words in CONTEXT_ALIASES
+("Spark", "Oracle", "Rails") always need that nearby skill.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+from pdf_extract import extract_text_safe
+from preprocess import normalize_text
+
+SKILL_TAXONOMY: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    "Languages": {
+        "Python": ("python", "python3"),
+        "Java": ("java", "core java", "java 8", "java 11", "java 17", "java 21"),
+        "JavaScript": ("javascript", "js", "ecmascript", "es6", "vanilla js"),
+        "TypeScript": ("typescript",),
+        "C": ("C",),
+        "C++": ("c++", "cpp"),
+        "C#": ("c#", "csharp", "c sharp"),
+        "Go": ("Go", "golang"),
+        "Rust": ("Rust",),
+        "Kotlin": ("kotlin",),
+        "Swift": ("Swift",),
+        "Objective-C": ("objective-c", "objc"),
+        "Ruby": ("ruby",),
+        "PHP": ("php",),
+        "Scala": ("scala",),
+        "R": ("R",),
+        "MATLAB": ("matlab",),
+        "Dart": ("Dart",),
+        "Perl": ("perl",),
+        "Haskell": ("haskell",),
+        "Elixir": ("elixir",),
+        "Lua": ("lua",),
+        "SQL": ("sql",),
+        "PL/SQL": ("pl/sql", "plsql"),
+        "Bash": ("bash", "shell scripting", "shell script"),
+        "PowerShell": ("powershell",),
+        "HTML": ("html", "html5"),
+        "CSS": ("css", "css3"),
+        "Solidity": ("solidity",),
+        "Verilog": ("verilog",),
+        "VHDL": ("vhdl",),
+        "Assembly": ("Assembly", "x86 assembly", "arm assembly"),
+    },
+    "Frontend": {
+        "React": ("react", "react.js", "reactjs", "react js"),
+        "React Native": ("react native", "react-native"),
+        "Next.js": ("next.js", "nextjs", "next js"),
+        "Angular": ("angular", "angularjs", "angular.js"),
+        "Vue.js": ("vue", "vue.js", "vuejs"),
+        "Nuxt.js": ("nuxt", "nuxt.js", "nuxtjs"),
+        "Svelte": ("svelte", "sveltekit"),
+        "Redux": ("redux", "redux toolkit"),
+        "jQuery": ("jquery",),
+        "Tailwind CSS": ("tailwind", "tailwind css", "tailwindcss"),
+        "Bootstrap": ("bootstrap",),
+        "Material UI": ("material ui", "material-ui", "mui"),
+        "Sass": ("sass", "scss"),
+        "Webpack": ("webpack",),
+        "Vite": ("vite",),
+        "Three.js": ("three.js", "threejs"),
+        "D3.js": ("d3", "d3.js"),
+        "Flutter": ("flutter",),
+        "SwiftUI": ("swiftui",),
+        "Jetpack Compose": ("jetpack compose",),
+    },
+    "Backend": {
+        "Node.js": ("Node", "node.js", "nodejs", "node js"),
+        "Express.js": ("Express", "express.js", "expressjs"),
+        "NestJS": ("nestjs", "nest.js"),
+        "Spring": ("Spring", "spring framework", "spring mvc"),
+        "Spring Boot": ("spring boot", "springboot", "spring-boot"),
+        "Spring Cloud": ("spring cloud",),
+        "Spring Security": ("spring security",),
+        "Hibernate": ("hibernate",),
+        "JPA": ("jpa", "spring data jpa"),
+        "Django": ("django",),
+        "Django REST Framework": ("django rest framework", "drf"),
+        "Flask": ("flask",),
+        "FastAPI": ("fastapi", "fast api"),
+        "Ruby on Rails": ("ruby on rails", "Rails", "ror"),
+        "Laravel": ("laravel",),
+        ".NET": (".net", "dotnet", ".net core", "asp.net", "asp.net core"),
+        "Gin": ("Gin",),
+        "GraphQL": ("graphql", "apollo graphql"),
+        "gRPC": ("grpc",),
+        "REST APIs": ("REST", "rest api", "rest apis", "restful", "restful api", "restful apis", "restful services"),
+        "WebSockets": ("websocket", "websockets", "socket.io"),
+        "Microservices": ("microservices", "microservice", "microservice architecture"),
+        "OAuth": ("oauth", "oauth2", "oauth 2.0"),
+        "JWT": ("jwt", "json web token", "json web tokens"),
+    },
+    "Databases": {
+        "PostgreSQL": ("postgresql", "postgres", "psql"),
+        "MySQL": ("mysql",),
+        "MariaDB": ("mariadb",),
+        "SQLite": ("sqlite",),
+        "Oracle Database": ("Oracle", "oracle db", "oracle database", "oracle sql"),
+        "SQL Server": ("sql server", "mssql", "ms sql"),
+        "MongoDB": ("mongodb", "mongo"),
+        "Redis": ("redis",),
+        "Cassandra": ("cassandra",),
+        "DynamoDB": ("dynamodb",),
+        "Elasticsearch": ("elasticsearch", "elastic search", "opensearch"),
+        "Neo4j": ("neo4j",),
+        "Firebase": ("firebase", "firestore"),
+        "Supabase": ("supabase",),
+        "Snowflake": ("snowflake",),
+        "BigQuery": ("bigquery",),
+        "ClickHouse": ("clickhouse",),
+        "Pinecone": ("pinecone",),
+    },
+    "Cloud & DevOps": {
+        "AWS": ("aws", "amazon web services"),
+        "AWS Lambda": ("aws lambda", "lambda functions"),
+        "Amazon EC2": ("ec2", "amazon ec2"),
+        "Amazon S3": ("s3", "amazon s3"),
+        "Azure": ("azure", "microsoft azure"),
+        "Google Cloud": ("gcp", "google cloud", "google cloud platform"),
+        "Docker": ("docker", "dockerfile", "docker compose", "docker-compose"),
+        "Kubernetes": ("kubernetes", "k8s"),
+        "Helm": ("Helm",),
+        "Terraform": ("terraform",),
+        "Ansible": ("ansible",),
+        "Jenkins": ("jenkins",),
+        "GitHub Actions": ("github actions",),
+        "GitLab CI": ("gitlab ci", "gitlab-ci"),
+        "CI/CD": ("ci/cd", "cicd", "ci cd", "continuous integration"),
+        "Linux": ("linux", "ubuntu", "centos", "debian"),
+        "Nginx": ("nginx",),
+        "Apache Kafka": ("kafka", "apache kafka"),
+        "RabbitMQ": ("rabbitmq",),
+        "Prometheus": ("prometheus",),
+        "Grafana": ("grafana",),
+        "Heroku": ("heroku",),
+        "Vercel": ("vercel",),
+        "Netlify": ("netlify",),
+        "Serverless": ("serverless",),
+    },
+    "Data & AI": {
+        "Machine Learning": ("machine learning", "ML"),
+        "Deep Learning": ("deep learning",),
+        "NLP": ("nlp", "natural language processing"),
+        "Computer Vision": ("computer vision",),
+        "LLMs": ("llm", "llms", "large language models", "large language model"),
+        "Generative AI": ("generative ai", "genai", "gen ai"),
+        "RAG": ("RAG", "retrieval augmented generation", "retrieval-augmented generation"),
+        "LangChain": ("langchain",),
+        "OpenAI API": ("openai", "openai api", "chatgpt api", "gpt-4", "gpt-3.5"),
+        "Hugging Face": ("hugging face", "huggingface", "Transformers"),
+        "TensorFlow": ("tensorflow",),
+        "Keras": ("keras",),
+        "PyTorch": ("pytorch", "Torch"),
+        "scikit-learn": ("scikit-learn", "sklearn", "scikit learn"),
+        "Pandas": ("pandas",),
+        "NumPy": ("numpy",),
+        "SciPy": ("scipy",),
+        "Matplotlib": ("matplotlib",),
+        "Seaborn": ("seaborn",),
+        "OpenCV": ("opencv",),
+        "XGBoost": ("xgboost",),
+        "Apache Spark": ("Spark", "apache spark", "pyspark", "spark sql", "spark streaming"),
+        "Hadoop": ("hadoop",),
+        "Airflow": ("airflow", "apache airflow"),
+        "dbt": ("dbt",),
+        "Tableau": ("tableau",),
+        "Power BI": ("power bi", "powerbi"),
+        "Excel": ("Excel", "ms excel", "microsoft excel"),
+        "Jupyter": ("jupyter", "jupyter notebook", "jupyter notebooks"),
+        "MLflow": ("mlflow",),
+    },
+    "Testing": {
+        "JUnit": ("junit", "junit5", "junit 5"),
+        "Mockito": ("mockito",),
+        "pytest": ("pytest",),
+        "Jest": ("jest",),
+        "Mocha": ("mocha",),
+        "Cypress": ("cypress",),
+        "Selenium": ("selenium",),
+        "Playwright": ("playwright",),
+        "Postman": ("postman",),
+        "JMeter": ("jmeter",),
+        "TDD": ("tdd", "test driven development", "test-driven development"),
+    },
+    "Tools & Practices": {
+        "Git": ("git",),
+        "GitHub": ("github",),
+        "GitLab": ("gitlab",),
+        "Bitbucket": ("bitbucket",),
+        "Jira": ("jira",),
+        "Confluence": ("confluence",),
+        "Maven": ("maven",),
+        "Gradle": ("gradle",),
+        "npm": ("npm",),
+        "Figma": ("figma",),
+        "VS Code": ("vs code", "vscode", "visual studio code"),
+        "IntelliJ IDEA": ("intellij", "intellij idea"),
+        "Agile": ("agile", "scrum", "kanban"),
+        "System Design": ("system design",),
+        "Data Structures & Algorithms": ("data structures", "algorithms", "dsa", "data structures and algorithms"),
+        "OOP": ("oop", "oops", "object oriented programming", "object-oriented programming"),
+        "Design Patterns": ("design patterns",),
+        "Unix": ("unix",),
+        "Arduino": ("arduino",),
+        "Raspberry Pi": ("raspberry pi",),
+        "Embedded Systems": ("embedded systems", "embedded c"),
+        "RTOS": ("rtos", "freertos"),
+    },
+}
+
+# Aliases that are common English words (or single letters) and so must match exactly
+CASE_SENSITIVE_ALIASES = {
+    "C", "R", "Go", "Express", "Spring", "Swift", "Assembly", "Node", "Gin", "REST", "Helm", "ML", "RAG", "Excel",
+    "Rust", "Dart", "Rails", "Oracle", "Transformers", "Torch", "Spark",
+}
+# Words far more common in prose than as tools: they only count with another skill nearby, wherever
+# they appear ("Spark of inspiration", "Oracle of Delphi"); "Apache Spark", "PySpark", "Ruby on Rails"
+# and "Oracle DB" match on their own
+CONTEXT_ALIASES = {"Rust", "Dart", "Rails", "Oracle", "Transformers", "Torch", "Spark"}
+# A single-letter alias after these is a grade or label ("Grade: C", "Class A"), not a language
+_GRADE_WORDS = {"grade", "grades", "graded", "scored", "score", "gpa", "cgpa", "class", "section", "division"}
+
+# Words, plus the symbol-bearing names tech uses: c++, c#, .net, node.js, ci/cd
+_TOKEN = re.compile(r"\.?[A-Za-z0-9][A-Za-z0-9+#./-]*")
+_SPLIT = re.compile(r"[/-]")
+# Characters that make a case-sensitive alias part of an ordinary word ("R&D", "Go-to", "C-suite")
+_JOINERS = "&-"
+# Characters after which a capitalised word starts a sentence or bullet rather than naming a tool
+_SENTENCE_END = ".!?•*\n"
+# Tokens either side of an ambiguous match searched for another skill
+CONTEXT_WINDOW = 4
+
+_END = None  # trie key holding (canonical, exact_alias_or_None) for a complete alias
+
+
+def _tokens(text: str) -> List[Tuple[str, int, int]]:
+    """(token, start, end) for each word, with offsets into text"""
+    tokens = []
+    for match in _TOKEN.finditer(text):
+        token = match.group(0).rstrip(".-/")
+        if not token:
+            continue
+        start = match.start()
+        lowered = token.lower()
+        # Keep "ci/cd", "pl/sql", "scikit-learn" whole; split "React/Redux" or "Java-based"
+        if lowered in _VOCABULARY or not _SPLIT.search(token):
+            tokens.append((token, start, start + len(token)))
+            continue
+        offset = start
+        for part in _SPLIT.split(token):
+            if part:
+                tokens.append((part, offset, offset + len(part)))
+            offset += len(part) + 1
+    return tokens
+
+
+def _glued(text: str, start: int, end: int) -> bool:
+    return (start > 0 and text[start - 1] in _JOINERS) or (end < len(text) and text[end] in _JOINERS)
+
+
+def _ends_sentence(text: str, end: int) -> bool:
+    return end < len(text) and text[end] in ".!?" and (end + 1 == len(text) or text[end + 1].isspace())
+
+
+def _starts_sentence(text: str, start: int) -> bool:
+    before = text[:start].rstrip(" \t")
+    return not before or before[-1] in _SENTENCE_END
+
+
+def _compile():
+    trie: dict = {}
+    category_of: Dict[str, str] = {}
+    vocabulary = set()
+    for category, skills in SKILL_TAXONOMY.items():
+        for canonical, aliases in skills.items():
+            category_of[canonical] = category
+            for alias in aliases:
+                exact = alias if alias in CASE_SENSITIVE_ALIASES else None
+                words = alias.split()
+                vocabulary.update(word.lower() for word in words)
+                node = trie
+                for word in words:
+                    node = node.setdefault(word.lower(), {})
+                node[_END] = (canonical, exact)
+    return trie, category_of, vocabulary
+
+
+_TRIE, CATEGORY_OF, _VOCABULARY = _compile()
+
+
+def extract_skills(text: str) -> List[str]:
+    """Canonical skill names found in text, in order of first mention"""
+    spans = _tokens(text)
+    tokens = [token for token, _, _ in spans]
+    lowered = [token.lower() for token in tokens]
+    # (canonical, token index, needs a nearby skill)
+    matches: List[Tuple[str, int, bool]] = []
+    i = 0
+    while i < len(tokens):
+        node = _TRIE.get(lowered[i])
+        best: Optional[Tuple[str, int, bool]] = None
+        j = i
+        while node is not None:
+            end = node.get(_END)
+            if end is not None:
+                canonical, exact = end
+                if exact is None:
+                    best = (canonical, j + 1, False)
+                elif j == i and tokens[i] == exact and not _glued(text, spans[i][1], spans[i][2]):
+                    if len(exact) == 1:
+                        # "Grade: C." is a grade, not the language
+                        if not (_ends_sentence(text, spans[i][2]) or (i > 0 and lowered[i - 1] in _GRADE_WORDS)):
+                            best = (canonical, j + 1, False)
+                    else:
+                        # "Express", "Node", "Swift" opening a sentence are as likely English as tools
+                        best = (canonical, j + 1, exact in CONTEXT_ALIASES
+                                or (exact.istitle() and _starts_sentence(text, spans[i][1])))
+            j += 1
+            node = node.get(lowered[j]) if j < len(tokens) else None
+        if best is None:
+            i += 1
+            continue
+        matches.append((best[0], i, best[2]))
+        i = best[1]
+
+    anchors = [index for _, index, ambiguous in matches if not ambiguous]
+    found: Dict[str, None] = {}
+    for canonical, index, ambiguous in matches:
+        if ambiguous and not any(abs(anchor - index) <= CONTEXT_WINDOW for anchor in anchors):
+            continue
+        found.setdefault(canonical)
+    return list(found)
+
+
+def group_by_category(skills: List[str]) -> Dict[str, List[str]]:
+    grouped: Dict[str, List[str]] = {}
+    for skill in skills:
+        grouped.setdefault(CATEGORY_OF.get(skill, "Other"), []).append(skill)
+    return grouped
+
+
+def canonical_name(name: str) -> str:
+    """Taxonomy name for a single skill ("k8s" -> "Kubernetes"); unknown names pass through"""
+    found = extract_skills(name)
+    return found[0] if len(found) == 1 else name.strip()
+
+
+def merge_skills(detected: List[str], extra: List[str]) -> List[str]:
+    """detected + any extra names not already present, after alias normalization"""
+    seen = {skill.lower() for skill in detected}
+    merged = list(detected)
+    for skill in extra or []:
+        if not isinstance(skill, str) or not skill.strip():
+            continue
+        skill = canonical_name(skill)
+        if skill.lower() not in seen:
+            seen.add(skill.lower())
+            merged.append(skill)
+    return merged
+
+
+def extract_pdf_skills(content: bytes, max_chars: Optional[int]) -> List[str]:
+    """PDF bytes -> detected skills; runs in the PDF pool"""
+    return extract_skills(normalize_text(extract_text_safe(content, max_chars)))
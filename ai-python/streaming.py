@@ -0,0 +1,134 @@
+"""
+Server-Sent Events helpers and an incremental JSON parser for streamed
+LLM output.
+
+IncrementalJSONParser is fed the raw completion text as it arrives and
+reports each top-level field of the JSON object as soon as that field's
+value is complete. Fields listed in `stream_items` (arrays) are reported
+element by element instead, so e.g. each recommended project can be sent
+to the client while the next one is still being generated.
+"""
+
+from typing import Iterable, List, Optional, Tuple
+
+from fastjson import dumps, loads
+
+# (key, index, value): index is None for a whole top-level field
+ParseEvent = Tuple[str, Optional[int], object]
+
+
+def sse_event(data, event: Optional[str] = None) -> str:
+    """Format one SSE message; data is JSON-encoded unless it is already a str"""
+    payload = data if isinstance(data, str) else dumps(data)
+    lines = [f"event: {event}"] if event else []
+    lines += [f"data: {line}" for line in payload.split("\n")]
+    return "\n".join(lines) + "\n\n"
+
+
+class IncrementalJSONParser:
+    def __init__(self, stream_items: Iterable[str] = ()):
+        self.stream_items = set(stream_items)
+        self.text = ""
+        self.pos = 0
+        self.started = False
+        self.finished = False
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.string_start = 0
+        self.expect_key = False
+        self.key: Optional[str] = None
+        self.value_start: Optional[int] = None
+        self.item_start: Optional[int] = None
+        self.item_index = 0
+
+    def _load(self, start: int, end: int):
+        return loads(self.text[start:end])
+
+    def _end_value(self, end: int, events: List[ParseEvent]):
+        if self.key not in self.stream_items or self.text[self.value_start] != "[":
+            try:
+                events.append((self.key, None, self._load(self.value_start, end)))
+            except ValueError:
+                pass
+        self.value_start = None
+
+    def feed(self, chunk: str) -> List[ParseEvent]:
+        events: List[ParseEvent] = []
+        if self.finished:
+            return events
+        self.text += chunk
+        text = self.text
+        i = self.pos
+        while i < len(text):
+            c = text[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif c == "\\":
+                    self.escape = True
+                elif c == '"':
+                    self.in_string = False
+                    if self.depth == 1 and self.expect_key:
+                        self.key = self._load(self.string_start, i + 1)
+                        self.expect_key = False
+                    elif self.depth == 1 and self.value_start is not None and text[self.value_start] == '"':
+                        self._end_value(i + 1, events)
+            elif not self.started:
+                # Skip anything before the root object (e.g. a ```json fence)
+                if c == "{":
+                    self.started = True
+                    self.depth = 1
+                    self.expect_key = True
+            elif c == '"':
+                self.in_string = True
+                self.string_start = i
+                if self.depth == 1 and not self.expect_key and self.value_start is None:
+                    self.value_start = i
+            elif c in "{[":
+                if self.depth == 1 and self.value_start is None:
+                    self.value_start = i
+                elif (self.depth == 2 and self.key in self.stream_items
+                      and text[self.value_start] == "[" and self.item_start is None):
+                    self.item_start = i
+                self.depth += 1
+            elif c in "}]":
+                if self.depth == 1 and self.value_start is not None:
+                    self._end_value(i, events)
+                self.depth -= 1
+                if self.depth == 2 and self.item_start is not None:
+                    try:
+                        events.append((self.key, self.item_index, self._load(self.item_start, i + 1)))
+                    except ValueError:
+                        pass
+                    self.item_start = None
+                    self.item_index += 1
+                elif self.depth == 1 and self.value_start is not None:
+                    self._end_value(i + 1, events)
+                    self.item_index = 0
+                elif self.depth == 0:
+                    self.finished = True
+                    i += 1
+                    break
+            elif self.depth == 1:
+                if c == ",":
+                    if self.value_start is not None:
+                        self._end_value(i, events)
+                    self.expect_key = True
+                elif c != ":" and not c.isspace() and self.value_start is None and not self.expect_key:
+                    self.value_start = i
+            i += 1
+        self.pos = i
+        return events
+
+
+def iter_result_events(result: dict, stream_items: Iterable[str] = ()) -> List[ParseEvent]:
+    """The events IncrementalJSONParser would have produced for a complete result"""
+    stream_items = set(stream_items)
+    events: List[ParseEvent] = []
+    for key, value in result.items():
+        if key in stream_items and isinstance(value, list):
+            events.extend((key, index, item) for index, item in enumerate(value))
+        else:
+            events.append((key, None, value))
+    return events
@@ -0,0 +1,355 @@
+"""
+Turning a model reply into a validated result without throwing work away.
+
+The old path was find('{') / rfind('}') / json.loads. A reply cut off by
+max_tokens, or one with a stray trailing comma, failed as a whole, and the
+caller lost up to 7000 generated tokens. The stages are now:
+
+  1. repair_json: strip prose and fences, drop trailing/duplicate commas,
+     add missing ones, escape raw newlines in strings, and close a
+     truncated reply at the last complete value.
+  2. check: validate against the endpoint's Pydantic model (schemas.py).
+     List items that fail on their own are dropped, not the whole list.
+  3. Re-ask: if required fields are still missing or invalid, one follow-up
+     call asks for only those fields, or only the missing list items. The
+     partial answer goes in as the assistant turn, so the model does not
+     regenerate what already parsed.
+
+A reply that was valid JSON but still misses the schema after the re-ask
+is returned as-is ("unvalidated"), as it was before validation existed;
+only replies that cannot be parsed at all become errors ("failed").
+
+Outcomes (clean / repaired / reasked / unvalidated / failed) and the estimated
+completion tokens each repair saved are exported as metrics and through
+StructuredParser.snapshot().
+"""
+
+import logging
+import os
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Set, Tuple, Type, get_args, get_origin
+
+from pydantic import BaseModel, ValidationError
+
+from fastjson import JSONDecodeError, dumps, loads
+from metrics import observe_stage, record_json_failure, record_json_parse
+from preprocess import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Follow-up calls allowed per reply; 0 turns the re-ask off
+JSON_REASK_ATTEMPTS = int(os.getenv("JSON_REASK_ATTEMPTS", "1"))
+
+# Takes the extra messages to append to the original request, returns the reply text
+Reasker = Callable[[List[dict]], Awaitable[str]]
+
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+# ============================================
+# 1. REPAIR
+# ============================================
+
+def _is_literal_char(c: str) -> bool:
+    return c.isalnum() or c in "+-."
+
+
+def _scan(text: str) -> Tuple[Optional[str], Set[str]]:
+    """Re-emit the JSON object at the start of text, fixing what can be fixed"""
+    out: List[str] = []
+    stack: List[str] = []
+    repairs: Set[str] = set()
+    # Where the output could be cut and closed, and the containers open there
+    safe: Tuple[int, List[str]] = (0, [])
+    in_string = escape = is_key = expect_key = after_value = finished = comment = False
+    literal_start = -1
+    previous = ""
+
+    for c in text:
+        previous, c_prev = c, previous
+        if comment:
+            comment = c != "\n"
+            continue
+        if in_string:
+            if escape:
+                escape = False
+                out.append(c)
+            elif c == "\\":
+                escape = True
+                out.append(c)
+            elif c == '"':
+                in_string = False
+                out.append(c)
+                if is_key:
+                    expect_key = False
+                else:
+                    after_value = True
+                    safe = (len(out), stack[:])
+            elif c in _CONTROL_ESCAPES:
+                repairs.add("control_char")
+                out.append(_CONTROL_ESCAPES[c])
+            elif c < " ":
+                repairs.add("control_char")
+                out.append(" ")
+            else:
+                out.append(c)
+            continue
+
+        if literal_start >= 0:
+            if _is_literal_char(c):
+                out.append(c)
+                continue
+            word = "".join(out[literal_start:])
+            if word in _PY_LITERALS:
+                repairs.add("python_literal")
+                out[literal_start:] = [_PY_LITERALS[word]]
+            literal_start = -1
+            after_value = True
+            safe = (len(out), stack[:])
+
+        if c.isspace():
+            continue
+        if c == '"' or c in "{[" or _is_literal_char(c):
+            if after_value:
+                repairs.add("missing_comma")
+                out.append(",")
+                after_value = False
+                expect_key = stack[-1] == "{"
+            if c == '"':
+                in_string = True
+                is_key = stack[-1] == "{" and expect_key
+                out.append(c)
+            elif c in "{[":
+                stack.append(c)
+                out.append(c)
+                expect_key = c == "{"
+                safe = (len(out), stack[:])
+            else:
+                literal_start = len(out)
+                out.append(c)
+        elif c in "}]":
+            while out[-1] == ",":
+                repairs.add("trailing_comma")
+                out.pop()
+            out.append(_CLOSERS[stack.pop()])
+            after_value = True
+            safe = (len(out), stack[:])
+            if not stack:
+                finished = True
+                break
+        elif c == ",":
+            if out[-1] in ",[{":
+                repairs.add("extra_comma")
+                continue
+            out.append(c)
+            after_value = False
+            expect_key = stack[-1] == "{"
+        elif c == ":":
+            out.append(c)
+        elif c == "/":
+            # "//" starts a line comment; a lone "/" is just dropped
+            if c_prev == "/":
+                repairs.add("comment")
+                comment = True
+        else:
+            # Stray backticks and the like
+            repairs.add("stray_text")
+
+    if not finished:
+        repairs.add("truncated")
+        length, open_stack = safe
+        if not length:
+            return None, repairs
+        out = out[:length]
+        out.extend(_CLOSERS[opener] for opener in reversed(open_stack))
+    return "".join(out), repairs
+
+
+def repair_json(text: str) -> Tuple[Optional[dict], List[str]]:
+    """(object, repairs applied); object is None when nothing usable was found"""
+    start = text.find("{")
+    if start == -1:
+        return None, ["no_json"]
+    end = text.rfind("}")
+    if end > start:
+        try:
+            data = loads(text[start:end + 1])
+            if isinstance(data, dict):
+                return data, []
+        except JSONDecodeError:
+            pass
+
+    candidate, repairs = _scan(text[start:])
+    if candidate is None:
+        return None, sorted(repairs)
+    try:
+        data = loads(candidate)
+    except JSONDecodeError:
+        return None, sorted(repairs | {"unrepairable"})
+    return (data if isinstance(data, dict) else None), sorted(repairs)
+
+
+# ============================================
+# 2. VALIDATION
+# ============================================
+
+class Validation(NamedTuple):
+    kept: dict                # fields (and list items) that passed
+    problems: Dict[str, str]  # field -> what is wrong with it, for the re-ask
+    append: Dict[str, int]    # list field -> items still needed; kept items are extended, not replaced
+
+
+def _list_item_model(annotation) -> Optional[Type[BaseModel]]:
+    if get_origin(annotation) is list:
+        args = get_args(annotation)
+        if args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+            return args[0]
+    return None
+
+
+def _min_items(field) -> int:
+    return max((getattr(meta, "min_length", 0) or 0 for meta in field.metadata), default=0)
+
+
+def _is_valid(model: Type[BaseModel], value) -> bool:
+    try:
+        model.model_validate(value)
+        return True
+    except ValidationError:
+        return False
+
+
+def check(model: Type[BaseModel], data: dict) -> Validation:
+    data = dict(data)
+    for name, field in model.model_fields.items():
+        item_model = _list_item_model(field.annotation)
+        if item_model is not None and isinstance(data.get(name), list):
+            data[name] = [item for item in data[name] if _is_valid(item_model, item)]
+    try:
+        model.model_validate(data)
+        return Validation(data, {}, {})
+    except ValidationError as e:
+        errors = e.errors()
+
+    problems: Dict[str, str] = {}
+    append: Dict[str, int] = {}
+    for error in errors:
+        if not error["loc"]:
+            continue
+        name = str(error["loc"][0])
+        if name in problems:
+            continue
+        value = data.get(name)
+        if error["type"] == "missing":
+            problems[name] = f'"{name}" is missing'
+        elif error["type"] == "too_short" and isinstance(value, list) and value:
+            needed = _min_items(model.model_fields[name]) - len(value)
+            problems[name] = (f'"{name}" needs {needed} more item(s); the {len(value)} already given are kept, '
+                              f'so reply with only the new ones')
+            append[name] = needed
+        else:
+            where = ".".join(map(str, error["loc"][1:])) or name
+            problems[name] = f'"{name}" is invalid at {where}: {error["msg"]}'
+    kept = {key: value for key, value in data.items() if key not in problems or key in append}
+    return Validation(kept, problems, append)
+
+
+# ============================================
+# 3. RE-ASK
+# ============================================
+
+def reask_messages(validation: Validation) -> List[dict]:
+    """Follow-up turns asking for only the fields in validation.problems"""
+    fields = ", ".join(f'"{name}"' for name in validation.problems)
+    details = "\n".join(f"- {problem}" for problem in validation.problems.values())
+    return [
+        {"role": "assistant", "content": dumps(validation.kept)},
+        {"role": "user", "content": (
+            "That JSON was incomplete or invalid:\n" + details + "\n"
+            f"Reply with a JSON object containing ONLY the keys {fields}, following the structure "
+            "from my first message. Do not repeat any other keys."
+        )},
+    ]
+
+
+def merge_reply(validation: Validation, reply: dict) -> dict:
+    merged = dict(validation.kept)
+    if len(validation.problems) == 1:
+        # Asked for one field, the model sometimes answers with just its value
+        name = next(iter(validation.problems))
+        if name not in reply and reply:
+            reply = {name: reply}
+    for name in validation.problems:
+        if name not in reply:
+            continue
+        value = reply[name]
+        if name in validation.append and isinstance(value, list):
+            # Models often repeat the items they already gave; the new ones come last
+            merged[name] = merged.get(name, []) + value[-validation.append[name]:]
+        else:
+            merged[name] = value
+    return merged
+
+
+class StructuredParser:
+    def __init__(self, reask_attempts: int = JSON_REASK_ATTEMPTS):
+        self.reask_attempts = reask_attempts
+        self.stats = {"parsed": 0, "clean": 0, "repaired": 0, "reasked": 0, "unvalidated": 0, "failed": 0,
+                      "tokens_saved": 0, "reask_tokens": 0}
+
+    def _finish(self, outcome: str, result: dict, tokens_saved: int = 0) -> dict:
+        self.stats[outcome] += 1
+        self.stats["tokens_saved"] += tokens_saved
+        record_json_parse(outcome, tokens_saved)
+        return result
+
+    async def parse(self, raw: str, model: Type[BaseModel], reask: Optional[Reasker] = None) -> dict:
+        """Validated result as a plain dict, or the usual {"status": "error"} payload"""
+        self.stats["parsed"] += 1
+        with observe_stage("json_parse"):
+            data, repairs = repair_json(raw)
+            validation = check(model, data or {})
+        if not validation.problems:
+            if repairs:
+                logger.info(f"🩹 Repaired model JSON ({', '.join(repairs)})")
+            result = model.model_validate(validation.kept).model_dump(exclude_none=True)
+            return self._finish("repaired" if repairs else "clean", result, estimate_tokens(raw) if repairs else 0)
+
+        salvaged = estimate_tokens(dumps(validation.kept)) if validation.kept else 0
+        if data is None:
+            record_json_failure("no_json" if repairs == ["no_json"] else "invalid_json")
+        else:
+            record_json_failure("schema")
+        for _ in range(self.reask_attempts if reask is not None else 0):
+            logger.warning(f"🔁 Re-asking for {', '.join(validation.problems)} (kept ~{salvaged} tokens)")
+            try:
+                reply = await reask(reask_messages(validation))
+            except Exception:
+                self._finish("failed", {})
+                raise
+            self.stats["reask_tokens"] += estimate_tokens(reply)
+            with observe_stage("json_parse"):
+                part, _ = repair_json(reply)
+                validation = check(model, merge_reply(validation, part or {}))
+            if not validation.problems:
+                result = model.model_validate(validation.kept).model_dump(exclude_none=True)
+                return self._finish("reasked", result, salvaged)
+
+        if data is not None and not repairs:
+            # Valid JSON that misses the schema was served before validation existed; keep serving it
+            logger.warning(f"⚠️ Model JSON failed validation: {'; '.join(validation.problems.values())}")
+            return self._finish("unvalidated", data)
+        logger.error(f"JSON Parse Error: {'; '.join(validation.problems.values())}")
+        message = "No JSON found" if repairs == ["no_json"] else "Invalid JSON format"
+        return self._finish("failed", {"status": "error", "message": message})
+
+    def snapshot(self) -> dict:
+        parsed = self.stats["parsed"]
+        needed_help = parsed - self.stats["clean"]
+        return {
+            **self.stats,
+            "reask_attempts": self.reask_attempts,
+            "raw_failure_rate": round(needed_help / parsed, 3) if parsed else 0.0,
+            "failure_rate": round(self.stats["failed"] / parsed, 3) if parsed else 0.0,
+        }
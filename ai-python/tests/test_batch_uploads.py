@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+import main
+
+
+class FakeUpload:
+    def __init__(self, filename: str, size: int):
+        self.filename = filename
+        self.size = size
+        self.requested = None
+
+    async def read(self, n: int = -1) -> bytes:
+        self.requested = n
+        return b"x" * min(self.size, n)
+
+
+def test_batch_rejected_before_reading_past_the_total(monkeypatch):
+    monkeypatch.setattr(main, "BATCH_MAX_UPLOAD_BYTES", 100)
+    monkeypatch.setattr(main, "BATCH_MAX_EXTRACTED_BYTES", 150)
+    files = [FakeUpload("a.pdf", 100), FakeUpload("b.pdf", 100), FakeUpload("c.pdf", 100)]
+
+    with pytest.raises(ValueError, match="150 bytes"):
+        asyncio.run(main.read_batch_uploads(files))
+    # The second upload is only read up to what the batch had left; the third is never touched
+    assert files[1].requested == 51
+    assert files[2].requested is None
+
+
+def test_per_upload_limit_still_applies(monkeypatch):
+    monkeypatch.setattr(main, "BATCH_MAX_UPLOAD_BYTES", 100)
+    monkeypatch.setattr(main, "BATCH_MAX_EXTRACTED_BYTES", 1000)
+
+    with pytest.raises(main.PDFLimitError):
+        asyncio.run(main.read_batch_uploads([FakeUpload("a.zip", 101)]))
+    uploads = asyncio.run(main.read_batch_uploads([FakeUpload("a.pdf", 100), FakeUpload("b.pdf", 100)]))
+    assert [(name, len(content)) for name, content in uploads] == [("a.pdf", 100), ("b.pdf", 100)]
+
+
+def test_batch_endpoint_returns_413(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(main, "GROQ_ANALYSIS_KEY", "test")
+    monkeypatch.setattr(main, "BATCH_MAX_EXTRACTED_BYTES", 150)
+    files = [("files", (f"{name}.pdf", b"%PDF" + b"x" * 96, "application/pdf")) for name in "abc"]
+    response = TestClient(main.app).post("/analyze/batch", files=files, data={"stream": "false"})
+    assert response.status_code == 413
+    assert response.json()["status"] == "error"
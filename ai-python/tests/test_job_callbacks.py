@@ -0,0 +1,79 @@
+import asyncio
+import socket
+
+import httpx
+
+import jobs
+
+
+def fake_dns(monkeypatch, address):
+    def getaddrinfo(host, port, *args, **kwargs):
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, 0))]
+    monkeypatch.setattr(jobs.socket, "getaddrinfo", getaddrinfo)
+
+
+def test_private_and_loopback_hosts_are_rejected(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_CALLBACK_HOSTS", set())
+    for address in ("127.0.0.1", "10.0.0.5", "169.254.169.254", "192.168.1.1"):
+        fake_dns(monkeypatch, address)
+        assert jobs.callback_url_error("https://hooks.example.com/done") is not None
+
+
+def test_allow_listed_host_is_trusted(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_CALLBACK_HOSTS", {"internal.svc"})
+    assert jobs.resolve_callback("http://internal.svc/hook") == (None, None)
+    assert jobs.callback_url_error("http://other.svc/hook") is not None
+
+
+def run_job_with_callback(monkeypatch, address_at_delivery: str):
+    """Submit a job with a callback while DNS answers a public address, then deliver it"""
+    monkeypatch.setattr(jobs, "JOB_CALLBACK_HOSTS", set())
+    sent = []
+
+    def receiver(request: httpx.Request) -> httpx.Response:
+        sent.append(request)
+        return httpx.Response(200)
+
+    async def handler(kind, text, params):
+        fake_dns(monkeypatch, address_at_delivery)
+        return {"status": "success"}
+
+    async def scenario():
+        queue = jobs.JobQueue(path="", workers=1)
+        queue.start(handler)
+        queue.http = httpx.AsyncClient(transport=httpx.MockTransport(receiver))
+        fake_dns(monkeypatch, "93.184.216.34")
+        assert jobs.callback_url_error("https://hooks.example.com/done") is None
+        job = queue.submit("analyze", "resume text", {}, "https://hooks.example.com/done")
+        await queue.wait(job["job_id"], 5)
+        for _ in range(100):
+            stored = queue.store.get(job["job_id"])
+            if stored["callback_status"] in ("delivered", "failed"):
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return stored
+
+    return asyncio.run(scenario()), sent
+
+
+def test_callback_is_sent_to_the_checked_address(monkeypatch):
+    stored, sent = run_job_with_callback(monkeypatch, "93.184.216.34")
+    assert stored["callback_status"] == "delivered"
+    assert stored["input"] is None
+    assert [request.url.host for request in sent] == ["93.184.216.34"]
+    assert sent[0].headers["host"] == "hooks.example.com"
+    assert sent[0].extensions["sni_hostname"] == "hooks.example.com"
+
+
+def test_host_that_turns_internal_before_delivery_gets_nothing(monkeypatch):
+    stored, sent = run_job_with_callback(monkeypatch, "127.0.0.1")
+    assert sent == []
+    assert stored["callback_status"] == "failed"
+
+
+def test_pinned_request_keeps_host_and_tls_name():
+    url, headers, extensions = jobs.pinned_request("https://hooks.example.com:8443/done?x=1", "93.184.216.34")
+    assert url == "https://93.184.216.34:8443/done?x=1"
+    assert headers == {"Host": "hooks.example.com:8443"}
+    assert extensions == {"sni_hostname": "hooks.example.com"}
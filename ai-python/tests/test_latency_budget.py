@@ -0,0 +1,17 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.mark.parametrize("budget", ["soon", "nan", "inf", True, [2], {"s": 2}])
+def test_bad_latency_budget_is_a_400(monkeypatch, budget):
+    monkeypatch.setattr(main, "GROQ_CHAT_KEY", "test")
+    response = TestClient(main.app).post("/chat-with-mentor", json={"message": "hi", "latency_budget": budget})
+    assert response.status_code == 400
+    assert response.json() == {"status": "error", "message": "latency_budget must be a number of seconds"}
+
+
+@pytest.mark.parametrize("budget, seconds", [(None, None), ("", None), (2, 2.0), ("2.5", 2.5), (0, 0.0)])
+def test_latency_budget_parsing(budget, seconds):
+    assert main.parse_latency_budget(budget) == seconds
@@ -0,0 +1,115 @@
+import asyncio
+
+from singleflight import SingleFlight
+
+
+class SlowFake:
+    """Stands in for an LLM call: counts calls and finishes when released"""
+
+    def __init__(self, result="analysis"):
+        self.result = result
+        self.calls = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return self.result
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_concurrent_duplicates_share_one_call():
+    async def scenario():
+        flight, fake = SingleFlight(), SlowFake()
+        waiters = [asyncio.ensure_future(flight.do("key", fake)) for _ in range(3)]
+        await settle()
+        fake.release.set()
+        results = await asyncio.gather(*waiters)
+        return flight, fake, results
+
+    flight, fake, results = asyncio.run(scenario())
+    assert results == ["analysis"] * 3
+    assert fake.calls == 1
+    assert flight.counters == {"started": 1, "coalesced": 2, "abandoned": 0}
+    assert flight.snapshot()["in_flight"] == 0
+
+
+def test_different_keys_do_not_coalesce():
+    async def scenario():
+        flight, fake = SingleFlight(), SlowFake()
+        waiters = [asyncio.ensure_future(flight.do(key, fake)) for key in ("a", "b")]
+        await settle()
+        fake.release.set()
+        await asyncio.gather(*waiters)
+        return fake
+
+    assert asyncio.run(scenario()).calls == 2
+
+
+def test_cancelled_waiter_leaves_the_others_their_result():
+    async def scenario():
+        flight, fake = SingleFlight(), SlowFake()
+        leaving = asyncio.ensure_future(flight.do("key", fake))
+        staying = asyncio.ensure_future(flight.do("key", fake))
+        await settle()
+        leaving.cancel()
+        await settle()
+        fake.release.set()
+        return flight, fake, leaving, await staying
+
+    flight, fake, leaving, result = asyncio.run(scenario())
+    assert leaving.cancelled()
+    assert result == "analysis"
+    assert fake.calls == 1
+    assert not fake.cancelled
+    assert flight.counters["abandoned"] == 0
+
+
+def test_last_waiter_leaving_cancels_the_call():
+    async def scenario():
+        flight, fake = SingleFlight(), SlowFake()
+        waiters = [asyncio.ensure_future(flight.do("key", fake)) for _ in range(2)]
+        await settle()
+        for waiter in waiters:
+            waiter.cancel()
+        await settle()
+        in_flight = flight.snapshot()["in_flight"]
+        # A new caller for the same key starts fresh instead of joining the cancelled call
+        fake.release.set()
+        again = await flight.do("key", fake)
+        return flight, fake, in_flight, again
+
+    flight, fake, in_flight, again = asyncio.run(scenario())
+    assert fake.cancelled
+    assert in_flight == 0
+    assert flight.counters["abandoned"] == 1
+    assert again == "analysis"
+    assert fake.calls == 2
+
+
+def test_errors_reach_every_waiter():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def failing():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            raise RuntimeError("groq down")
+
+        results = await asyncio.gather(*[flight.do("key", failing) for _ in range(2)], return_exceptions=True)
+        return calls, results
+
+    calls, results = asyncio.run(scenario())
+    assert calls == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -0,0 +1,32 @@
+import pytest
+
+from skills import extract_skills
+
+
+@pytest.mark.parametrize("text", [
+    "rust my bike",
+    "Spark of inspiration",
+    "Rails on the train track",
+    "Oracle of Delphi",
+    "transformers for power grids",
+    "torch lighting",
+    "Grade: C.",
+    "Led R&D for the Go-to market plan.",
+    "Express person with strong ownership.",
+    "Node of the team.",
+])
+def test_everyday_words_are_not_skills(text):
+    assert extract_skills(text) == []
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Built ETL with Apache Spark and PySpark", ["Apache Spark"]),
+    ("Ruby on Rails, PostgreSQL", ["Ruby on Rails", "PostgreSQL"]),
+    ("Oracle DB and SQL", ["Oracle Database", "SQL"]),
+    ("Models in PyTorch with Transformers", ["PyTorch", "Hugging Face"]),
+    ("Languages: Rust, Python, C, Dart", ["Rust", "Python", "C", "Dart"]),
+    ("Wrote firmware in C and Python", ["C", "Python"]),
+    ("Skills: Node, Express, MongoDB", ["Node.js", "Express.js", "MongoDB"]),
+])
+def test_tools_in_tech_context_are_found(text, expected):
+    assert extract_skills(text) == expected
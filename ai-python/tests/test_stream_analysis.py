@@ -0,0 +1,49 @@
+import asyncio
+
+import main
+from bench.stub_llm import RESUME_REPLY
+from fastjson import dumps, loads
+
+RESUME_TEXT = "Jane Doe\nSkills\nPython, FastAPI, PostgreSQL, Docker\nProjects\nBuilt a REST API in FastAPI"
+
+
+def fake_stream(reply: dict):
+    async def stream_chat(*args, **kwargs):
+        content = dumps(reply)
+        for start in range(0, len(content), 40):
+            await asyncio.sleep(0)
+            yield content[start:start + 40]
+    return stream_chat
+
+
+def collect_events(jd, monkeypatch) -> list:
+    # A model may send jd_match even when the JD was blank
+    reply = {**RESUME_REPLY, "jd_match": {"match_score": 50, "summary": "n/a"}}
+    monkeypatch.setattr(main.groq_pool, "stream_chat", fake_stream(reply))
+
+    async def run():
+        events = []
+        async for chunk in main.stream_resume_analysis(f"test-{jd!r}", RESUME_TEXT, jd, None):
+            fields = dict(line.split(": ", 1) for line in chunk.strip().split("\n"))
+            data = fields["data"]
+            # sse_event sends str values as they are
+            events.append((fields.get("event", "message"), loads(data) if data[:1] in "{[" else data))
+        return events
+
+    return asyncio.run(run())
+
+
+def test_blank_jd_streams_to_done(monkeypatch):
+    events = collect_events("   ", monkeypatch)
+    names = [name for name, _ in events]
+    assert "error" not in names
+    assert names[-1] == "done"
+    assert dict(events)["jd_match"] == {"match_score": 50, "summary": "n/a"}
+
+
+def test_jd_skill_fit_is_merged_into_streamed_jd_match(monkeypatch):
+    events = collect_events("Backend engineer: Python, Kafka", monkeypatch)
+    jd_match = dict(events)["jd_match"]
+    assert jd_match["matched_skills"] == ["Python"]
+    assert jd_match["missing_skills"] == ["Apache Kafka"]
+    assert events[-1][0] == "done"
@@ -10,8 +10,15 @@ export default function FloatingChat({ analysisData }) {
   
   // Initialize with a personalized welcome message
   const [messages, setMessages] = useState([]);
+  // Server-side chat session: history and analysis context live on the AI service
+  const [sessionId, setSessionId] = useState(null);
   const messagesEndRef = useRef(null);
 
+  // A new analysis needs a new session; the old one holds the previous context
+  useEffect(() => {
+    setSessionId(null);
+  }, [analysisData]);
+
   useEffect(() => {
     if (analysisData && messages.length === 0) {
       const name = analysisData.candidate_profile.name?.split(' ')[0] || "there";
@@ -45,17 +52,21 @@ export default function FloatingChat({ analysisData }) {
 
     try {
       // Use the Python backend endpoint
-      const res = await fetch('http://localhost:5001/chat-with-mentor', {
+      const post = (body) => fetch('http://localhost:5001/chat-with-mentor', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-          user_message: input,
-          chat_history: messages,
-          context: analysisData
-        })
+        body: JSON.stringify(body)
       });
-
-      const data = await res.json();
+      const fullBody = { user_message: input, chat_history: messages, context: analysisData };
+      let res = await post(sessionId ? { user_message: input, session_id: sessionId } : fullBody);
+      let data = await res.json();
+      if (res.status === 404 && data.session_expired) {
+        // The server lost our session (expired or restarted): rebuild it from what we have
+        setSessionId(null);
+        res = await post(fullBody);
+        data = await res.json();
+      }
+      if (data.session_id) setSessionId(data.session_id);
       setMessages(prev => [...prev, { role: 'assistant', content: data.reply }]);
     } catch (err) {
       setMessages(prev => [...prev, { 
@@ -7,8 +7,15 @@ export default function FloatingChat({ analysisData }) {
   const [input, setInput] = useState('');
   const [loading, setLoading] = useState(false);
   const [messages, setMessages] = useState([]);
+  // Server-side chat session: history and analysis context live on the AI service
+  const [sessionId, setSessionId] = useState(null);
   const messagesEndRef = useRef(null);
 
+  // A new analysis needs a new session; the old one holds the previous context
+  useEffect(() => {
+    setSessionId(null);
+  }, [analysisData]);
+
   // Initialize Chat with Context
   useEffect(() => {
     if (analysisData && messages.length === 0) {
@@ -44,17 +51,21 @@ export default function FloatingChat({ analysisData }) {
       const PYTHON_API = import.meta.env.VITE_PYTHON_API_URL || 'https://career-architect-1.onrender.com';
 
       // 2. Make the request
-      const res = await fetch(`${PYTHON_API}/chat-with-mentor`, {
+      const post = (body) => fetch(`${PYTHON_API}/chat-with-mentor`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
-          user_message: input,
-          chat_history: messages,
-          context: analysisData
-        })
+        body: JSON.stringify(body)
       });
-
-      const data = await res.json();
+      const fullBody = { user_message: input, chat_history: messages, context: analysisData };
+      let res = await post(sessionId ? { user_message: input, session_id: sessionId } : fullBody);
+      let data = await res.json();
+      if (res.status === 404 && data.session_expired) {
+        // The server lost our session (expired or restarted): rebuild it from what we have
+        setSessionId(null);
+        res = await post(fullBody);
+        data = await res.json();
+      }
+      if (data.session_id) setSessionId(data.session_id);
       setMessages(prev => [...prev, { role: 'assistant', content: data.reply }]);
     } catch (err) {
       console.error(err);